@@ -0,0 +1,48 @@
+"""
+bench_arithmetic times the FixedFloat conversions done by the client and the callbacks, with the token decimals of
+TON / USDT.
+
+Examples
+--------
+$ python benchmarks/bench_arithmetic.py --baseline main
+"""
+
+from typing import Dict
+
+from compare import main, per_call
+
+BASE_DECIMALS = 9
+QUOTE_DECIMALS = 6
+
+
+def measure(number: int) -> Dict[str, float]:
+    from ticton.arithmetic import FixedFloat, to_token
+
+    raw_price = 2**64 * 2345 // 1000
+    old_price = FixedFloat(raw_price, skip_scale=True)
+
+    def decode_price():
+        return FixedFloat(raw_price, skip_scale=True).to_float()
+
+    def convert_price():
+        return FixedFloat(2.345) * 10**QUOTE_DECIMALS / 10**BASE_DECIMALS
+
+    def tick_math():
+        base_asset_price = convert_price()
+        quote_asset_transfered = FixedFloat(to_token(2.345, QUOTE_DECIMALS))
+        forward_ton_amount = quote_asset_transfered / base_asset_price + to_token(0.1, BASE_DECIMALS)
+        return int(base_asset_price.raw_value), quote_asset_transfered.to_float(), int(round(forward_ton_amount.to_float(), 0))
+
+    def wind_threshold():
+        return abs(convert_price() - old_price) < 0.01
+
+    return {
+        "decode price (skip_scale + to_float)": per_call(decode_price, number),
+        "_convert_price": per_call(convert_price, number),
+        "tick price/amount math": per_call(tick_math, number),
+        "wind threshold check": per_call(wind_threshold, number),
+    }
+
+
+if __name__ == "__main__":
+    main(__file__, measure, number=20000)
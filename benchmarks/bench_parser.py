@@ -0,0 +1,50 @@
+"""
+bench_parser times TicTonMessage.parse of each message body, including the CellSlice construction.
+
+Examples
+--------
+$ python benchmarks/bench_parser.py --baseline main
+"""
+
+from typing import Dict
+
+from compare import main, per_call
+
+OWNER = "0:" + "22" * 32
+
+
+def _bodies() -> Dict[str, str]:
+    from tonsdk.boc import begin_cell
+    from tonsdk.utils import Address, bytes_to_b64str
+
+    owner = Address(OWNER)
+    tock_ref = begin_cell().store_uint(2**64, 257).end_cell()
+    chime_ref2 = begin_cell().store_uint(1700000000, 257).store_uint(1, 257).store_uint(0, 257).end_cell()
+    chime_ref1 = begin_cell().store_uint(1, 257).store_uint(0, 257).store_uint(2**64, 256).store_ref(chime_ref2).end_cell()
+    shift_ref3 = begin_cell().store_uint(0, 257).end_cell()
+    shift_ref2 = begin_cell().store_uint(1, 257).store_uint(1, 257).store_uint(0, 257).store_ref(shift_ref3).end_cell()
+    shift_ref1 = begin_cell().store_address(owner).store_uint(2**64, 256).store_uint(1, 257).store_ref(shift_ref2).end_cell()
+    cells = {
+        "Tick": begin_cell().store_uint(0, 8).store_uint(1700001000, 256).store_uint(2**64 * 3 // 1000, 256).end_cell(),
+        "Tock": begin_cell().store_uint(0x09C0FAFB, 32).store_uint(5, 256).store_uint(1, 32).store_uint(1700000000, 257).store_address(owner).store_ref(tock_ref).end_cell(),
+        "Chime": begin_cell().store_uint(0x08EB5CD4, 32).store_uint(1, 257).store_address(owner).store_uint(2**64 * 5 // 1000, 256).store_ref(chime_ref1).end_cell(),
+        "Chronoshift": begin_cell().store_uint(0x54451598, 32).store_uint(1, 257).store_uint(5, 257).store_uint(1700000000, 257).store_ref(shift_ref1).end_cell(),
+        "JettonMintPartial": begin_cell().store_uint(0x89B71D09, 32).store_address(owner).store_address(owner).store_uint(10**9, 257).end_cell(),
+    }
+    return {name: bytes_to_b64str(cell.to_boc(False)) for name, cell in cells.items()}
+
+
+def measure(number: int) -> Dict[str, float]:
+    from tonpy import CellSlice
+
+    from ticton.parser import TicTonMessage
+
+    timings = {}
+    for name, boc in _bodies().items():
+        message = getattr(TicTonMessage, name)
+        timings[name] = per_call(lambda: message.parse(CellSlice(boc)), number)
+    return timings
+
+
+if __name__ == "__main__":
+    main(__file__, measure, number=3000)
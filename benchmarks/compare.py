@@ -0,0 +1,71 @@
+"""
+compare runs a benchmark script against the working tree and, with --baseline, against an earlier git revision, and
+prints the per-call timings as old -> new. Each tree is measured in its own interpreter, with its `ticton` package
+first on PYTHONPATH, so the script itself must only use the API shared by both trees. The trees are measured in
+alternating rounds and the best timing of each is kept, so a slow spell of the machine does not favour either tree.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import timeit
+from typing import Callable, Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def per_call(func: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """
+    per_call returns the best of repeat runs of func in microseconds per call
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def _export(ref: str, directory: str) -> str:
+    archive = subprocess.run(["git", "-C", ROOT, "archive", ref, "ticton"], check=True, capture_output=True).stdout
+    with tempfile.TemporaryFile() as f:
+        f.write(archive)
+        f.seek(0)
+        with tarfile.open(fileobj=f) as tar:
+            tar.extractall(directory)
+    return directory
+
+
+def _measure(script: str, tree: str, number: int) -> Dict[str, float]:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [tree, os.environ.get("PYTHONPATH")])))
+    output = subprocess.run([sys.executable, script, "--json", "--number", str(number)], check=True, capture_output=True, text=True, env=env).stdout
+    return json.loads(output)
+
+
+def main(script: str, measure: Callable[[int], Dict[str, float]], number: int):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baseline", help="the git revision to compare against, e.g. HEAD~1")
+    parser.add_argument("--number", type=int, default=number, help="the number of calls per timing")
+    parser.add_argument("--rounds", type=int, default=3, help="the number of alternating rounds per tree")
+    parser.add_argument("--json", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.json:
+        print(json.dumps(measure(args.number)))
+        return
+
+    trees = {"new": ROOT}
+    with tempfile.TemporaryDirectory() as directory:
+        if args.baseline is not None:
+            trees["old"] = _export(args.baseline, directory)
+        best: Dict[str, Dict[str, float]] = {}
+        for _ in range(args.rounds):
+            for label, tree in trees.items():
+                timings = best.setdefault(label, {})
+                for name, timing in _measure(script, tree, args.number).items():
+                    timings[name] = min(timing, timings.get(name, timing))
+    new, old = best["new"], best.get("old")
+    width = max(len(name) for name in new)
+    for name, timing in new.items():
+        if old is None:
+            print(f"  {name:<{width}}  {timing:8.2f}us")
+        else:
+            print(f"  {name:<{width}}  {old[name]:8.2f}us -> {timing:8.2f}us")
@@ -0,0 +1,159 @@
+"""
+builders of oracle transactions and a client on a stubbed toncenter, shared by the tests
+"""
+
+import asyncio
+import base64
+import logging
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from pytoncenter.v3.models import Transaction
+from tonsdk.boc import begin_cell
+from tonsdk.utils import Address
+
+from ticton.client import TicTonAsyncClient
+from ticton.decoder import OracleMetadata
+
+ORACLE = "0:" + "11" * 32
+USER = "0:" + "22" * 32
+
+
+def b64(cell) -> str:
+    return base64.b64encode(cell.to_boc(False)).decode()
+
+
+def message(cell, hash: str) -> dict:
+    return dict(
+        hash=hash,
+        source=None,
+        destination=None,
+        value=0,
+        fwd_fee=0,
+        ihr_fee=0,
+        created_lt=0,
+        created_at=0,
+        opcode=None,
+        ihr_disabled=None,
+        bounce=None,
+        bounced=None,
+        import_fee=None,
+        message_content=dict(hash=hash, body=b64(cell), decoded=None),
+        init_state=None,
+    )
+
+
+def transaction(lt: int, in_cell, out_cells=()) -> Transaction:
+    return Transaction.model_validate(
+        dict(
+            account=ORACLE,
+            hash=f"tx{lt}",
+            lt=lt,
+            now=1700000000,
+            orig_status="active",
+            end_status="active",
+            total_fees=0,
+            prev_trans_hash="",
+            prev_trans_lt=0,
+            description={},
+            block_ref=None,
+            in_msg=message(in_cell, f"in{lt}"),
+            out_msgs=[message(cell, f"out{lt}_{i}") for i, cell in enumerate(out_cells)],
+            account_state_before=None,
+            account_state_after=None,
+            mc_block_seqno=1,
+        )
+    )
+
+
+def tock(alarm_id: int):
+    price = begin_cell().store_uint(2**64, 257).end_cell()
+    return (
+        begin_cell()
+        .store_uint(0x09C0FAFB, 32)
+        .store_uint(alarm_id, 256)
+        .store_uint(1, 32)
+        .store_uint(1700000000, 257)
+        .store_address(Address(USER))
+        .store_ref(price)
+        .end_cell()
+    )
+
+
+def tick_transaction(lt: int, alarm_id: int) -> Transaction:
+    forward_info = begin_cell().store_uint(0, 8).store_uint(1700001000, 256).store_uint(2**64 * 3 // 1000, 256).end_cell()
+    notification = (
+        begin_cell()
+        .store_uint(0x7362D09C, 32)
+        .store_uint(0, 64)
+        .store_coins(10)
+        .store_address(Address(USER))
+        .store_bit(1)
+        .store_ref(forward_info)
+        .end_cell()
+    )
+    return transaction(lt, notification, [tock(alarm_id)])
+
+
+class StubToncenter:
+    # the qps that RpcScheduler reads from the toncenter client
+    limiter = SimpleNamespace(max_rate=1000, time_period=1)
+
+    def __init__(self, txs: List[Transaction], destinations: Optional[Dict[str, Transaction]] = None):
+        self.txs = sorted(txs, key=lambda tx: tx.lt)
+        # the destination transactions of out messages, by message hash
+        self.destinations = destinations or {}
+        self.calls: List[str] = []
+
+    async def get_transactions(self, req):
+        self.calls.append("get_transactions")
+        txs = [tx for tx in self.txs if (req.start_lt is None or tx.lt >= req.start_lt) and (req.end_lt is None or tx.lt <= req.end_lt)]
+        if req.sort == "desc":
+            txs = txs[::-1]
+        return txs[req.offset : req.offset + req.limit], {}
+
+    async def get_transaction_by_message(self, req):
+        self.calls.append("get_transaction_by_message")
+        tx = self.destinations.get(req.msg_hash)
+        return ([] if tx is None else [tx]), {}
+
+    async def multicall(self, *args):
+        coros = args[0] if len(args) == 1 and isinstance(args[0], list) else args
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+
+def chime_transaction(lt: int, alarm_id: int, new_alarm_ids: List[int]) -> Transaction:
+    ref2 = begin_cell().store_uint(1700000000, 257).store_uint(1, 257).store_uint(0, 257).end_cell()
+    ref1 = begin_cell().store_uint(1, 257).store_uint(0, 257).store_uint(2**64, 256).store_ref(ref2).end_cell()
+    chime = begin_cell().store_uint(0x08EB5CD4, 32).store_uint(alarm_id, 257).store_address(Address(USER)).store_uint(2**64 * 5 // 1000, 256).store_ref(ref1).end_cell()
+    return transaction(lt, chime, [tock(new_alarm_id) for new_alarm_id in new_alarm_ids])
+
+
+def jetton_mint(reward: int):
+    return begin_cell().store_uint(0x89B71D09, 32).store_address(Address(USER)).store_address(Address(USER)).store_uint(reward, 257).end_cell()
+
+
+def chronoshift_transaction(lt: int, alarm_id: int, reward: Optional[int] = None) -> Transaction:
+    ref3 = begin_cell().store_uint(0, 257).end_cell()
+    ref2 = begin_cell().store_uint(1, 257).store_uint(1, 257).store_uint(0, 257).store_ref(ref3).end_cell()
+    ref1 = begin_cell().store_address(Address(USER)).store_uint(2**64, 256).store_uint(1, 257).store_ref(ref2).end_cell()
+    chronoshift = begin_cell().store_uint(0x54451598, 32).store_uint(1, 257).store_uint(alarm_id, 257).store_uint(1700000000, 257).store_ref(ref1).end_cell()
+    return transaction(lt, chronoshift, [] if reward is None else [jetton_mint(reward)])
+
+
+def make_client(txs: List[Transaction], destinations: Optional[Dict[str, Transaction]] = None, *, toncenter: Any = None, **kwargs) -> TicTonAsyncClient:
+    metadata = OracleMetadata(
+        base_asset_address="0:" + "00" * 32,
+        quote_asset_address=USER,
+        base_asset_decimals=9,
+        quote_asset_decimals=6,
+        min_base_asset_threshold=1,
+        base_asset_wallet_address=USER,
+        quote_asset_wallet_address=USER,
+        is_initialized=True,
+        latest_base_asset_price=0,
+        latest_timestamp=0,
+        total_alarms=10,
+    )
+    toncenter = toncenter or StubToncenter(txs, destinations)
+    return TicTonAsyncClient(metadata, toncenter, ORACLE, logger=logging.getLogger(__name__), **kwargs)  # type: ignore
@@ -0,0 +1,124 @@
+import asyncio
+import random
+from decimal import Decimal, localcontext
+
+import pytest
+
+from ticton import FixedFloat, FixedFloatArray, passes_threshold, to_token
+
+from .conftest import make_client
+
+FACTOR = 2**64
+# decimals of (base asset, quote asset), the last two give raw prices of more than 28 significant digits
+DECIMALS = [(9, 6), (9, 9), (6, 18), (0, 30)]
+PRICES = [1e-9, 0.001, 2.345, 3.14159, 1234.5678, 987654321.123456789, 1e12]
+RAW_PRICES = [FACTOR * 2345 // 1000, FACTOR * 3 // 1000 + 1, 10**40 + 7, 2**200 + 12345, (1 << 256) - 1]
+
+
+def _prices(seed: int, count: int):
+    rng = random.Random(seed)
+    # identical prices, tiny differences and large moves, raw values up to 256 bits
+    prices = [rng.randrange(1, 1 << 128) for _ in range(count)]
+    prices += [prices[0], prices[1] + 1, prices[2] - 1, (1 << 255) - 1]
+    return prices
+
+
+def _baseline_tick(price: float, extra_ton: float, base_decimals: int, quote_decimals: int):
+    """
+    _baseline_tick is the Decimal implementation of _tick_amounts, with enough digits that the context does not round
+    """
+    with localcontext() as ctx:
+        ctx.prec = 200
+        factor = Decimal(FACTOR)
+        base_asset_price = int(Decimal(price) * factor * 10**quote_decimals / 10**base_decimals)
+        quote_asset_transfered = to_token(price, quote_decimals)
+        # the oracle divides by the integer price of the message, the baseline divided by the unrounded one
+        forward_ton_amount = quote_asset_transfered * factor / base_asset_price + Decimal(extra_ton) * 10**base_decimals
+        return base_asset_price, float(quote_asset_transfered), int(round(float(forward_ton_amount), 0))
+
+
+def _baseline_price(raw_price: int) -> float:
+    with localcontext() as ctx:
+        ctx.prec = 200
+        return float(Decimal(raw_price) / Decimal(FACTOR))
+
+
+def _client(base_decimals: int, quote_decimals: int):
+    client = make_client([])
+    client.metadata = client.metadata.model_copy(update={"base_asset_decimals": base_decimals, "quote_asset_decimals": quote_decimals})
+    return client
+
+
+@pytest.mark.parametrize("base_decimals, quote_decimals", DECIMALS)
+def test_tick_amounts_match_decimal_baseline(base_decimals, quote_decimals):
+    client = _client(base_decimals, quote_decimals)
+
+    async def main():
+        for price in PRICES:
+            assert await client._tick_amounts(price, 0.1) == _baseline_tick(price, 0.1, base_decimals, quote_decimals), price
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("base_decimals, quote_decimals", DECIMALS)
+def test_wind_price_matches_decimal_baseline(base_decimals, quote_decimals):
+    client = _client(base_decimals, quote_decimals)
+
+    async def main():
+        for price in PRICES:
+            new_price = await client._convert_price(price)
+            assert new_price.raw_value == _baseline_tick(price, 0, base_decimals, quote_decimals)[0], price
+            for raw_price in RAW_PRICES:
+                # the wind threshold compares the raw difference, see FixedFloat.__abs__
+                expected = abs(Decimal(new_price.raw_value) - Decimal(raw_price)) >= Decimal(client.threshold_price)
+                assert passes_threshold(new_price, FixedFloat(raw_price, skip_scale=True), client.threshold_price) == expected
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("raw_price", RAW_PRICES)
+def test_price_of_event_matches_decimal_baseline(raw_price):
+    assert FixedFloat(raw_price, skip_scale=True).to_float() == _baseline_price(raw_price)
+
+
+def test_product_is_shifted_integer_product():
+    rng = random.Random(2)
+    values = [rng.randrange(-(1 << 128), 1 << 128) for _ in range(200)] + [10**40 + 7, (1 << 128) + 1, (1 << 255) - 1, FACTOR, 0]
+    for a in values:
+        for b in values[-5:] + values[:20]:
+            product = FixedFloat(a, skip_scale=True) * FixedFloat(b, skip_scale=True)
+            assert product.raw_value == (a * b) >> 64
+            with localcontext() as ctx:
+                ctx.prec = 200
+                assert product.raw_value == int((Decimal(a) * Decimal(b) / FACTOR).to_integral_value(rounding="ROUND_FLOOR"))
+
+    # the 28 digit context of the baseline truncated products of more than 28 digits
+    a = (1 << 128) + 1
+    assert int(Decimal(a) * Decimal(a) / Decimal(FACTOR)) != (FixedFloat(a, skip_scale=True) * FixedFloat(a, skip_scale=True)).raw_value
+
+
+@pytest.mark.parametrize("threshold", [0, 0.01, 0.7, 1e30])
+def test_array_screen_agrees_with_scalar_wind_check(threshold):
+    np = pytest.importorskip("numpy")
+    old_prices = _prices(0, 200)
+    new = FixedFloat(old_prices[0], skip_scale=True)
+    old = FixedFloatArray(old_prices, skip_scale=True)
+
+    screened = passes_threshold(new, old, threshold)
+    expected = [passes_threshold(new, FixedFloat(price, skip_scale=True), threshold) for price in old_prices]
+
+    assert isinstance(screened, np.ndarray)
+    assert screened.tolist() == expected
+    assert passes_threshold(old, new, threshold).tolist() == expected
+
+
+def test_array_abs_is_plain_absolute_value():
+    pytest.importorskip("numpy")
+    prices = _prices(1, 50)
+    new = FixedFloat(3.5)
+    old = FixedFloatArray(prices, skip_scale=True)
+
+    deltas = abs(old - new)
+
+    assert [delta.raw_value for delta in deltas] == [abs(price - new.raw_value) for price in prices]
+    assert abs(FixedFloatArray([-2.5, 0, 1.25])).to_float().tolist() == [2.5, 0.0, 1.25]
@@ -0,0 +1,39 @@
+import asyncio
+from typing import List
+
+from ticton import Backfill, SQLiteCheckpointStore
+
+from .conftest import make_client, tick_transaction
+
+TXS = [tick_transaction(1000 + 7 * alarm_id, alarm_id) for alarm_id in range(20)]
+
+
+async def _crawl(backfill: Backfill, count: int = len(TXS)) -> List[int]:
+    alarm_ids: List[int] = []
+    async for event in backfill.crawl():
+        alarm_ids.append(event.new_alarm_id)
+        if len(alarm_ids) == count:
+            break
+    return alarm_ids
+
+
+def test_every_event_is_yielded_once_in_lt_order():
+    async def main():
+        backfill = Backfill(make_client(TXS), segments=4, concurrency=2, limit=2)
+        assert await _crawl(backfill) == list(range(20))
+
+    asyncio.run(main())
+
+
+def test_crawl_resumes_from_unfinished_segments(tmp_path):
+    async def main():
+        path = str(tmp_path / "backfill.db")
+        first = await _crawl(Backfill(make_client(TXS), segments=4, concurrency=2, limit=2, checkpoint=SQLiteCheckpointStore(path)), 7)
+        assert first == list(range(7))
+
+        # the second segment was not finished, it is crawled again, the transaction after the saved end is not
+        client = make_client(TXS + [tick_transaction(2000, 20)])
+        resumed = await _crawl(Backfill(client, segments=4, concurrency=2, limit=2, checkpoint=SQLiteCheckpointStore(path)))
+        assert resumed == list(range(5, 20))
+
+    asyncio.run(main())
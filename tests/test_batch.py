@@ -0,0 +1,56 @@
+import asyncio
+import logging
+
+from tonpy import CellSlice
+from tonsdk.boc import begin_cell
+
+from ticton import BatchDecoder
+from ticton.batch import decode_bodies
+from ticton.parser import TicTonMessage
+
+from .conftest import b64, chime_transaction, chronoshift_transaction, tick_transaction
+
+TXS = [
+    tick_transaction(1000, 1),
+    chime_transaction(1010, 1, [2, 3]),
+    chronoshift_transaction(1020, 4, reward=2 * 10**9),
+    chronoshift_transaction(1030, 5),
+]
+# a chronoshift cut after the opcode, and a comment that is not a TicTon message
+BROKEN = b64(begin_cell().store_uint(0x54451598, 32).store_uint(1, 100).end_cell())
+COMMENT = b64(begin_cell().store_uint(0, 32).store_bytes(b"hello").end_cell())
+
+
+def test_batch_decoder_matches_in_process_decoder():
+    async def main():
+        async with BatchDecoder(workers=2, chunk_size=2) as decoder:
+            decoded = await decoder.decode_transactions(TXS)
+            assert decoder.failed == 0
+        for tx in TXS:
+            bodies = [msg.message_content.body for msg in [tx.in_msg, *tx.out_msgs]]  # type: ignore
+            in_msg, out_msgs = decoded[tx.hash]
+            assert [in_msg, *out_msgs] == decode_bodies(bodies)
+
+        # the fields are the ones of the messages that subscribe decodes
+        tock = TicTonMessage.Tock.parse(CellSlice(TXS[0].out_msgs[0].message_content.body))  # type: ignore
+        assert decoded["tx1000"][1][0] == ("Tock", tock.alarm_index, tock.scale, tock.created_at, tock.watchmaker.to_string(False), tock.base_asset_price)
+        assert decoded["tx1000"][0][0] == "Tick"
+        assert [out[1] for out in decoded["tx1010"][1]] == [2, 3]
+        assert decoded["tx1020"][1][0][-1] == 2 * 10**9
+
+    asyncio.run(main())
+
+
+def test_decode_failures_are_counted_and_logged(caplog):
+    async def main():
+        async with BatchDecoder(workers=1, chunk_size=2) as decoder:
+            decoded = await decoder.decode([COMMENT, "", BROKEN, BROKEN])
+            assert decoded == [None, None, None, None]
+            assert decoder.failed == 2
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(main())
+        assert any("Failed to decode 2 of 4 bodies, the first is body 2" in record.getMessage() for record in caplog.records)
+        caplog.clear()
+        assert decode_bodies([COMMENT, BROKEN]) == [None, None]
+        assert [record.getMessage().split(":")[0] for record in caplog.records] == ["Failed to decode body 1"]
@@ -0,0 +1,134 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List, Optional, Set
+
+from pytoncenter.address import Address
+from pytoncenter.exception import TonCenterException
+from pytoncenter.v3.models import SentMessage
+from tonsdk.crypto import mnemonic_new
+
+from ticton import ChainCache
+
+from .conftest import USER, make_client
+
+INACTIVE = Address("0:" + "33" * 32)
+
+
+class WalletToncenter:
+    """
+    WalletToncenter answers the balance and seqno reads of a wallet and records the sent external messages
+    """
+
+    limiter = SimpleNamespace(max_rate=1000, time_period=1)
+
+    def __init__(self, quote_asset_balance: int = 10**12, failed_sends: Optional[Set[int]] = None):
+        self.quote_asset_balance = quote_asset_balance
+        # the indexes of the sends that are rejected
+        self.failed_sends = failed_sends or set()
+        self.sent: List[str] = []
+
+    async def get_account(self, req):
+        status = "uninit" if Address(req.address) == INACTIVE else "active"
+        return SimpleNamespace(balance=10**12, status=status)
+
+    async def get_jetton_wallets(self, req):
+        return SimpleNamespace(balance=self.quote_asset_balance)
+
+    async def run_get_method(self, req):
+        raise TonCenterException(404, "get_jetton_data is not supported")
+
+    async def get_wallet(self, req):
+        return SimpleNamespace(seqno=1)
+
+    async def send_message(self, req):
+        self.sent.append(req.boc)
+        if len(self.sent) - 1 in self.failed_sends:
+            raise TonCenterException(500, "send failed")
+        return SentMessage(message_hash=f"hash{len(self.sent)}")
+
+    async def multicall(self, *coros):
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+
+def _client(tmp_path, toncenter: WalletToncenter):
+    cache = ChainCache(str(tmp_path / "cache.db"))
+    client = make_client([], toncenter=toncenter, mnemonics=" ".join(mnemonic_new()), cache=cache)
+    # the jetton wallet is known, the alarm address is computed from its id
+    owner, master = Address(client.wallet.address.to_string()), Address(USER)  # type: ignore
+    cache.set(client.jetton_wallet_resolver.scope, f"jetton_wallet:{master.to_string(False)}:{owner.to_string(False)}", USER)
+
+    async def get_alarm_address(alarm_id: int) -> Address:
+        return INACTIVE if alarm_id == 0 else Address(f"0:{alarm_id:064x}")
+
+    client.get_alarm_address = get_alarm_address  # type: ignore
+    return client
+
+
+def _hashes(results) -> List[Optional[str]]:
+    return [None if result.result is None else result.result.message_hash for result in results]
+
+
+def test_tick_many_packs_the_ticks_into_few_external_messages(tmp_path):
+    async def main():
+        toncenter = WalletToncenter()
+        client = _client(tmp_path, toncenter)
+        results = await client.tick_many([2.5] * 6)
+        # a v4 wallet carries at most 4 internal messages, the chunks are sent with consecutive seqnos
+        assert len(toncenter.sent) == 2
+        assert client.wallet_pool.wallets[0].sequencer.next_seqno == 3  # type: ignore
+        assert [result.ok for result in results] == [True] * 6
+        assert _hashes(results) == ["hash1"] * 4 + ["hash2"] * 2
+        assert all(result.message is not None for result in results)
+
+    asyncio.run(main())
+
+
+def test_tick_many_accepts_items_until_the_balance_runs_out(tmp_path):
+    async def main():
+        toncenter = WalletToncenter(quote_asset_balance=5 * 10**6)
+        results = await _client(tmp_path, toncenter).tick_many([2.5, -1, 2.5, 2.5])
+        assert [result.error for result in results] == [None, "price must be greater than 0", None, "insufficient balance"]
+        assert results[1].message is None and results[3].message is not None
+        assert _hashes(results) == ["hash1", None, "hash1", None]
+        assert len(toncenter.sent) == 1
+
+    asyncio.run(main())
+
+
+def test_failed_send_fails_only_its_chunk(tmp_path):
+    async def main():
+        toncenter = WalletToncenter(failed_sends={0})
+        results = await _client(tmp_path, toncenter).tick_many([2.5] * 5)
+        assert all("send failed" in result.error for result in results[:4]) and results[4].ok  # type: ignore
+        assert _hashes(results) == [None] * 4 + ["hash2"]
+
+    asyncio.run(main())
+
+
+def test_ring_many_skips_inactive_alarms(tmp_path):
+    async def main():
+        toncenter = WalletToncenter()
+        results = await _client(tmp_path, toncenter).ring_many([1, 0, 2])
+        assert [result.error for result in results] == [None, "Ring: alarm is not exist", None]
+        assert _hashes(results) == ["hash1", None, "hash1"]
+
+    asyncio.run(main())
+
+
+def test_wind_many_dry_run_builds_every_wind(tmp_path):
+    async def main():
+        toncenter = WalletToncenter()
+        client = _client(tmp_path, toncenter)
+
+        async def estimate_wind(alarm_id: int, buy_num: int, new_price: float, graph=None):
+            return alarm_id != 2, (Decimal(buy_num * 10**9), Decimal(buy_num * 10**6)), None
+
+        client._estimate_wind = estimate_wind  # type: ignore
+        results = await client.wind_many([(1, 1, 5.0), (2, 1, 5.0), (3, 2, 5.0)], dry_run=True, wallet_addr_override=USER)
+        assert [result.error for result in results] == [None, "Buy num is too large", None]
+        assert results[2].message is not None and results[2].message.amount > results[0].message.amount  # type: ignore
+        assert _hashes(results) == [None] * 3
+        assert toncenter.sent == []
+
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Dict, List, Optional
+
+import pytest
+from pytoncenter.v3.models import Transaction
+from tonpy import CellSlice
+
+from ticton.callbacks import handle_chime, handle_chronoshift, handle_notification
+
+from .conftest import StubToncenter, chime_transaction, chronoshift_transaction, jetton_mint, tick_transaction, tock, transaction
+
+
+def _destination(lt: int, alarm_id: Optional[int]) -> Transaction:
+    tx = transaction(lt, tock(alarm_id or 0))
+    if alarm_id is None:
+        tx.in_msg.message_content = None
+    return tx
+
+
+async def _handle(kind: str, destinations: Dict[int, Optional[int]]) -> List[int]:
+    """
+    _handle runs the handler of a transaction with two Tock out messages, destinations maps the index of a Tock to
+    the alarm id its destination transaction received, None for an in message without content, missing if not delivered yet
+    """
+    delivered: List[int] = []
+
+    async def on_success(event):
+        delivered.append(event.new_alarm_id)
+
+    if kind == "tick":
+        tx = tick_transaction(1000, 0)
+        tx.out_msgs.append(tx.out_msgs[0].model_copy(update={"hash": "out1000_1"}))
+        handler, callback = handle_notification, "on_tick_success"
+    else:
+        tx = chime_transaction(1000, 1, [0, 0])
+        handler, callback = handle_chime, "on_wind_success"
+    client = StubToncenter([], {tx.out_msgs[index].hash: _destination(2000 + index, alarm_id) for index, alarm_id in destinations.items()})
+    await handler(client, CellSlice(tx.in_msg.message_content.body), tx, confirm_delivery=True, **{callback: on_success})  # type: ignore
+    return delivered
+
+
+@pytest.mark.parametrize("kind", ["tick", "chime"])
+def test_confirmed_tock_after_message_without_content(kind):
+    assert asyncio.run(_handle(kind, {0: None, 1: 7})) == [7]
+
+
+@pytest.mark.parametrize("kind", ["tick", "chime"])
+def test_confirmed_tock_without_content_is_skipped(kind):
+    assert asyncio.run(_handle(kind, {0: None})) == []
+
+
+@pytest.mark.parametrize("kind", ["tick", "chime"])
+def test_undelivered_tock_is_not_reported_yet(kind):
+    assert asyncio.run(_handle(kind, {1: 7})) == []
+    assert asyncio.run(_handle(kind, {0: 5, 1: 7})) == [5]
+
+
+async def _ring(reward: Optional[int], delivered: Optional[int]) -> List[float]:
+    """
+    _ring runs the chronoshift handler on a transaction with a JettonMint of reward, or without one if reward is None,
+    delivered is the reward its destination transaction received, None if not delivered yet
+    """
+    rewards: List[float] = []
+
+    async def on_ring_success(event):
+        rewards.append(event.reward)
+
+    tx = chronoshift_transaction(1000, 3, reward)
+    destinations = {} if delivered is None else {tx.out_msgs[0].hash: transaction(2000, jetton_mint(delivered))}
+    await handle_chronoshift(StubToncenter([], destinations), CellSlice(tx.in_msg.message_content.body), tx, on_ring_success, confirm_delivery=True)  # type: ignore
+    return rewards
+
+
+def test_confirmed_jetton_mint_reward():
+    assert asyncio.run(_ring(2 * 10**9, 2 * 10**9)) == [2.0]
+
+
+def test_undelivered_jetton_mint_is_not_reported_yet():
+    assert asyncio.run(_ring(2 * 10**9, None)) == []
+
+
+def test_chronoshift_without_jetton_mint_has_no_reward():
+    assert asyncio.run(_ring(None, None)) == [0.0]
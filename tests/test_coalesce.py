@@ -0,0 +1,138 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from ticton.coalesce import CoalescingToncenter
+from ticton.scheduler import Priority, rpc_priority
+
+
+class StubToncenter:
+    def __init__(self):
+        self.calls: List[str] = []
+        self.release = asyncio.Event()
+
+    async def _call(self, method: str, req):
+        self.calls.append(req)
+        await self.release.wait()
+        return {method: req}
+
+    async def get_account(self, req):
+        return await self._call("account", req)
+
+    async def get_wallet(self, req):
+        return await self._call("wallet", req)
+
+    async def send_message(self, req):
+        return await self._call("message", req)
+
+
+def test_concurrent_reads_share_one_request():
+    async def main():
+        stub = StubToncenter()
+        toncenter = CoalescingToncenter(stub)  # type: ignore
+        reads = [asyncio.create_task(toncenter.get_account(req)) for req in ["a", "a", "b", "a"]]
+        await asyncio.sleep(0)
+        stub.release.set()
+        results = await asyncio.gather(*reads)
+        assert stub.calls == ["a", "b"]
+        assert results[0] is results[1] is results[3]
+        assert toncenter.metrics.requests == 2 and toncenter.metrics.coalesced == 2
+        # nothing is kept without a ttl
+        await toncenter.get_account("a")
+        assert stub.calls == ["a", "b", "a"]
+
+    asyncio.run(main())
+
+
+def test_result_is_kept_for_ttl():
+    async def main():
+        stub = StubToncenter()
+        stub.release.set()
+        toncenter = CoalescingToncenter(stub, ttl={"get_account": 0.05})  # type: ignore
+        first = await toncenter.get_account("a")
+        assert await toncenter.get_account("a") is first
+        assert toncenter.metrics.cache_hits == 1
+        await asyncio.sleep(0.06)
+        assert await toncenter.get_account("a") is not first
+        toncenter.invalidate()
+        await toncenter.get_account("a")
+        assert stub.calls == ["a", "a", "a"]
+
+    asyncio.run(main())
+
+
+def test_seqno_is_never_kept():
+    async def main():
+        stub = StubToncenter()
+        toncenter = CoalescingToncenter(stub, ttl=10)  # type: ignore
+        reads = [asyncio.create_task(toncenter.get_wallet("w")) for _ in range(2)]
+        await asyncio.sleep(0)
+        stub.release.set()
+        await asyncio.gather(*reads)
+        await toncenter.get_wallet("w")
+        # the concurrent reads are shared, the later read goes to the wallet again
+        assert stub.calls == ["w", "w"]
+        assert toncenter.metrics.cache_hits == 0
+
+    asyncio.run(main())
+
+
+def test_send_message_is_never_shared():
+    async def main():
+        stub = StubToncenter()
+        toncenter = CoalescingToncenter(stub, ttl=10)  # type: ignore
+        sends = [asyncio.create_task(toncenter.send_message("boc")) for _ in range(2)]
+        await asyncio.sleep(0)
+        stub.release.set()
+        await asyncio.gather(*sends)
+        await toncenter.send_message("boc")
+        assert stub.calls == ["boc", "boc", "boc"]
+        assert toncenter.metrics.requests == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_read():
+    async def main():
+        stub = StubToncenter()
+        toncenter = CoalescingToncenter(stub)  # type: ignore
+        cancelled = asyncio.create_task(toncenter.get_account("a"))
+        other = asyncio.create_task(toncenter.get_account("a"))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        stub.release.set()
+        assert await other == {"account": "a"}
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        assert stub.calls == ["a"]
+
+    asyncio.run(main())
+
+
+async def _read(toncenter: CoalescingToncenter, priority: Priority):
+    with rpc_priority(priority):
+        return await toncenter.get_account("addr")
+
+
+def test_read_does_not_join_a_less_urgent_read():
+    async def main():
+        stub = StubToncenter()
+        toncenter = CoalescingToncenter(stub)  # type: ignore
+        bulk = asyncio.create_task(_read(toncenter, Priority.BULK))
+        await asyncio.sleep(0)
+        # the SEND read does not wait behind the BULK read, the later BULK read joins the SEND read
+        send = asyncio.create_task(_read(toncenter, Priority.SEND))
+        await asyncio.sleep(0)
+        later = asyncio.create_task(_read(toncenter, Priority.BULK))
+        await asyncio.sleep(0)
+        assert stub.calls == ["addr", "addr"]
+        assert toncenter.metrics.in_flight == 2
+        stub.release.set()
+        results = await asyncio.gather(bulk, send, later)
+        assert results[1] is results[2] and results[0] is not results[1]
+        assert toncenter.metrics.coalesced == 1
+        assert toncenter.metrics.in_flight == 0
+
+    asyncio.run(main())
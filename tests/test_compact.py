@@ -0,0 +1,74 @@
+import asyncio
+from typing import List
+
+from ticton import EventStore
+from ticton.callbacks import CompactRingEvent, CompactTickEvent, CompactWindEvent, to_compact
+
+from .conftest import chime_transaction, chronoshift_transaction, make_client, tick_transaction
+
+TXS = [
+    tick_transaction(1000, 1),
+    chime_transaction(1010, 1, [5]),
+    chronoshift_transaction(1020, 5, reward=3 * 10**9),
+]
+
+
+async def _subscribe(payload: str, store=None) -> list:
+    events: List = []
+
+    async def on_event(event):
+        events.append(event)
+
+    client = make_client(TXS)
+    task = asyncio.create_task(client.subscribe(interval=0.01, on_tick_success=on_event, on_wind_success=on_event, on_ring_success=on_event, payload=payload, store=store))
+    while len(events) < len(TXS) and not task.done():
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return events
+
+
+def _fields(event) -> dict:
+    return {name: getattr(event, name) for cls in type(event).__mro__ for name in getattr(cls, "__slots__", ())}
+
+
+def test_compact_events_keep_every_field_but_the_transaction():
+    full = asyncio.run(_subscribe("full"))
+    store = EventStore()
+    compact = asyncio.run(_subscribe("compact", store))
+    assert [type(event) for event in compact] == [CompactTickEvent, CompactWindEvent, CompactRingEvent]
+    for event, expected in zip(compact, full):
+        assert not hasattr(event, "tx") and not hasattr(event, "__dict__")
+        assert (event.lt, event.hash, event.utime) == (expected.tx.lt, expected.tx.hash, expected.tx.now)
+        assert _fields(event) == _fields(to_compact(expected))
+        assert str(event) == str(expected)
+    # the store keeps the full events
+    assert store.events_between(0, 2**32) == full
+
+
+def test_events_yield_compact_events():
+    async def main():
+        client = make_client(TXS)
+        events = []
+        async for event in client.events(interval=0.01, payload="compact"):
+            events.append(event)
+            if len(events) == len(TXS):
+                break
+        assert [type(event) for event in events] == [CompactTickEvent, CompactWindEvent, CompactRingEvent]
+        assert [event.lt for event in events] == [tx.lt for tx in TXS]
+        assert events[2].reward == 3.0
+
+    asyncio.run(main())
+
+
+def test_fetch_tx_returns_the_full_transaction():
+    class StubToncenter:
+        async def get_transactions(self, req):
+            return next(tx for tx in TXS if tx.hash == req.hash), {}
+
+    async def main():
+        full = await _subscribe("full")
+        tx = await to_compact(full[1]).fetch_tx(StubToncenter())  # type: ignore
+        assert tx == TXS[1]
+
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+import asyncio
+from typing import List
+
+from ticton import SQLiteCheckpointStore
+
+from .conftest import ORACLE, make_client, tick_transaction
+
+TXS = [tick_transaction(1000 + 10 * alarm_id, alarm_id) for alarm_id in range(10)]
+
+
+def test_events_are_yielded_in_order():
+    async def main():
+        client = make_client(TXS)
+        alarm_ids: List[int] = []
+        async for event in client.events(interval=0.01, limit=3, maxsize=2):
+            alarm_ids.append(event.new_alarm_id)
+            if len(alarm_ids) == len(TXS):
+                break
+        assert alarm_ids == list(range(10))
+
+    asyncio.run(main())
+
+
+def test_producer_waits_for_a_paused_consumer():
+    async def main():
+        client = make_client(TXS)
+        stub = client.toncenter.toncenter.toncenter
+        events = client.events(interval=0.01, limit=2, maxsize=2)
+        assert (await events.__anext__()).new_alarm_id == 0
+        await asyncio.sleep(0.1)
+        # the first page fills the queue, the second one waits for room instead of fetching the rest of the pages
+        assert stub.calls.count("get_transactions") == 2
+        alarm_ids = [(await events.__anext__()).new_alarm_id for _ in range(9)]
+        assert alarm_ids == list(range(1, 10))
+        assert stub.calls.count("get_transactions") >= 5
+        await events.aclose()
+
+    asyncio.run(main())
+
+
+def test_checkpoint_is_saved_once_the_page_is_consumed(tmp_path):
+    async def main():
+        checkpoint = SQLiteCheckpointStore(str(tmp_path / "checkpoint.db"))
+        client = make_client(TXS)
+        events = client.events(interval=0.01, limit=3, checkpoint=checkpoint)
+        for _ in range(3):
+            await events.__anext__()
+            # the page is fetched and decoded, but its last event has not been consumed yet
+            assert checkpoint.load(ORACLE) is None
+        await events.__anext__()
+        saved = checkpoint.load(ORACLE)
+        assert saved is not None and (saved.lt, saved.hash) == (1020, "tx1020")
+        await events.aclose()
+
+        # after restart the events resume after the checkpoint
+        resumed = make_client(TXS).events(start_lt="checkpoint", interval=0.01, limit=3, checkpoint=checkpoint)
+        assert (await resumed.__anext__()).new_alarm_id == 3
+        await resumed.aclose()
+
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+import pytest
+
+from ticton.callbacks import CompactTickEvent
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from ticton.export import ParquetExporter, uint256_from_bytes  # noqa: E402
+
+DAY = 86400
+WATCHMAKER = "0:" + "22" * 32
+
+
+def _tick(lt: int, created_at: int, price_raw: int = 3 * 2**64) -> CompactTickEvent:
+    return CompactTickEvent(
+        lt=lt,
+        hash=f"tx{lt}",
+        utime=created_at,
+        created_at=created_at,
+        watchmaker=WATCHMAKER,
+        base_asset_price=price_raw / 2**64,
+        base_asset_price_raw=price_raw,
+        new_alarm_id=lt,
+    )
+
+
+def test_exporter_closes_partitions_the_stream_has_moved_past(tmp_path):
+    exporter = ParquetExporter(str(tmp_path), batch_size=2)
+    start = 1700006400  # 2023-11-15 00:00 UTC
+    for day in range(5):
+        exporter.write_events([_tick(10 * day + i, start + day * DAY + i) for i in range(3)])
+    # only the partition of the latest day is still open
+    assert [date for table, date in exporter._writers] == ["2023-11-19"]
+    # a late row of a closed partition goes to a new part file
+    exporter.write_events([_tick(100, start), _tick(101, start + 4 * DAY + 10)])
+    exporter.close()
+
+    first_day = tmp_path / "events" / "date=2023-11-15"
+    assert sorted(path.name for path in first_day.iterdir()) == ["part-0.parquet", "part-1.parquet"]
+    table = pq.read_table(str(tmp_path / "events"))
+    assert table.num_rows == 17
+    assert sorted(table.column("lt").to_pylist()) == sorted([10 * day + i for day in range(5) for i in range(3)] + [100, 101])
+
+
+def test_exporter_keeps_every_uint256(tmp_path):
+    prices = [0, 3 * 2**64, 10**76 - 1, 10**76, 2**256 - 1]
+    exporter = ParquetExporter(str(tmp_path))
+    exporter.write_events([_tick(lt, 1700006400, price_raw=price) for lt, price in enumerate(prices)])
+    exporter.close()
+    column = pq.read_table(str(tmp_path / "events")).column("price_raw").to_pylist()
+    assert [uint256_from_bytes(value) for value in column] == prices
+
+
+def test_exporter_leaves_no_partial_write(tmp_path):
+    exporter = ParquetExporter(str(tmp_path))
+    with pytest.raises(ValueError, match="price_raw"):
+        exporter.write_events([_tick(1, 1700006400), _tick(2, 1700006400, price_raw=2**256)])
+    exporter.write_events([_tick(3, 1700006400)])
+    exporter.close()
+    assert pq.read_table(str(tmp_path / "events")).column("lt").to_pylist() == [3]
@@ -0,0 +1,114 @@
+import asyncio
+from typing import List, Optional
+
+import pytest
+from pytoncenter.exception import TonCenterException
+
+from ticton.failover import FailoverToncenter
+
+
+class StubEndpoint:
+    def __init__(self, url: str, delay: float = 0.0, error: Optional[Exception] = None):
+        self.base_url = url
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def get_account(self, req):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.base_url
+
+
+@pytest.mark.parametrize(
+    "first",
+    [StubEndpoint("a", error=TonCenterException(502, "Bad Gateway")), StubEndpoint("a", delay=1.0)],
+    ids=["5xx", "timeout"],
+)
+def test_failed_call_moves_on_to_next_endpoint(first: StubEndpoint):
+    async def main():
+        second = StubEndpoint("b")
+        toncenter = FailoverToncenter([first, second], timeout=0.05)  # type: ignore
+        assert await toncenter.get_account("addr") == "b"
+        assert (first.calls, second.calls) == (1, 1)
+        assert [stats.failures for stats in toncenter.stats] == [1, 0]
+
+    asyncio.run(main())
+
+
+def test_rejected_call_is_not_retried():
+    async def main():
+        first = StubEndpoint("a", error=TonCenterException(400, "Bad Request"))
+        second = StubEndpoint("b")
+        toncenter = FailoverToncenter([first, second])  # type: ignore
+        with pytest.raises(TonCenterException):
+            await toncenter.get_account("addr")
+        assert second.calls == 0
+
+    asyncio.run(main())
+
+
+def test_failing_endpoint_is_skipped_for_cooldown():
+    async def main():
+        first = StubEndpoint("a", error=TonCenterException(503, "Service Unavailable"))
+        second = StubEndpoint("b")
+        toncenter = FailoverToncenter([first, second], max_failures=3, cooldown=0.2)  # type: ignore
+        # a successful endpoint is ranked by its latency, keep the failing one first until it is down
+        results: List[str] = []
+        for _ in range(3):
+            results.append(await toncenter.get_account("addr"))
+            toncenter.endpoints[1].ewma = 1.0
+        assert results == ["b", "b", "b"]
+        assert first.calls == 3
+        assert [stats.healthy for stats in toncenter.stats] == [False, True]
+
+        for _ in range(5):
+            assert await toncenter.get_account("addr") == "b"
+        assert first.calls == 3
+
+        await asyncio.sleep(0.25)
+        first.error = None
+        toncenter.endpoints[1].ewma = 1.0
+        assert await toncenter.get_account("addr") == "a"
+        assert first.calls == 4
+        assert [stats.healthy for stats in toncenter.stats] == [True, True]
+
+    asyncio.run(main())
+
+
+def test_hedged_read_returns_faster_endpoint_and_cancels_slower():
+    async def main():
+        slow = StubEndpoint("slow", delay=1.0)
+        fast = StubEndpoint("fast", delay=0.01)
+        toncenter = FailoverToncenter([slow, fast], hedge=True, hedge_delay=0.02)  # type: ignore
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert await toncenter.get_account("addr") == "fast"
+        assert loop.time() - start < 0.5
+        # the cancellation reaches the losing read on the next iterations of the loop
+        await asyncio.sleep(0.01)
+        assert toncenter.hedged == 1
+        assert (slow.calls, fast.calls) == (1, 1)
+        assert slow.cancelled == 1
+        assert fast.cancelled == 0
+
+    asyncio.run(main())
+
+
+def test_fast_read_is_not_hedged():
+    async def main():
+        first = StubEndpoint("a", delay=0.0)
+        second = StubEndpoint("b")
+        toncenter = FailoverToncenter([first, second], hedge=True, hedge_delay=0.5)  # type: ignore
+        assert await toncenter.get_account("addr") == "a"
+        assert toncenter.hedged == 0
+        assert second.calls == 0
+
+    asyncio.run(main())
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List, Optional
+
+import pytest
+from pytoncenter.address import Address
+from pytoncenter.exception import TonCenterException
+from tonsdk.crypto import mnemonic_new
+
+from ticton import ChainCache
+
+from .conftest import USER, make_client
+
+DELAY = 0.1
+
+
+class DelayedToncenter:
+    """
+    DelayedToncenter answers every call after DELAY seconds, get_jetton_data is not supported
+    """
+
+    limiter = SimpleNamespace(max_rate=1000, time_period=1)
+
+    def __init__(self, seqno_error: Optional[Exception] = None):
+        self.seqno_error = seqno_error
+        self.calls: List[str] = []
+
+    async def _call(self, method: str, result):
+        self.calls.append(method)
+        await asyncio.sleep(DELAY)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    async def get_account(self, req):
+        return await self._call("get_account", SimpleNamespace(balance=10**12))
+
+    async def get_jetton_wallets(self, req):
+        return await self._call("get_jetton_wallets", SimpleNamespace(balance=10**12))
+
+    async def run_get_method(self, req):
+        return await self._call("run_get_method", TonCenterException(404, "get_jetton_data is not supported"))
+
+    async def get_wallet(self, req):
+        return await self._call("get_wallet", self.seqno_error or SimpleNamespace(seqno=1))
+
+    async def send_message(self, req):
+        return await self._call("send_message", SimpleNamespace(message_hash="hash"))
+
+    async def multicall(self, *coros):
+        return await asyncio.gather(*coros, return_exceptions=True)
+
+
+def _client(tmp_path, toncenter: DelayedToncenter):
+    cache = ChainCache(str(tmp_path / "cache.db"))
+    client = make_client([], toncenter=toncenter, mnemonics=" ".join(mnemonic_new()), cache=cache)
+    # the jetton wallet is known, only the wallet code is read
+    owner, master = Address(client.wallet.address.to_string()), Address(USER)  # type: ignore
+    cache.set(client.jetton_wallet_resolver.scope, f"jetton_wallet:{master.to_string(False)}:{owner.to_string(False)}", USER)
+    return client
+
+
+@pytest.mark.parametrize("action", ["tick", "wind"])
+def test_lookups_run_concurrently(tmp_path, caplog, action: str):
+    async def main():
+        toncenter = DelayedToncenter()
+        client = _client(tmp_path, toncenter)
+        start = time.monotonic()
+        with caplog.at_level("DEBUG", logger="tests.conftest"):
+            if action == "tick":
+                await client.tick(2.5)
+            else:
+                await client.wind(1, 1, 5.0, skip_estimate=True, need_base_asset=Decimal(10**9), need_quote_asset=Decimal(10**6))
+        elapsed = time.monotonic() - start
+        # the balances, the wallet code and the seqno are read in one round, then the message is sent
+        assert sorted(toncenter.calls) == ["get_account", "get_jetton_wallets", "get_wallet", "run_get_method", "send_message"]
+        assert 2 * DELAY <= elapsed < 3 * DELAY
+        # the critical path is one lookup and the send
+        report = next(record.getMessage() for record in caplog.records if "critical path" in record.getMessage())
+        latency, path = report.split("critical path ")[1].split("s: ")
+        assert 2 * DELAY <= float(latency) < 3 * DELAY
+        assert [node.split(" ")[0] for node in path.split(" -> ")][1:] == ["send"]
+
+    asyncio.run(main())
+
+
+def test_node_error_is_raised_by_the_action(tmp_path):
+    async def main():
+        toncenter = DelayedToncenter(seqno_error=TonCenterException(500, "seqno failed"))
+        client = _client(tmp_path, toncenter)
+        with pytest.raises(TonCenterException, match="seqno failed"):
+            await client.tick(2.5)
+        assert "send_message" not in toncenter.calls
+
+    asyncio.run(main())
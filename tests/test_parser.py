@@ -0,0 +1,87 @@
+import base64
+import itertools
+from typing import List, Optional
+
+import pytest
+from tonpy import CellSlice
+from pytoncenter.v3.models import Transaction
+from tonsdk.boc import Cell, begin_cell
+from tonsdk.boc._cell import deserialize_boc
+from tonsdk.utils import crc32c
+
+from ticton.parser import BOC_MAGIC, peek_opcode
+
+from .conftest import chime_transaction, chronoshift_transaction, jetton_mint, tick_transaction, tock
+
+
+def _tree(depth: int, counter: List[int]):
+    # distinct cells, a tree of depth 4 has 341 cells which need 2 bytes per cell index
+    counter[0] += 1
+    builder = begin_cell().store_uint(0x12345678, 32).store_uint(counter[0], 32)
+    for _ in range(4 if depth > 0 else 0):
+        builder.store_ref(_tree(depth - 1, counter))
+    return builder.end_cell()
+
+
+def _body(tx: Transaction):
+    return deserialize_boc(base64.b64decode(tx.in_msg.message_content.body))[0]  # type: ignore
+
+
+BODIES = {
+    "tick": _body(tick_transaction(1000, 1)),
+    "chime": _body(chime_transaction(1000, 1, [2])),
+    "chronoshift": _body(chronoshift_transaction(1000, 1)),
+    "tock": tock(1),
+    "jetton_mint": jetton_mint(10**9),
+    "comment": begin_cell().store_uint(0, 32).store_bytes(b"hello").end_cell(),
+    "tree": _tree(4, [0]),
+}
+
+
+def _serialize(cell: Cell, has_idx: bool, crc: bool, extra_root: Optional[int] = None) -> str:
+    """
+    _serialize writes the BOC of the cell with the index and CRC flags, extra_root adds the cell of that index as a second
+    root. tonsdk writes the index as cell sizes instead of offsets, and refs of more than 255 cells in one byte.
+    """
+    order, index = cell.tree_walk()
+    size = max((len(order).bit_length() + 7) // 8, 1)
+    cells = [node.get_data_with_descriptors() + b"".join(index[ref.bytes_hash()].to_bytes(size, "big") for ref in node.refs) for _, node in order]
+    offsets = list(itertools.accumulate(len(cell) for cell in cells))
+    off_bytes = max((offsets[-1].bit_length() + 7) // 8, 1)
+    roots = [0] if extra_root is None else [0, extra_root]
+    data = BOC_MAGIC + bytes([has_idx << 7 | crc << 6 | size, off_bytes])
+    data += b"".join(value.to_bytes(size, "big") for value in (len(cells), len(roots), 0)) + offsets[-1].to_bytes(off_bytes, "big")
+    data += b"".join(root.to_bytes(size, "big") for root in roots)
+    if has_idx:
+        data += b"".join(offset.to_bytes(off_bytes, "big") for offset in offsets)
+    data += b"".join(cells)
+    if crc:
+        data += crc32c(data)
+    return base64.b64encode(data).decode()
+
+
+@pytest.mark.parametrize("has_idx", [False, True], ids=["no_index", "index"])
+@pytest.mark.parametrize("crc", [False, True], ids=["no_crc", "crc"])
+@pytest.mark.parametrize("name", BODIES)
+def test_peek_opcode_agrees_with_cell_slice(name: str, has_idx: bool, crc: bool):
+    boc = _serialize(BODIES[name], has_idx, crc)
+    assert peek_opcode(boc) == CellSlice(boc).preload_uint(32)
+
+
+@pytest.mark.parametrize("has_idx", [False, True], ids=["no_index", "index"])
+@pytest.mark.parametrize("crc", [False, True], ids=["no_crc", "crc"])
+@pytest.mark.parametrize("name", ["tick", "chronoshift", "tree"])
+def test_peek_opcode_reads_first_of_several_roots(name: str, has_idx: bool, crc: bool):
+    # CellSlice does not load BOCs with several roots
+    boc = _serialize(BODIES[name], has_idx, crc, extra_root=1)
+    roots = deserialize_boc(base64.b64decode(boc))
+    assert len(roots) == 2
+    assert peek_opcode(boc) == int.from_bytes(bytes(roots[0].bits.array[:4]), "big")
+
+
+@pytest.mark.parametrize("bits", [0, 8, 31])
+def test_peek_opcode_of_short_body_is_none(bits: int):
+    cell = begin_cell().store_uint(1, bits).end_cell() if bits else begin_cell().end_cell()
+    boc = _serialize(cell, has_idx=False, crc=False)
+    assert CellSlice(boc).bits == bits
+    assert peek_opcode(boc) is None
@@ -0,0 +1,67 @@
+import asyncio
+import time
+from typing import List
+
+from ticton import AdaptivePolling
+from ticton.polling import MAX_PAGE_SIZE
+
+from .conftest import make_client, tick_transaction
+
+OLD = tick_transaction(1000, 1)
+RECENT = OLD.model_copy(update={"now": int(time.time())})
+
+
+def test_old_transactions_are_caught_up():
+    polling = AdaptivePolling(interval=2.0, catchup_pages=3)
+    assert polling.mode == "catchup"
+    assert polling.update([OLD], requested=128) == 0.0
+    assert polling.mode == "catchup" and polling.lag > polling.catchup_lag
+    assert (polling.limit(128), polling.pages) == (MAX_PAGE_SIZE, 3)
+
+
+def test_full_page_is_caught_up():
+    polling = AdaptivePolling(interval=2.0)
+    assert polling.update([RECENT] * 4, requested=4) == 0.0
+    assert polling.mode == "catchup"
+
+
+def test_recent_transactions_are_tailed():
+    polling = AdaptivePolling(interval=2.0)
+    assert polling.update([RECENT], requested=4) == 2.0
+    assert polling.mode == "tail" and polling.lag <= polling.catchup_lag
+    assert (polling.limit(128), polling.pages) == (128, 1)
+
+
+def test_idle_backs_off_up_to_max_interval():
+    polling = AdaptivePolling(interval=1.0, max_interval=5.0, backoff=2.0)
+    assert [polling.update([], requested=4) for _ in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+    assert polling.mode == "idle"
+    # a transaction resets the backoff
+    polling.update([RECENT], requested=4)
+    assert polling.update([], requested=4) == 1.0
+
+
+def test_catchup_prefetches_pages():
+    async def main():
+        txs = [tick_transaction(1000 + 10 * alarm_id, alarm_id) for alarm_id in range(10)]
+        client = make_client(txs)
+        stub = client.toncenter.toncenter.toncenter
+        limits: List[int] = []
+        get_transactions = stub.get_transactions
+
+        async def _get_transactions(req):
+            limits.append(req.limit)
+            return await get_transactions(req)
+
+        stub.get_transactions = _get_transactions
+        polling = AdaptivePolling(interval=0.01, catchup_pages=2)
+        alarm_ids: List[int] = []
+        async for event in client.events(limit=4, polling=polling):
+            alarm_ids.append(event.new_alarm_id)
+            if len(alarm_ids) == len(txs):
+                break
+        assert alarm_ids == list(range(10))
+        # the first poll is made of catchup_pages pages of the maximum size
+        assert limits[:2] == [MAX_PAGE_SIZE] * 2
+
+    asyncio.run(main())
@@ -0,0 +1,210 @@
+import asyncio
+import base64
+from typing import List
+
+import pytest
+from pytoncenter.address import Address
+from pytoncenter.v3.models import RunGetMethodResponse
+from tonsdk.boc import begin_cell, begin_dict
+from tonsdk.utils import Address as TonSdkAddress
+
+from ticton import ChainCache
+from ticton import cache as cache_module
+from ticton.resolver import AlarmAddressResolver, JettonWalletResolver
+
+ORACLE = "0:" + "11" * 32
+ALARM_CODE_ID = 222
+ALARM_CODE = begin_cell().store_uint(0xABCDEF, 24).store_ref(begin_cell().store_uint(7, 8).end_cell()).end_cell()
+ORACLE_CODE = begin_cell().store_uint(0x123456, 24).end_cell()
+JETTON_WALLET_CODE = begin_cell().store_uint(0x765432, 24).store_ref(begin_cell().store_uint(9, 8).end_cell()).end_cell()
+
+# the address getAlarmAddress returns for alarm 7 of the oracle data below
+KNOWN_ALARM_ID = 7
+KNOWN_ALARM_ADDRESS = "0:a731ac0e9408afa534a1408779d41857023c8ed7a59a9eb13b8f8759fb0b034c"
+
+
+def _sys_cell(codes):
+    codes_dict = begin_dict(16)
+    for key, code in codes:
+        codes_dict.store_ref(key, code)
+    return begin_cell().store_bit(1).store_ref(codes_dict.end_dict()).end_cell()
+
+
+def _oracle_data() -> str:
+    # the Tact sys cell of the oracle holds the codes of the contracts it deploys
+    sys = _sys_cell([(111, ORACLE_CODE), (ALARM_CODE_ID, ALARM_CODE)])
+    data = begin_cell().store_ref(sys).store_bit(1).store_uint(5, 64).end_cell()
+    return base64.b64encode(data.to_boc(False)).decode()
+
+
+def get_alarm_address(alarm_id: int) -> Address:
+    """
+    get_alarm_address builds the StateInit of the alarm the way the oracle contract does, it stands in for getAlarmAddress
+    """
+    data = begin_cell().store_ref(_sys_cell([(ALARM_CODE_ID, ALARM_CODE)])).store_bit(0).store_address(TonSdkAddress(ORACLE)).store_int(alarm_id, 257).end_cell()
+    state_init = begin_cell().store_uint(0b00110, 5).store_ref(ALARM_CODE).store_ref(data).end_cell()
+    return Address(f"0:{state_init.bytes_hash().hex()}")
+
+
+def get_wallet_address(owner: Address, master: Address, with_status: bool) -> Address:
+    """
+    get_wallet_address builds the StateInit of the jetton wallet the way the jetton master does, it stands in for
+    the get_wallet_address get-method
+    """
+    data = begin_cell()
+    if with_status:
+        data.store_uint(0, 4)
+    data.store_coins(0).store_address(TonSdkAddress(owner.to_string(False))).store_address(TonSdkAddress(master.to_string(False)))
+    if not with_status:
+        data.store_ref(JETTON_WALLET_CODE)
+    state_init = begin_cell().store_uint(0b00110, 5).store_ref(JETTON_WALLET_CODE).store_ref(data.end_cell()).end_cell()
+    return Address(f"{master.workchain}:{state_init.bytes_hash().hex()}")
+
+
+class StubToncenter:
+    def __init__(self):
+        self.accounts = 0
+        self.get_methods: List[str] = []
+
+    async def run_get_method(self, req):
+        self.get_methods.append(req.method)
+        code = base64.b64encode(JETTON_WALLET_CODE.to_boc(False)).decode()
+        return RunGetMethodResponse(
+            gas_used=0,
+            exit_code=0,
+            stack=[{"type": "num", "value": "0x0"}, {"type": "num", "value": "0x1"}, *[{"type": "cell", "value": code}] * 3],
+        )
+
+    async def get_account(self, req):
+        self.accounts += 1
+
+        class Account:
+            data = _oracle_data()
+
+        return Account()
+
+
+def test_known_alarm_address():
+    assert get_alarm_address(KNOWN_ALARM_ID) == Address(KNOWN_ALARM_ADDRESS)
+
+
+def test_local_address_matches_get_method_without_calling_it(tmp_path):
+    calls: List[int] = []
+
+    async def get_method(alarm_id: int) -> Address:
+        calls.append(alarm_id)
+        return get_alarm_address(alarm_id)
+
+    async def main():
+        scope = ChainCache.scope("mainnet", ORACLE)
+        cache = ChainCache(str(tmp_path / "cache.db"))
+        # the on-chain getAlarmAddress result of one alarm, e.g. from a previous run
+        cache.set(scope, f"alarm:{KNOWN_ALARM_ID}", KNOWN_ALARM_ADDRESS)
+        toncenter = StubToncenter()
+        resolver = AlarmAddressResolver(toncenter, Address(ORACLE), get_method, cache=cache, scope=scope)  # type: ignore
+
+        assert await resolver.resolve(KNOWN_ALARM_ID) == Address(KNOWN_ALARM_ADDRESS)
+        assert resolver.is_local
+        alarm_ids = list(range(-3, 1000))
+        assert await resolver.resolve_many(alarm_ids) == [get_alarm_address(alarm_id) for alarm_id in alarm_ids]
+        assert calls == []
+        assert toncenter.accounts == 1
+
+    asyncio.run(main())
+
+
+def test_get_method_is_called_once_to_verify_the_layout():
+    calls: List[int] = []
+
+    async def get_method(alarm_id: int) -> Address:
+        calls.append(alarm_id)
+        return get_alarm_address(alarm_id)
+
+    async def main():
+        resolver = AlarmAddressResolver(StubToncenter(), Address(ORACLE), get_method)  # type: ignore
+        alarm_ids = list(range(500))
+        assert await resolver.resolve_many(alarm_ids) == [get_alarm_address(alarm_id) for alarm_id in alarm_ids]
+        assert resolver.is_local
+        assert calls == [0]
+
+    asyncio.run(main())
+
+
+def _owners(count: int) -> List[Address]:
+    return [Address(f"{i % 2 - 1}:{i:064x}") for i in range(count)]
+
+
+@pytest.mark.parametrize("with_status", [False, True], ids=["reference", "stablecoin"])
+@pytest.mark.parametrize("master", ["0:" + "33" * 32, "-1:" + "44" * 32], ids=["basechain", "masterchain"])
+def test_local_jetton_wallet_matches_get_method(with_status: bool, master: str):
+    calls: List[Address] = []
+
+    async def get_method(owner: Address, master: Address) -> Address:
+        calls.append(owner)
+        return get_wallet_address(owner, master, with_status)
+
+    async def main():
+        toncenter = StubToncenter()
+        resolver = JettonWalletResolver(toncenter, get_method)  # type: ignore
+        owners = _owners(50)
+        assert [await resolver.resolve(owner, master) for owner in owners] == [get_wallet_address(owner, Address(master), with_status) for owner in owners]
+        # the get-method only verifies the layout, the wallet code is read once
+        assert calls == owners[:1]
+        assert toncenter.get_methods == ["get_jetton_data"]
+
+    asyncio.run(main())
+
+
+def test_jetton_wallet_layout_is_persisted(tmp_path):
+    master = Address("-1:" + "44" * 32)
+    calls: List[Address] = []
+
+    async def get_method(owner: Address, master: Address) -> Address:
+        calls.append(owner)
+        return get_wallet_address(owner, master, True)
+
+    async def resolve(owners: List[Address]) -> List[Address]:
+        cache = ChainCache(str(tmp_path / "cache.db"))
+        toncenter = StubToncenter()
+        resolver = JettonWalletResolver(toncenter, get_method, cache=cache, scope=ChainCache.scope("mainnet", ORACLE))  # type: ignore
+        try:
+            return [await resolver.resolve(owner, master) for owner in owners]
+        finally:
+            cache.close()
+
+    owners = _owners(10)
+    expected = [get_wallet_address(owner, master, True) for owner in owners]
+    assert asyncio.run(resolve(owners)) == expected
+    # a restarted resolver neither calls the get-method nor reads the wallet code
+    calls.clear()
+    assert asyncio.run(resolve(owners[::-1])) == expected[::-1]
+    assert calls == []
+
+
+def test_chain_cache_scopes(tmp_path):
+    cache = ChainCache(str(tmp_path / "cache.db"))
+    mainnet, testnet = ChainCache.scope("mainnet", ORACLE), ChainCache.scope("testnet", ORACLE)
+    other_oracle = ChainCache.scope("mainnet", "0:" + "55" * 32)
+    assert len({mainnet, testnet, other_oracle}) == 3
+    cache.set(mainnet, "alarm:1", "0:" + "aa" * 32)
+    cache.set(testnet, "alarm:1", "0:" + "bb" * 32)
+    assert cache.get(mainnet, "alarm:1") == "0:" + "aa" * 32
+    assert cache.get(testnet, "alarm:1") == "0:" + "bb" * 32
+    assert cache.get(other_oracle, "alarm:1") is None
+    # a value is replaced, not duplicated
+    cache.set(mainnet, "alarm:1", {"code": [1, "ff"]})
+    assert cache.get(mainnet, "alarm:1") == {"code": [1, "ff"]}
+
+
+def test_chain_cache_persists_until_the_version_changes(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.db")
+    cache = ChainCache(path)
+    cache.set(ChainCache.scope("mainnet", ORACLE), "alarm_layout", {"oracle_first": True})
+    cache.close()
+
+    reopened = ChainCache(path)
+    assert reopened.get(ChainCache.scope("mainnet", ORACLE), "alarm_layout") == {"oracle_first": True}
+    # entries written by an incompatible version are never read
+    monkeypatch.setattr(cache_module, "CACHE_VERSION", cache_module.CACHE_VERSION + 1)
+    assert reopened.get(ChainCache.scope("mainnet", ORACLE), "alarm_layout") is None
+    reopened.close()
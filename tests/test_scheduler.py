@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import List, Optional
+
+from pytoncenter.exception import TonCenterException
+
+from ticton.scheduler import Priority, RpcScheduler, rpc_priority
+
+
+class StubToncenter:
+    def __init__(self, rate_limited: Optional[str] = None):
+        # the call that is rejected with 429 once
+        self.rate_limited = rate_limited
+        self.calls: List[str] = []
+
+    async def get_account(self, req: str):
+        self.calls.append(req)
+        if req == self.rate_limited:
+            self.rate_limited = None
+            raise TonCenterException(429, "Too Many Requests")
+        return req
+
+
+async def _read(scheduler: RpcScheduler, priority: Priority, req: str):
+    with rpc_priority(priority):
+        return await scheduler.get_account(req)
+
+
+async def _run(scheduler: RpcScheduler, calls: List[tuple]):
+    # every call is queued before the dispatcher hands out the first token
+    await asyncio.gather(*[_read(scheduler, priority, req) for priority, req in calls])
+
+
+def test_urgent_lane_is_served_first():
+    async def main():
+        stub = StubToncenter()
+        scheduler = RpcScheduler(stub, rate=1000, burst=1, headroom=0)  # type: ignore
+        await _run(scheduler, [(Priority.BULK, "bulk"), (Priority.SUBSCRIBE, "subscribe"), (Priority.ESTIMATE, "estimate"), (Priority.SEND, "send")])
+        assert stub.calls == ["send", "estimate", "subscribe", "bulk"]
+
+    asyncio.run(main())
+
+
+def test_lanes_share_the_rate_by_weight():
+    async def main():
+        stub = StubToncenter()
+        scheduler = RpcScheduler(stub, rate=1000, burst=1, headroom=0)  # type: ignore
+        await _run(scheduler, [(Priority.BULK, "bulk")] * 20 + [(Priority.SUBSCRIBE, "subscribe")] * 20)
+        # SUBSCRIBE has 4 times the weight of BULK, BULK is still served while SUBSCRIBE is waiting
+        assert stub.calls[:10].count("subscribe") == 8
+        assert stub.calls[:10].count("bulk") == 2
+        assert scheduler.metrics.dispatched["bulk"] == scheduler.metrics.dispatched["subscribe"] == 20
+
+    asyncio.run(main())
+
+
+def test_headroom_is_left_to_actions():
+    async def main():
+        stub = StubToncenter()
+        scheduler = RpcScheduler(stub, rate=10, burst=2, headroom=1)  # type: ignore
+        await _read(scheduler, Priority.BULK, "bulk1")
+        # the last token is left to the actions, the BULK call waits for the bucket to refill
+        bulk = asyncio.create_task(_read(scheduler, Priority.BULK, "bulk2"))
+        await asyncio.sleep(0.01)
+        assert stub.calls == ["bulk1"]
+        start = time.monotonic()
+        await _read(scheduler, Priority.ESTIMATE, "estimate")
+        assert time.monotonic() - start < 0.05
+        await bulk
+        assert stub.calls == ["bulk1", "estimate", "bulk2"]
+
+    asyncio.run(main())
+
+
+def test_rate_limited_call_is_retried_first_after_backoff():
+    async def main():
+        stub = StubToncenter(rate_limited="first")
+        scheduler = RpcScheduler(stub, rate=20, burst=1, headroom=0, backoff=0.1)  # type: ignore
+        start = time.monotonic()
+        await _run(scheduler, [(Priority.SUBSCRIBE, "first"), (Priority.SUBSCRIBE, "second"), (Priority.SUBSCRIBE, "third")])
+        # the rejected call goes back to the front of its lane and waits for the backoff
+        assert stub.calls == ["first", "first", "second", "third"]
+        assert time.monotonic() - start >= 0.05
+        assert scheduler.metrics.rate_limited == 1
+
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+import asyncio
+from typing import List
+
+from pytoncenter.address import Address
+
+from ticton import EventStore
+
+from .conftest import USER, chime_transaction, chronoshift_transaction, make_client, tick_transaction
+
+# alarm 1 is wound into 5, which is wound into 6 and then rung, alarm 2 is an unrelated tick
+TXS = [
+    tick_transaction(1000, 1),
+    chime_transaction(1010, 1, [5]),
+    chime_transaction(1020, 5, [6]),
+    tick_transaction(1030, 2),
+    chronoshift_transaction(1040, 5, reward=3 * 10**9),
+]
+
+
+async def _subscribe(store: EventStore) -> list:
+    events: List = []
+
+    async def on_event(event):
+        events.append(event)
+
+    client = make_client(TXS)
+    task = asyncio.create_task(client.subscribe(interval=0.01, on_tick_success=on_event, on_wind_success=on_event, on_ring_success=on_event, store=store))
+    while store.latest_lt() != TXS[-1].lt and not task.done():
+        await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return events
+
+
+def test_subscribe_writes_the_events_of_every_page():
+    store = EventStore()
+    events = asyncio.run(_subscribe(store))
+    assert [event.tx.lt for event in events] == [tx.lt for tx in TXS]
+    assert store.latest_lt() == 1040
+    # the stored events are the ones delivered to the callbacks
+    assert store.events_between(0, 2**32) == events
+
+    tick, wind, rewind, _, ring = events
+    assert store.events_by_alarm(5) == [rewind, ring]
+    assert store.events_by_alarm(1) == [tick, wind]
+    assert ring.reward == 3.0
+
+
+def test_alarm_lineage_follows_winds_to_the_first_tick():
+    store = EventStore()
+    tick, wind, rewind, _, ring = asyncio.run(_subscribe(store))
+    assert store.alarm_lineage(6) == [tick, wind, rewind, ring]
+    assert store.alarm_lineage(1) == [tick, wind]
+    assert store.alarm_lineage(2) == store.events_by_alarm(2)
+
+
+def test_alarms_by_watchmaker_normalizes_the_address():
+    store = EventStore()
+    asyncio.run(_subscribe(store))
+    assert store.alarms_by_watchmaker(USER) == [1, 5, 6, 2]
+    assert store.alarms_by_watchmaker(Address(USER).to_string(True)) == [1, 5, 6, 2]
+    assert store.alarms_by_watchmaker("0:" + "33" * 32) == []
+
+
+def test_write_is_idempotent(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path)
+    events = asyncio.run(_subscribe(store))
+    store.write(events)
+    store.close()
+
+    # the events survive a restart, writing them again adds nothing
+    store = EventStore(path)
+    store.write(events[:2])
+    assert store.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == len(events)
+    assert store.events_between(0, 2**32) == events
+    store.close()
+
+
+def test_empty_store():
+    store = EventStore()
+    assert store.latest_lt() is None
+    assert store.events_by_alarm(1) == []
+    assert store.alarm_lineage(1) == []
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import List
+
+import pytest
+
+from ticton import CallbackDispatcher, SQLiteCheckpointStore
+from ticton.client import SubscribeParam, TicTonAsyncClient
+
+from .conftest import ORACLE, make_client, tick_transaction, tock, transaction
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4])
+@pytest.mark.parametrize("pages", [1, 3])
+def test_cursor_pages_every_transaction_once(limit: int, pages: int):
+    async def main():
+        txs = [tick_transaction(1000 + 10 * alarm_id, alarm_id) for alarm_id in range(10)]
+        client = make_client(txs)
+        params = SubscribeParam(limit=limit, account=ORACLE)
+        seen: List[int] = []
+        while True:
+            page = await client._fetch_next_page(params, pages=pages)
+            if len(page) == 0:
+                break
+            assert len(page) <= limit * pages
+            assert (params.start_lt, params.last_hash) == (page[-1].lt, page[-1].hash)
+            seen += [tx.lt for tx in page]
+            if len(seen) >= 5 and len(txs) == 10:
+                # a transaction that lands between polls is picked up after the cursor
+                txs.append(tick_transaction(1200, 20))
+                client.toncenter.toncenter.toncenter.txs.append(txs[-1])
+        assert seen == [tx.lt for tx in txs]
+
+    asyncio.run(main())
+
+
+async def _subscribe_until(client: TicTonAsyncClient, delivered: List[int], count: int, **kwargs):
+    task = asyncio.create_task(client.subscribe(start_lt="checkpoint", interval=0.01, limit=3, **kwargs))
+    while len(delivered) < count and not task.done():
+        await asyncio.sleep(0.01)
+    # let the checkpoint of the last page be saved
+    await asyncio.sleep(0.05)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.parametrize("dispatched", [False, True])
+def test_checkpoint_is_held_before_failed_callback(tmp_path, caplog, dispatched: bool):
+    txs = [tick_transaction(1000 + 10 * alarm_id, alarm_id) for alarm_id in range(10)]
+    path = str(tmp_path / "checkpoint.db")
+    delivered: List[int] = []
+    failed: List[int] = []
+
+    async def on_tick(event):
+        delivered.append(event.new_alarm_id)
+        if event.new_alarm_id == 4 and not failed:
+            failed.append(event.new_alarm_id)
+            raise RuntimeError("callback failed")
+
+    async def run(count: int):
+        checkpoint = SQLiteCheckpointStore(path)
+        dispatcher = CallbackDispatcher(2) if dispatched else None
+        await _subscribe_until(make_client(txs), delivered, count, on_tick_success=on_tick, checkpoint=checkpoint, dispatcher=dispatcher)
+        return checkpoint.load(ORACLE)
+
+    with caplog.at_level(logging.WARNING):
+        saved = asyncio.run(run(10))
+    # every event is delivered, but the checkpoint stays before the alarm whose callback failed
+    assert sorted(delivered) == list(range(10))
+    assert saved is not None and saved.lt == 1030
+    assert any("callback failed" in record.getMessage() for record in caplog.records)
+
+    # after restart the failed event and the ones after it are delivered again
+    delivered.clear()
+    saved = asyncio.run(run(6))
+    assert sorted(delivered) == list(range(4, 10))
+    assert saved is not None and saved.lt == 1090
+
+
+def test_checkpoint_is_held_before_undelivered_event(tmp_path):
+    txs = [tick_transaction(1000 + 10 * alarm_id, alarm_id) for alarm_id in range(6)]
+    destinations = {tx.out_msgs[0].hash: transaction(2000 + tx.lt, tock(alarm_id)) for alarm_id, tx in enumerate(txs)}
+    path = str(tmp_path / "checkpoint.db")
+    delivered: List[int] = []
+
+    async def on_tick(event):
+        delivered.append(event.new_alarm_id)
+
+    async def run(count: int, destinations):
+        checkpoint = SQLiteCheckpointStore(path)
+        client = make_client(txs, destinations)
+        await _subscribe_until(client, delivered, count, on_tick_success=on_tick, checkpoint=checkpoint, confirm_delivery=True)
+        return checkpoint.load(ORACLE)
+
+    # the Tock of alarm 3 is not delivered yet, the checkpoint stays before it
+    saved = asyncio.run(run(5, {hash: tx for hash, tx in destinations.items() if hash != txs[3].out_msgs[0].hash}))
+    assert delivered == [0, 1, 2, 4, 5]
+    assert saved is not None and saved.lt == 1020
+
+    # once it is delivered, the event is reported after restart
+    delivered.clear()
+    saved = asyncio.run(run(3, destinations))
+    assert delivered == [3, 4, 5]
+    assert saved is not None and saved.lt == 1050
@@ -0,0 +1,131 @@
+import asyncio
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from pytoncenter.address import Address
+from tonsdk.contract.wallet import Wallets, WalletVersionEnum
+
+from ticton.wallet import WalletPool, WalletSequencer
+
+WALLET = Address("0:" + "1" * 64)
+
+
+class StubToncenter:
+    def __init__(self, seqno: int):
+        self.seqno = seqno
+        self.reads = 0
+
+    async def get_wallet(self, req):
+        self.reads += 1
+        return SimpleNamespace(seqno=self.seqno)
+
+
+async def _reserve(sequencer: WalletSequencer, fail: bool = False) -> int:
+    try:
+        async with sequencer.reserve() as reservation:
+            if fail:
+                raise RuntimeError("send failed")
+            return reservation.seqno
+    except RuntimeError:
+        return reservation.seqno
+
+
+def test_sequencer_hands_out_consecutive_seqnos():
+    async def main():
+        toncenter = StubToncenter(seqno=5)
+        sequencer = WalletSequencer(toncenter, WALLET)  # type: ignore
+        seqnos = [await _reserve(sequencer) for _ in range(3)]
+        assert seqnos == [5, 6, 7]
+        assert toncenter.reads == 1
+
+    asyncio.run(main())
+
+
+def test_failed_send_keeps_the_other_reservations():
+    async def main():
+        toncenter = StubToncenter(seqno=5)
+        sequencer = WalletSequencer(toncenter, WALLET)  # type: ignore
+        assert await _reserve(sequencer) == 5
+        with pytest.raises(RuntimeError):
+            async with sequencer.reserve() as failed:
+                async with sequencer.reserve() as later:
+                    assert (failed.seqno, later.seqno) == (6, 7)
+                raise RuntimeError("send failed")
+        # 5 and 7 are in flight, the failed 6 is handed out again before 8, never the on-chain 5
+        assert await _reserve(sequencer) == 6
+        assert await _reserve(sequencer) == 8
+        assert toncenter.reads == 2
+
+    asyncio.run(main())
+
+
+def test_failed_last_reservation_is_rolled_back():
+    async def main():
+        toncenter = StubToncenter(seqno=5)
+        sequencer = WalletSequencer(toncenter, WALLET)  # type: ignore
+        assert await _reserve(sequencer) == 5
+        assert await _reserve(sequencer, fail=True) == 6
+        assert sequencer.next_seqno == 6
+        assert await _reserve(sequencer) == 6
+        assert await _reserve(sequencer) == 7
+
+    asyncio.run(main())
+
+
+def test_failed_send_that_reached_the_wallet_is_not_reused():
+    async def main():
+        toncenter = StubToncenter(seqno=5)
+        sequencer = WalletSequencer(toncenter, WALLET)  # type: ignore
+        assert await _reserve(sequencer, fail=True) == 5
+        # the send timed out, but the message was accepted
+        toncenter.seqno = 6
+        assert await _reserve(sequencer) == 6
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("landed", [0, 1, 2])
+def test_resync_keeps_live_reservations(landed: int):
+    async def main():
+        toncenter = StubToncenter(seqno=10)
+        sequencer = WalletSequencer(toncenter, WALLET)  # type: ignore
+        for _ in range(3):
+            await _reserve(sequencer)
+        toncenter.seqno = 10 + landed
+        assert await _reserve(sequencer, fail=True) == 13
+        assert await _reserve(sequencer) == 13
+
+    asyncio.run(main())
+
+
+def test_pool_checks_every_wallet_at_once():
+    async def main():
+        pool = WalletPool([Wallets.create(WalletVersionEnum.v4r2, workchain=0)[3] for _ in range(3)])
+        pool.wallets[0].in_flight = 1
+        broke = {pool.wallets[1].address.to_string(), pool.wallets[2].address.to_string()}
+        running = []
+        peak = []
+
+        async def afford(wallet, need_base_asset, need_quote_asset):
+            running.append(wallet)
+            await asyncio.sleep(0.01)
+            peak.append(len(running))
+            running.remove(wallet)
+            if wallet.address.to_string() in broke:
+                raise ValueError(wallet.address.to_string())
+
+        # only the most loaded wallet can afford the action, all wallets are checked in one round
+        async with pool.acquire(Decimal(1), Decimal(0), afford) as wallet:
+            assert wallet is pool.wallets[0]
+            assert wallet.reserved_base_asset == Decimal(1)
+        assert peak == [3, 2, 1]
+        assert pool.wallets[0].reserved_base_asset == Decimal(0)
+
+        # the error of the least loaded wallet is raised when no wallet can afford the action
+        broke.add(pool.wallets[0].address.to_string())
+        with pytest.raises(ValueError, match=pool.wallets[1].address.to_string()):
+            async with pool.acquire(Decimal(1), Decimal(0), afford):
+                pass
+
+    asyncio.run(main())
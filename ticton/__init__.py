@@ -1,14 +1,68 @@
-from .arithmetic import FixedFloat, to_token, token_to_float
-from .client import DryRunResult, TicTonAsyncClient
+from .arithmetic import FixedFloat, FixedFloatArray, passes_threshold, to_token, token_to_float
+from .backfill import Backfill
+from .batch import BatchDecoder
+from .cache import ChainCache
+from .callbacks import (
+    CompactRingEvent,
+    CompactTickEvent,
+    CompactWindEvent,
+    OnRingSuccessParams,
+    OnTickSuccessParams,
+    OnWindSuccessParams,
+)
+from .checkpoint import CheckpointStore, FileCheckpointStore, SQLiteCheckpointStore
+from .coalesce import CoalescingMetrics, CoalescingToncenter
+from .client import BatchItemResult, DryRunResult, TicTonAsyncClient
+from .dispatcher import CallbackDispatcher, DispatcherMetrics
+from .failover import EndpointStats, FailoverToncenter
+from .graph import ActionGraph
+from .polling import AdaptivePolling
+from .resolver import AlarmAddressResolver, JettonWalletResolver
+from .scheduler import Priority, RpcScheduler, SchedulerMetrics, rpc_priority
+from .store import EventStore
+from .wallet import PoolWallet, WalletPool, WalletSequencer
 
 __version__ = "0.1.26"
 
 __all__ = [
     "FixedFloat",
+    "FixedFloatArray",
+    "passes_threshold",
     "to_token",
     "token_to_float",
     "TicTonAsyncClient",
     "TonCenterClient",
     "ToncenterWrongResult",
     "DryRunResult",
+    "BatchItemResult",
+    "CheckpointStore",
+    "FileCheckpointStore",
+    "SQLiteCheckpointStore",
+    "CoalescingMetrics",
+    "CoalescingToncenter",
+    "CallbackDispatcher",
+    "DispatcherMetrics",
+    "EndpointStats",
+    "FailoverToncenter",
+    "AdaptivePolling",
+    "ActionGraph",
+    "AlarmAddressResolver",
+    "JettonWalletResolver",
+    "Priority",
+    "RpcScheduler",
+    "SchedulerMetrics",
+    "rpc_priority",
+    "Backfill",
+    "BatchDecoder",
+    "ChainCache",
+    "EventStore",
+    "PoolWallet",
+    "WalletPool",
+    "WalletSequencer",
+    "OnTickSuccessParams",
+    "OnWindSuccessParams",
+    "OnRingSuccessParams",
+    "CompactTickEvent",
+    "CompactWindEvent",
+    "CompactRingEvent",
 ]
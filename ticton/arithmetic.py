@@ -1,49 +1,137 @@
-from typing import Union
 from decimal import Decimal
+from functools import lru_cache
+from typing import Iterable, Iterator, Tuple, Union
 
-__all__ = ["FixedFloat", "to_token", "token_to_float"]
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+__all__ = [
+    "FixedFloat",
+    "FixedFloatArray",
+    "passes_threshold",
+    "to_token",
+    "token_to_float",
+    "ROUND_FLOOR",
+    "ROUND_CEIL",
+    "ROUND_DOWN",
+    "ROUND_HALF_UP",
+]
+
+
+ROUND_FLOOR = "floor"
+ROUND_CEIL = "ceil"
+ROUND_DOWN = "down"
+ROUND_HALF_UP = "half_up"
+ROUNDING_MODES = (ROUND_FLOOR, ROUND_CEIL, ROUND_DOWN, ROUND_HALF_UP)
+
+Number = Union[int, float, str, Decimal]
+
+
+@lru_cache(maxsize=None)
+def _scale(base: int, precision: int) -> int:
+    return 1 << precision if base == 2 else base**precision
+
+
+def _ratio(value: Number) -> Tuple[int, int]:
+    """
+    _ratio converts the value into an exact (numerator, denominator) pair
+    """
+    if isinstance(value, int):
+        return value, 1
+    if isinstance(value, str):
+        value = Decimal(value)
+    return value.as_integer_ratio()
+
+
+def _div(numerator: int, denominator: int, rounding: str) -> int:
+    """
+    _div divides two integers with the rounding mode, floor is the default rounding of TVM division
+    and half_up is the rounding of TVM muldivr
+    """
+    if denominator < 0:
+        numerator, denominator = -numerator, -denominator
+    if rounding == ROUND_FLOOR:
+        return numerator // denominator
+    if rounding == ROUND_CEIL:
+        return -(-numerator // denominator)
+    if rounding == ROUND_DOWN:
+        quotient = abs(numerator) // denominator
+        return quotient if numerator >= 0 else -quotient
+    return (2 * numerator + denominator) // (2 * denominator)
 
 
 class FixedFloat:
+    """
+    FixedFloat is a fixed point number backed by an integer raw_value, i.e. value * base ** precision. The arithmetic
+    is exact integer math, results that are not integers are rounded by the rounding mode, which is floor by default
+    to match the integer division of the contract.
+    """
+
+    __slots__ = ("raw_value", "precision", "base", "factor", "rounding")
+
     def __init__(
         self,
-        value: Union[int, float, str, Decimal, "FixedFloat"],
+        value: Union[Number, "FixedFloat"],
         *,
         precision: int = 64,
         base: int = 2,
         skip_scale: bool = False,
+        rounding: str = ROUND_FLOOR,
     ):
         assert isinstance(
             value, (int, float, str, Decimal, FixedFloat)
         ), "Invalid type for FixedFloat, must be int, float, str, or Decimal"
+        assert rounding in ROUNDING_MODES, f"rounding must be one of {ROUNDING_MODES}"
+        self.base = base
+        self.precision = precision
+        self.factor = _scale(base, precision)
+        self.rounding = rounding
         if isinstance(value, FixedFloat):
             assert value.precision == precision, "Precision must match for FixedFloat"
             assert value.base == base, "Base must match for FixedFloat"
             self.raw_value = value.raw_value
-            return
-
-        self.base = base
-        self.precision = precision
-        self.factor = Decimal(base) ** precision
-        if skip_scale:
-            self.raw_value = Decimal(value)
+        elif skip_scale:
+            self.raw_value = value if isinstance(value, int) else _div(*_ratio(value), rounding)
         else:
             self.raw_value = self._cast(value)
 
-    def _cast(self, value: Union[int, float, str, Decimal]) -> Decimal:
-        return Decimal(value) * self.factor
+    def _new(self, raw_value: int) -> "FixedFloat":
+        result = FixedFloat.__new__(FixedFloat)
+        result.raw_value = raw_value
+        result.precision = self.precision
+        result.base = self.base
+        result.factor = self.factor
+        result.rounding = self.rounding
+        return result
+
+    def _cast(self, value: Number) -> int:
+        if isinstance(value, int):
+            return value * self.factor
+        numerator, denominator = _ratio(value)
+        return _div(numerator * self.factor, denominator, self.rounding)
+
+    def _pair(self, other) -> Tuple[int, int]:
+        """
+        _pair returns the raw values of self and other scaled to the same denominator, so they compare exactly
+        """
+        if isinstance(other, FixedFloat):
+            return self.raw_value, other.raw_value
+        numerator, denominator = _ratio(other)
+        return self.raw_value * denominator, numerator * self.factor
 
     def to_float(self) -> float:
         """
         Convert fixed point number to float in human readable format
         """
-        return float(Decimal(self.raw_value) / self.factor)
+        return self.raw_value / self.factor
 
     def to_int(self) -> int:
         """
         Convert fixed point number to bigint in human readable format
         """
-        return int(Decimal(self.raw_value).to_integral_value() // self.factor)
+        return _div(self.raw_value, self.factor, ROUND_DOWN)
 
     def __repr__(self):
         return f"FixedFloat(raw_value={self.raw_value}, human_format={self.to_float()})"
@@ -53,53 +141,26 @@ class FixedFloat:
 
     def __add__(self, other):
         if isinstance(other, FixedFloat):
-            return FixedFloat(
-                self.raw_value + other.raw_value,
-                precision=self.precision,
-                base=self.base,
-                skip_scale=True,
-            )
+            return self._new(self.raw_value + other.raw_value)
         elif isinstance(other, (int, float, str, Decimal)):
-            return FixedFloat(
-                self.raw_value + self._cast(other),
-                precision=self.precision,
-                base=self.base,
-                skip_scale=True,
-            )
+            return self._new(self.raw_value + self._cast(other))
         raise TypeError(f"Cannot add FixedFloat and {type(other)}")
 
     def __sub__(self, other):
         if isinstance(other, FixedFloat):
-            return FixedFloat(
-                self.raw_value - other.raw_value,
-                precision=self.precision,
-                base=self.base,
-                skip_scale=True,
-            )
+            return self._new(self.raw_value - other.raw_value)
         elif isinstance(other, (int, float, str, Decimal)):
-            return FixedFloat(
-                self.raw_value - self._cast(other),
-                precision=self.precision,
-                base=self.base,
-                skip_scale=True,
-            )
+            return self._new(self.raw_value - self._cast(other))
         raise TypeError(f"Cannot subtract FixedFloat and {type(other)}")
 
     def __mul__(self, other):
         if isinstance(other, FixedFloat):
-            return FixedFloat(
-                self.raw_value * other.raw_value / self.factor,
-                precision=self.precision,
-                base=self.base,
-                skip_scale=True,
-            )
-        elif isinstance(other, (int, float, str, Decimal)):
-            return FixedFloat(
-                self.raw_value * Decimal(other),
-                precision=self.precision,
-                base=self.base,
-                skip_scale=True,
-            )
+            return self._new(_div(self.raw_value * other.raw_value, self.factor, self.rounding))
+        elif isinstance(other, int):
+            return self._new(self.raw_value * other)
+        elif isinstance(other, (float, str, Decimal)):
+            numerator, denominator = _ratio(other)
+            return self._new(_div(self.raw_value * numerator, denominator, self.rounding))
         raise TypeError(f"Cannot multiply FixedFloat and {type(other)}")
 
     def __rmul__(self, other):
@@ -107,85 +168,275 @@ class FixedFloat:
 
     def __truediv__(self, other):
         if isinstance(other, FixedFloat):
-            return FixedFloat(
-                self.raw_value / other.raw_value,
-                precision=self.precision,
-                base=self.base,
-            )
+            return self._new(_div(self.raw_value * self.factor, other.raw_value, self.rounding))
         elif isinstance(other, (int, float, str, Decimal)):
-            return FixedFloat(
-                self.raw_value / Decimal(other),
-                precision=self.precision,
-                base=self.base,
-                skip_scale=True,
-            )
+            numerator, denominator = _ratio(other)
+            return self._new(_div(self.raw_value * denominator, numerator, self.rounding))
         raise TypeError(f"Cannot divide FixedFloat and {type(other)}")
 
     def __floordiv__(self, other):
         if isinstance(other, FixedFloat):
-            return FixedFloat(
-                self.raw_value // other.raw_value,
-                precision=self.precision,
-                base=self.base,
-            )
+            return self._new(self.raw_value // other.raw_value * self.factor)
         elif isinstance(other, (int, float, str, Decimal)):
-            return FixedFloat(
-                self.raw_value // Decimal(other),
-                precision=self.precision,
-                base=self.base,
-                skip_scale=True,
-            )
+            numerator, denominator = _ratio(other)
+            return self._new(_div(self.raw_value * denominator, numerator, ROUND_FLOOR))
         raise TypeError(f"Cannot divide FixedFloat and {type(other)}")
 
     def __abs__(self) -> "FixedFloat":
-        return FixedFloat(abs(self.raw_value), precision=self.precision, base=self.base)
+        # the absolute raw value is scaled again, as it always has been, see _estimate_wind
+        return self._new(abs(self.raw_value) * self.factor)
 
     def __eq__(self, other) -> bool:
-        if isinstance(other, FixedFloat):
-            return self.raw_value == other.raw_value
-        elif isinstance(other, (int, float, str, Decimal)):
-            return self.raw_value == self._cast(other)
+        if isinstance(other, (FixedFloat, int, float, str, Decimal)):
+            lhs, rhs = self._pair(other)
+            return lhs == rhs
         raise TypeError(f"Cannot compare FixedFloat and {type(other)}")
 
     def __ne__(self, other) -> bool:
-        if isinstance(other, FixedFloat):
-            return self.raw_value != other.raw_value
-        elif isinstance(other, (int, float, str, Decimal)):
-            return self.raw_value != self._cast(other)
+        if isinstance(other, (FixedFloat, int, float, str, Decimal)):
+            lhs, rhs = self._pair(other)
+            return lhs != rhs
         raise TypeError(f"Cannot compare FixedFloat and {type(other)}")
 
     def __lt__(self, other) -> bool:
-        if isinstance(other, FixedFloat):
-            return self.raw_value < other.raw_value
-        elif isinstance(other, (int, float, str, Decimal)):
-            return self.raw_value < self._cast(other)
+        if isinstance(other, (FixedFloat, int, float, str, Decimal)):
+            lhs, rhs = self._pair(other)
+            return lhs < rhs
         raise TypeError(f"Cannot compare FixedFloat and {type(other)}")
 
     def __gt__(self, other) -> bool:
-        if isinstance(other, FixedFloat):
-            return self.raw_value > other.raw_value
-        elif isinstance(other, (int, float, str, Decimal)):
-            return self.raw_value > self._cast(other)
+        if isinstance(other, (FixedFloat, int, float, str, Decimal)):
+            lhs, rhs = self._pair(other)
+            return lhs > rhs
         raise TypeError(f"Cannot compare FixedFloat and {type(other)}")
 
     def __le__(self, other) -> bool:
-        if isinstance(other, FixedFloat):
-            return self.raw_value <= other.raw_value
-        elif isinstance(other, (int, float, str, Decimal)):
-            return self.raw_value <= self._cast(other)
+        if isinstance(other, (FixedFloat, int, float, str, Decimal)):
+            lhs, rhs = self._pair(other)
+            return lhs <= rhs
         raise TypeError(f"Cannot compare FixedFloat and {type(other)}")
 
     def __ge__(self, other) -> bool:
-        if isinstance(other, FixedFloat):
-            return self.raw_value >= other.raw_value
-        elif isinstance(other, (int, float, str, Decimal)):
-            return self.raw_value >= self._cast(other)
+        if isinstance(other, (FixedFloat, int, float, str, Decimal)):
+            lhs, rhs = self._pair(other)
+            return lhs >= rhs
         raise TypeError(f"Cannot compare FixedFloat and {type(other)}")
 
     def __bool__(self) -> bool:
         return bool(self.raw_value)
 
 
+def _require_numpy():
+    if np is None:
+        raise ImportError("numpy is required for FixedFloatArray, install it with `pip install ticton[numpy]`")
+
+
+class FixedFloatArray:
+    """
+    FixedFloatArray is an array of fixed point numbers for batch price arithmetic, e.g. screening all alarms of an
+    oracle at once. The raw values are kept as python integers in a numpy object array, so 256-bit prices stay exact,
+    and to_float returns a float64 view for fast numeric work.
+
+    abs is the plain absolute value, use passes_threshold to screen winds the same way as TicTonAsyncClient.wind.
+
+    Examples
+    --------
+    >>> old = FixedFloatArray([alarm.base_asset_price for alarm in alarms], skip_scale=True)
+    >>> new = FixedFloat(2.5) * 10**quote_asset_decimals / 10**base_asset_decimals
+    >>> should_wind = passes_threshold(new, old, threshold)
+    """
+
+    __slots__ = ("raw_values", "precision", "base", "factor", "rounding")
+
+    def __init__(
+        self,
+        values: Iterable[Union[Number, FixedFloat]],
+        *,
+        precision: int = 64,
+        base: int = 2,
+        skip_scale: bool = False,
+        rounding: str = ROUND_FLOOR,
+    ):
+        _require_numpy()
+        assert rounding in ROUNDING_MODES, f"rounding must be one of {ROUNDING_MODES}"
+        self.precision = precision
+        self.base = base
+        self.factor = _scale(base, precision)
+        self.rounding = rounding
+        raw_values = []
+        for value in values:
+            if isinstance(value, FixedFloat):
+                assert value.precision == precision and value.base == base, "Precision and base must match for FixedFloatArray"
+                raw_values.append(value.raw_value)
+            elif skip_scale and isinstance(value, int):
+                raw_values.append(value)
+            else:
+                raw_values.append(FixedFloat(value, precision=precision, base=base, skip_scale=skip_scale, rounding=rounding).raw_value)
+        self.raw_values = np.array(raw_values, dtype=object)
+
+    def _new(self, raw_values) -> "FixedFloatArray":
+        result = FixedFloatArray.__new__(FixedFloatArray)
+        result.raw_values = raw_values
+        result.precision = self.precision
+        result.base = self.base
+        result.factor = self.factor
+        result.rounding = self.rounding
+        return result
+
+    def _div(self, numerators, denominator: int, rounding: str):
+        if denominator < 0:
+            numerators, denominator = -numerators, -denominator
+        if rounding == ROUND_FLOOR:
+            return numerators // denominator
+        if rounding == ROUND_CEIL:
+            return -(-numerators // denominator)
+        if rounding == ROUND_DOWN:
+            quotients = abs(numerators) // denominator
+            return np.where(numerators >= 0, quotients, -quotients)
+        return (2 * numerators + denominator) // (2 * denominator)
+
+    def _raw(self, other):
+        """
+        _raw returns the raw values of other, the scalar is rounded by the rounding mode
+        """
+        if isinstance(other, FixedFloatArray):
+            assert len(other) == len(self), "FixedFloatArray must have the same length"
+            return other.raw_values
+        if isinstance(other, FixedFloat):
+            return other.raw_value
+        if isinstance(other, (int, float, str, Decimal)):
+            return FixedFloat(other, precision=self.precision, base=self.base, rounding=self.rounding).raw_value
+        raise TypeError(f"Cannot operate FixedFloatArray and {type(other)}")
+
+    def _pair(self, other):
+        """
+        _pair returns the raw values of self and other scaled to the same denominator, so they compare exactly
+        """
+        if isinstance(other, (int, float, str, Decimal)):
+            numerator, denominator = _ratio(other)
+            return self.raw_values * denominator, numerator * self.factor
+        return self.raw_values, self._raw(other)
+
+    def to_float(self):
+        """
+        Convert fixed point numbers to a float64 array in human readable format
+        """
+        if self.base == 2:
+            return np.ldexp(self.raw_values.astype(np.float64), -self.precision)
+        return (self.raw_values / self.factor).astype(np.float64)
+
+    def to_int(self):
+        """
+        Convert fixed point numbers to an object array of integers in human readable format
+        """
+        return self._div(self.raw_values, self.factor, ROUND_DOWN)
+
+    def rescale(self, multiplier_decimals: int, divisor_decimals: int) -> "FixedFloatArray":
+        """
+        rescale multiplies the values by 10**multiplier_decimals / 10**divisor_decimals, e.g. prices are converted into
+        the on chain format with rescale(quote_asset_decimals, base_asset_decimals) and back with
+        rescale(base_asset_decimals, quote_asset_decimals)
+        """
+        if multiplier_decimals >= divisor_decimals:
+            return self._new(self.raw_values * 10 ** (multiplier_decimals - divisor_decimals))
+        return self._new(self._div(self.raw_values, 10 ** (divisor_decimals - multiplier_decimals), self.rounding))
+
+    def __len__(self) -> int:
+        return len(self.raw_values)
+
+    def __iter__(self) -> Iterator[FixedFloat]:
+        for raw_value in self.raw_values:
+            yield FixedFloat(raw_value, precision=self.precision, base=self.base, skip_scale=True, rounding=self.rounding)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return FixedFloat(self.raw_values[index], precision=self.precision, base=self.base, skip_scale=True, rounding=self.rounding)
+        return self._new(self.raw_values[index])
+
+    def __repr__(self):
+        return f"FixedFloatArray(len={len(self)}, human_format={self.to_float()})"
+
+    def __add__(self, other):
+        return self._new(self.raw_values + self._raw(other))
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        return self._new(self.raw_values - self._raw(other))
+
+    def __rsub__(self, other):
+        return self._new(self._raw(other) - self.raw_values)
+
+    def __mul__(self, other):
+        if isinstance(other, int):
+            return self._new(self.raw_values * other)
+        if isinstance(other, (float, str, Decimal)):
+            numerator, denominator = _ratio(other)
+            return self._new(self._div(self.raw_values * numerator, denominator, self.rounding))
+        return self._new(self._div(self.raw_values * self._raw(other), self.factor, self.rounding))
+
+    def __rmul__(self, other):
+        return self.__mul__(other)
+
+    def __truediv__(self, other):
+        if isinstance(other, (int, float, str, Decimal)):
+            numerator, denominator = _ratio(other)
+            return self._new(self._div(self.raw_values * denominator, numerator, self.rounding))
+        raw = self._raw(other)
+        if isinstance(raw, int):
+            return self._new(self._div(self.raw_values * self.factor, raw, self.rounding))
+        return self._new(np.array([_div(value * self.factor, divisor, self.rounding) for value, divisor in zip(self.raw_values, raw)], dtype=object))
+
+    def __neg__(self):
+        return self._new(-self.raw_values)
+
+    def __abs__(self):
+        return self._new(abs(self.raw_values))
+
+    def __eq__(self, other):  # type: ignore[override]
+        lhs, rhs = self._pair(other)
+        return (lhs == rhs).astype(bool)
+
+    def __ne__(self, other):  # type: ignore[override]
+        lhs, rhs = self._pair(other)
+        return (lhs != rhs).astype(bool)
+
+    def __lt__(self, other):
+        lhs, rhs = self._pair(other)
+        return (lhs < rhs).astype(bool)
+
+    def __gt__(self, other):
+        lhs, rhs = self._pair(other)
+        return (lhs > rhs).astype(bool)
+
+    def __le__(self, other):
+        lhs, rhs = self._pair(other)
+        return (lhs <= rhs).astype(bool)
+
+    def __ge__(self, other):
+        lhs, rhs = self._pair(other)
+        return (lhs >= rhs).astype(bool)
+
+
+def passes_threshold(
+    new_price: Union[FixedFloat, FixedFloatArray],
+    old_price: Union[FixedFloat, FixedFloatArray],
+    threshold: Number,
+):
+    """
+    passes_threshold tells whether a wind from old_price to new_price passes the threshold price, the same check as
+    TicTonAsyncClient.wind. It returns a bool for FixedFloat prices and a numpy bool array if either price is a
+    FixedFloatArray.
+    """
+    # the array is on the left, FixedFloat does not operate with FixedFloatArray
+    delta = old_price - new_price if isinstance(old_price, FixedFloatArray) else new_price - old_price
+    if isinstance(delta, FixedFloatArray):
+        # FixedFloat.__abs__ scales the absolute value again, so wind compares the raw difference with the threshold
+        return ~(abs(delta) * delta.factor < threshold)
+    return not abs(delta) < threshold
+
+
 def to_token(value: Union[int, float, str, Decimal], decimals: int) -> Decimal:
     return Decimal(value) * (Decimal(10) ** decimals)
 
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pytoncenter.v3.models import GetTransactionsRequest
+
+from .callbacks import TicTonEvent
+from .checkpoint import CheckpointStore
+from .client import SubscribeParam, TicTonAsyncClient
+from .scheduler import Priority, rpc_priority
+
+__all__ = ["Backfill"]
+
+
+class _Segment:
+    def __init__(self, start_lt: int, end_lt: int, key: str):
+        self.start_lt = start_lt
+        self.end_lt = end_lt
+        self.key = key
+        self.params: Optional[SubscribeParam] = None
+
+
+class Backfill:
+    """
+    Backfill crawls the full transaction history of the oracle. The lt range is split into segments which
+    are fetched concurrently, each segment is paged with the same cursor as subscribe, and the decoded
+    events are yielded in lt order.
+
+    With a checkpoint store, the cursor of a segment is saved once all of its events have been yielded,
+    so a crashed crawl resumes from the segments that were not finished. The end of the lt range is saved
+    as well, resume the crawl with the same start_lt to reuse the segments.
+    """
+
+    def __init__(
+        self,
+        client: TicTonAsyncClient,
+        *,
+        segments: int = 16,
+        concurrency: int = 4,
+        limit: int = 256,
+        confirm_delivery: bool = False,
+        checkpoint: Optional[CheckpointStore] = None,
+    ):
+        """
+        Parameters
+        ----------
+        client : TicTonAsyncClient
+            The client of the oracle to crawl
+        segments : int
+            The number of segments to split the lt range into
+        concurrency : int
+            The maximum number of segments, and thus requests, in flight at the same time
+        limit : int
+            The page size of each request, at most 256
+        confirm_delivery : bool
+            See TicTonAsyncClient.subscribe
+        checkpoint : Optional[CheckpointStore]
+            The store to record the progress of each segment
+        """
+        assert segments >= 1, "segments must be greater than or equal to 1"
+        assert concurrency >= 1, "concurrency must be greater than or equal to 1"
+        assert 1 <= limit <= 256, "limit must be between 1 and 256"
+        self.client = client
+        self.segments = segments
+        self.concurrency = concurrency
+        self.limit = limit
+        self.confirm_delivery = confirm_delivery
+        self.checkpoint = checkpoint
+        self.key = f"{client.oracle.to_string()}:backfill"
+
+    async def _edge_transaction(self, sort: str) -> Optional[Tuple[int, str]]:
+        with rpc_priority(Priority.BULK):
+            txs, _ = await self.client.toncenter.get_transactions(
+                GetTransactionsRequest(
+                    account=self.client.oracle.to_string(True),
+                    limit=1,
+                    sort=sort,  # type: ignore
+                )
+            )
+        if len(txs) == 0:
+            return None
+        return txs[0].lt, txs[0].hash
+
+    async def _lt_range(self, start_lt: Optional[int], end_lt: Optional[int]) -> Optional[Tuple[int, int]]:
+        if end_lt is None and self.checkpoint is not None:
+            saved = self.checkpoint.load(self.key)
+            if saved is not None:
+                end_lt = saved.lt
+        if end_lt is None:
+            latest = await self._edge_transaction("desc")
+            if latest is None:
+                return None
+            end_lt = latest[0]
+            if self.checkpoint is not None:
+                self.checkpoint.save(self.key, latest[0], latest[1])
+                self.checkpoint.flush()
+        if start_lt is None:
+            oldest = await self._edge_transaction("asc")
+            if oldest is None:
+                return None
+            start_lt = oldest[0]
+        assert start_lt <= end_lt, "start_lt must be less than or equal to end_lt"
+        return start_lt, end_lt
+
+    def _split(self, start_lt: int, end_lt: int) -> List[_Segment]:
+        span = max((end_lt - start_lt + 1 + self.segments - 1) // self.segments, 1)
+        segments = []
+        for lo in range(start_lt, end_lt + 1, span):
+            hi = min(lo + span - 1, end_lt)
+            segment = _Segment(lo, hi, f"{self.key}:{lo}:{hi}")
+            segment.params = SubscribeParam(start_lt=lo, limit=self.limit, account=self.client.oracle.to_string())
+            if self.checkpoint is not None:
+                saved = self.checkpoint.load(segment.key)
+                if saved is not None:
+                    segment.params.start_lt = saved.lt
+                    segment.params.last_hash = saved.hash
+            segments.append(segment)
+        return segments
+
+    async def _crawl_segment(self, segment: _Segment) -> List[TicTonEvent]:
+        events: List[TicTonEvent] = []
+
+        async def _collect(event: TicTonEvent):
+            events.append(event)
+
+        params = segment.params
+        assert params is not None
+        while True:
+            txs = await self.client._fetch_next_page(params, end_lt=segment.end_lt)
+            for tx in txs:
+                try:
+                    await self.client._handle_transaction(
+                        tx,
+                        on_tick_success=_collect,
+                        on_wind_success=_collect,
+                        on_ring_success=_collect,
+                        confirm_delivery=self.confirm_delivery,
+                    )
+                except Exception as e:
+                    self.client.logger.debug(f"Handle transaction {tx.hash} failed: {e}")
+            if len(txs) < params.limit:
+                return events
+
+    async def crawl(self, start_lt: Optional[int] = None, end_lt: Optional[int] = None) -> AsyncIterator[TicTonEvent]:
+        """
+        crawl yields the events of the oracle between start_lt and end_lt in lt order
+
+        Parameters
+        ----------
+        start_lt : Optional[int]
+            The lt to start from (inclusive), default is the lt of the oldest transaction
+        end_lt : Optional[int]
+            The lt to stop at (inclusive), default is the lt of the latest transaction when the crawl is first started
+
+        Examples
+        --------
+        >>> backfill = Backfill(client, segments=32, concurrency=8, checkpoint=SQLiteCheckpointStore("backfill.db"))
+        >>> async for event in backfill.crawl():
+        ...     print(event)
+        """
+        lt_range = await self._lt_range(start_lt, end_lt)
+        if lt_range is None:
+            return
+        segments = self._split(*lt_range)
+        tasks: List[asyncio.Task] = []
+        try:
+            for i, segment in enumerate(segments):
+                # keep at most `concurrency` segments in flight, the first one is always the next to be yielded
+                while len(tasks) < min(i + self.concurrency, len(segments)):
+                    # the task copies the priority, so it only applies to the crawl
+                    with rpc_priority(Priority.BULK):
+                        tasks.append(asyncio.create_task(self._crawl_segment(segments[len(tasks)])))
+                events = await tasks[i]
+                for event in events:
+                    yield event
+                if self.checkpoint is not None:
+                    assert segment.params is not None and segment.params.start_lt is not None
+                    self.checkpoint.save(segment.key, segment.params.start_lt, segment.params.last_hash or "")
+        finally:
+            for task in tasks:
+                task.cancel()
+            if self.checkpoint is not None:
+                self.checkpoint.flush()
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from pytoncenter.address import Address
+from pytoncenter.extension.message import JettonMessage
+from pytoncenter.v3.models import Transaction
+from tonpy import CellSlice
+
+from .parser import TicTonMessage
+
+__all__ = ["BatchDecoder", "DecodedBody", "decode_bodies"]
+
+DecodedBody = Tuple[Any, ...]
+"""
+DecodedBody is a message body decoded into a plain tuple, the first item is the message name and the rest are
+the fields in schema order, addresses are in raw form, e.g. ("Tock", alarm_index, scale, created_at, "0:...", price).
+A tick is decoded from the forward payload of the jetton transfer notification.
+"""
+
+_MESSAGES = {
+    int(cls.OPCODE, 16): cls
+    for cls in (
+        TicTonMessage.Tock,
+        TicTonMessage.Ring,
+        TicTonMessage.Chime,
+        TicTonMessage.Chronoshift,
+        TicTonMessage.JettonMintPartial,
+    )
+}
+_TRANSFER_NOTIFICATION = int(JettonMessage.TransferNotification.OPCODE, 16)
+_TICK = int(TicTonMessage.Tick.OPCODE, 16)
+
+
+def _to_tuple(msg: Any) -> DecodedBody:
+    values = (getattr(msg, name) for name in msg.__slots__)
+    return (type(msg).__name__, *(value.to_string(False) if isinstance(value, Address) else value for value in values))
+
+
+def _decode_body(boc: str) -> Optional[DecodedBody]:
+    cs = CellSlice(boc)
+    if cs.bits < 32:
+        return None
+    opcode = cs.preload_uint(32)
+    if opcode == _TRANSFER_NOTIFICATION:
+        notification = JettonMessage.TransferNotification.parse(cs)
+        payload = notification.forward_payload
+        if payload is None or payload.bits < 8 or payload.preload_uint(8) != _TICK:
+            return None
+        return _to_tuple(TicTonMessage.Tick.parse(payload))
+    cls = _MESSAGES.get(opcode)
+    if cls is None:
+        return None
+    return _to_tuple(cls.parse(cs))
+
+
+def _decode_chunk(bodies: Sequence[Union[str, bytes]]) -> Tuple[List[Optional[DecodedBody]], List[Tuple[int, str]]]:
+    """
+    _decode_chunk decodes the bodies, and returns the (index, error) of the bodies that failed to decode as well
+    """
+    decoded: List[Optional[DecodedBody]] = []
+    failures: List[Tuple[int, str]] = []
+    for index, body in enumerate(bodies):
+        if not body:
+            decoded.append(None)
+            continue
+        try:
+            decoded.append(_decode_body(body.decode("ascii") if isinstance(body, bytes) else body))
+        except Exception as e:
+            failures.append((index, repr(e)))
+            decoded.append(None)
+    return decoded, failures
+
+
+def decode_bodies(bodies: Sequence[Union[str, bytes]], logger: Optional[logging.Logger] = None) -> List[Optional[DecodedBody]]:
+    """
+    decode_bodies decodes the base64 encoded BOC bodies in the current process, bodies that are not TicTon messages
+    or fail to decode are None, a warning is logged for each body that fails to decode
+
+    Parameters
+    ----------
+    bodies : Sequence[Union[str, bytes]]
+        The base64 encoded BOC of the message bodies, either as str or as ascii bytes
+    logger : Optional[logging.Logger]
+        The logger of the decode failures
+    """
+    decoded, failures = _decode_chunk(bodies)
+    for index, error in failures:
+        (logger or logging.getLogger(__name__)).warning(f"Failed to decode body {index}: {error}")
+    return decoded
+
+
+class BatchDecoder:
+    """
+    BatchDecoder decodes message bodies in a pool of processes, so decoding a long history does not block the
+    event loop and scales with the number of cores. The bodies are split into chunks, only the ascii bytes of
+    the bodies are sent to the workers and only plain tuples are sent back. The bodies that fail to decode are
+    None, they are counted in failed and logged.
+
+    Examples
+    --------
+    >>> async with BatchDecoder(workers=4) as decoder:
+    ...     decoded = await decoder.decode_transactions(txs)
+    """
+
+    def __init__(self, workers: Optional[int] = None, *, chunk_size: int = 512, logger: Optional[logging.Logger] = None):
+        """
+        Parameters
+        ----------
+        workers : Optional[int]
+            The number of processes, default is the number of cores
+        chunk_size : int
+            The number of bodies sent to a worker at once
+        """
+        workers = workers or os.cpu_count() or 1
+        assert workers >= 1, "workers must be greater than or equal to 1"
+        assert chunk_size >= 1, "chunk_size must be greater than or equal to 1"
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.logger = logger or logging.getLogger(__name__)
+        # the number of bodies that failed to decode
+        self.failed = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def decode(self, bodies: Sequence[Union[str, bytes]]) -> List[Optional[DecodedBody]]:
+        """
+        decode decodes the bodies in the worker processes, the result is in the same order as the bodies
+        """
+        if len(bodies) == 0:
+            return []
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        loop = asyncio.get_running_loop()
+        chunks = [
+            [body.encode("ascii") if isinstance(body, str) else body for body in bodies[i : i + self.chunk_size]]
+            for i in range(0, len(bodies), self.chunk_size)
+        ]
+        results = await asyncio.gather(*[loop.run_in_executor(self._executor, _decode_chunk, chunk) for chunk in chunks])
+        failures = [(i * self.chunk_size + index, error) for i, (_, chunk_failures) in enumerate(results) for index, error in chunk_failures]
+        if failures:
+            self.failed += len(failures)
+            self.logger.warning(f"Failed to decode {len(failures)} of {len(bodies)} bodies, the first is body {failures[0][0]}: {failures[0][1]}")
+        return [decoded for result, _ in results for decoded in result]
+
+    async def decode_transactions(self, txs: Sequence[Transaction]) -> Dict[str, Tuple[Optional[DecodedBody], List[Optional[DecodedBody]]]]:
+        """
+        decode_transactions decodes the in message and the out messages of the transactions,
+        the result maps the transaction hash to (in message, [out messages])
+        """
+        bodies: List[str] = []
+        layout: List[Tuple[str, int, int]] = []
+        for tx in txs:
+            start = len(bodies)
+            for msg in [tx.in_msg, *tx.out_msgs]:
+                content = msg.message_content if msg is not None else None
+                bodies.append(content.body if content is not None else "")
+            layout.append((tx.hash, start, len(bodies)))
+        decoded = await self.decode(bodies)
+        return {tx_hash: (decoded[start], decoded[start + 1 : end]) for tx_hash, start, end in layout}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    async def __aenter__(self) -> BatchDecoder:
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Any, Optional
+
+__all__ = ["ChainCache"]
+
+CACHE_VERSION = 1
+
+
+class ChainCache:
+    """
+    ChainCache persists lookups that never change on chain in a sqlite database, e.g. alarm addresses, jetton wallet
+    addresses and the contract codes they are derived from, so a restarted client does not fetch them again.
+
+    Entries are grouped by scope, the client uses `{network}:{oracle}` as the scope, and the scope is prefixed with the
+    cache version, so entries written by an incompatible version are never read.
+
+    Examples
+    --------
+    >>> client = await TicTonAsyncClient.init(cache=ChainCache("ticton.db"))
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS chain_cache (scope TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, PRIMARY KEY (scope, key))")
+        self.conn.commit()
+
+    @staticmethod
+    def scope(network: str, oracle: str) -> str:
+        """
+        scope returns the versioned scope of the oracle on the network
+        """
+        return f"v{CACHE_VERSION}:{network}:{oracle}"
+
+    def get(self, scope: str, key: str) -> Optional[Any]:
+        """
+        get returns the cached value, or None if the key is not cached
+        """
+        row = self.conn.execute("SELECT value FROM chain_cache WHERE scope = ? AND key = ?", (scope, key)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, scope: str, key: str, value: Any):
+        """
+        set caches the json serializable value
+        """
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO chain_cache (scope, key, value) VALUES (?, ?, ?)", (scope, key, json.dumps(value)))
+
+    def close(self):
+        self.conn.close()
@@ -1,4 +1,4 @@
-from typing import Callable, Coroutine, Optional
+from typing import Callable, Coroutine, Optional, Union
 
 from pydantic import BaseModel, Field
 from pytoncenter import AsyncTonCenterClientV3
@@ -8,13 +8,14 @@ from pytoncenter.v3.models import *
 from tonpy import CellSlice
 
 from .arithmetic import FixedFloat
-from .parser import TicTonMessage
+from .parser import TicTonMessage, peek_opcode
 
 
 class OnTickSuccessParams(BaseModel):
     tx: Transaction
     watchmaker: AddressLike
     base_asset_price: float
+    base_asset_price_raw: Optional[int] = Field(None, description="base asset price in 2^64 fixed point")
     new_alarm_id: int
     created_at: int
 
@@ -27,6 +28,7 @@ class OnWindSuccessParams(BaseModel):
     timekeeper: AddressLike
     alarm_id: int
     new_base_asset_price: float
+    new_base_asset_price_raw: Optional[int] = Field(None, description="new base asset price in 2^64 fixed point")
     remain_scale: int
     new_alarm_id: int
     created_at: int
@@ -47,9 +49,152 @@ class OnRingSuccessParams(BaseModel):
         return f"Ring success: alarm_id={self.alarm_id}, origin={self.origin}, receiver={self.receiver}, reward={self.reward}, created_at={self.created_at}"
 
 
+TicTonEvent = Union[OnTickSuccessParams, OnWindSuccessParams, OnRingSuccessParams]
+
+
+class CompactEvent:
+    """
+    CompactEvent keeps only the lt, hash and utime of the transaction instead of the full Transaction,
+    the transaction can be fetched on demand with fetch_tx.
+    """
+
+    __slots__ = ("lt", "hash", "utime", "created_at")
+
+    def __init__(self, *, lt: int, hash: str, utime: int, created_at: int, **kwargs):
+        self.lt = lt
+        self.hash = hash
+        self.utime = utime
+        self.created_at = created_at
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+    @classmethod
+    def from_params(cls, params: TicTonEvent, **kwargs):
+        return cls(lt=params.tx.lt, hash=params.tx.hash, utime=params.tx.now, created_at=params.created_at, **kwargs)
+
+    async def fetch_tx(self, client: AsyncTonCenterClientV3) -> Optional[Transaction]:
+        """
+        fetch_tx fetches the full transaction of the event
+        """
+        tx, _ = await client.get_transactions(GetTransactionByHashRequest(hash=self.hash))
+        return tx
+
+
+class CompactTickEvent(CompactEvent):
+    __slots__ = ("watchmaker", "base_asset_price", "base_asset_price_raw", "new_alarm_id")
+
+    @classmethod
+    def from_params(cls, params: OnTickSuccessParams):
+        return super().from_params(
+            params,
+            watchmaker=params.watchmaker,
+            base_asset_price=params.base_asset_price,
+            base_asset_price_raw=params.base_asset_price_raw,
+            new_alarm_id=params.new_alarm_id,
+        )
+
+    def __str__(self):
+        return f"Tick success: new_alarm_id={self.new_alarm_id}, watchmaker={self.watchmaker}, base_asset_price={self.base_asset_price}, created_at={self.created_at}"
+
+
+class CompactWindEvent(CompactEvent):
+    __slots__ = ("timekeeper", "alarm_id", "new_base_asset_price", "new_base_asset_price_raw", "remain_scale", "new_alarm_id")
+
+    @classmethod
+    def from_params(cls, params: OnWindSuccessParams):
+        return super().from_params(
+            params,
+            timekeeper=params.timekeeper,
+            alarm_id=params.alarm_id,
+            new_base_asset_price=params.new_base_asset_price,
+            new_base_asset_price_raw=params.new_base_asset_price_raw,
+            remain_scale=params.remain_scale,
+            new_alarm_id=params.new_alarm_id,
+        )
+
+    def __str__(self):
+        return f"Wind success: new_alarm_id={self.new_alarm_id}, alarm_id={self.alarm_id}, timekeeper={self.timekeeper}, new_base_asset_price={self.new_base_asset_price}, remain_scale={self.remain_scale}, created_at={self.created_at}"
+
+
+class CompactRingEvent(CompactEvent):
+    __slots__ = ("alarm_id", "origin", "receiver", "reward")
+
+    @classmethod
+    def from_params(cls, params: OnRingSuccessParams):
+        return super().from_params(
+            params,
+            alarm_id=params.alarm_id,
+            origin=params.origin,
+            receiver=params.receiver,
+            reward=params.reward,
+        )
+
+    def __str__(self):
+        return f"Ring success: alarm_id={self.alarm_id}, origin={self.origin}, receiver={self.receiver}, reward={self.reward}, created_at={self.created_at}"
+
+
+CompactTicTonEvent = Union[CompactTickEvent, CompactWindEvent, CompactRingEvent]
+
+
+def to_compact(event: TicTonEvent) -> CompactTicTonEvent:
+    """
+    to_compact converts the event into its compact form without the full transaction
+    """
+    if isinstance(event, OnTickSuccessParams):
+        return CompactTickEvent.from_params(event)
+    if isinstance(event, OnWindSuccessParams):
+        return CompactWindEvent.from_params(event)
+    return CompactRingEvent.from_params(event)
+
+
 async def handle_noop(*args, **kwargs): ...
 
 
+def _out_msg_opcode(candidate: Message) -> str:
+    """
+    Read the opcode of an out message, the CellSlice is built only if the opcode cannot be read from the BOC bytes directly.
+    """
+    assert candidate.message_content is not None
+    opcode = peek_opcode(candidate.message_content.body)
+    if opcode is None:
+        opcode = CellSlice(candidate.message_content.body).preload_uint(32)
+    return get_opcode(opcode)
+
+
+class _NotDelivered:
+    """
+    _NotDelivered is returned by _load_out_msg_body when the destination transaction does not exist yet, the handlers
+    return it as well so that subscribe does not advance the checkpoint past the transaction
+    """
+
+
+_NOT_DELIVERED = _NotDelivered()
+
+
+async def _load_out_msg_body(
+    client: AsyncTonCenterClientV3,
+    candidate: Message,
+    confirm_delivery: bool = False,
+) -> Union[CellSlice, _NotDelivered, None]:
+    """
+    Load the body of an out message sent by the oracle. By default the body is read from the out message itself,
+    if confirm_delivery is True, the body is read from the in message of the destination transaction instead,
+    which costs one more request but guarantees that the message has been delivered.
+    _NOT_DELIVERED is returned when the destination transaction does not exist yet, and None when its in message has no content.
+    """
+    if not confirm_delivery:
+        assert candidate.message_content is not None
+        return CellSlice(candidate.message_content.body)
+    txs, _ = await client.get_transaction_by_message(GetTransactionByMessageRequest(direction="in", msg_hash=candidate.hash))
+    if len(txs) == 0:
+        return _NOT_DELIVERED
+    assert len(txs) == 1
+    dest_tx = txs[0]
+    if dest_tx.in_msg.message_content is None:
+        return None
+    return CellSlice(dest_tx.in_msg.message_content.body)
+
+
 async def handle_notification(
     client: AsyncTonCenterClientV3,
     body: CellSlice,
@@ -62,14 +207,13 @@ async def handle_notification(
         return
     opcode = get_opcode(msg.forward_payload.preload_uint(8))
     if opcode == TicTonMessage.Tick.OPCODE:
-        await _handle_tick(
+        return await _handle_tick(
             client,
             msg.forward_payload,
             tx,
             on_tick_success=on_tick_success,
             **kwargs,
         )
-        return
 
 
 async def _handle_tick(
@@ -77,6 +221,7 @@ async def _handle_tick(
     body: CellSlice,
     tx: Transaction,
     on_tick_success: Callable[[OnTickSuccessParams], Coroutine[Any, Any, None]],
+    confirm_delivery: bool = False,
     **kwargs,
 ):
     try:
@@ -87,14 +232,13 @@ async def _handle_tick(
     for candidate in tx.out_msgs:
         if candidate.message_content is None:
             continue
-        out_msg_cs = CellSlice(candidate.message_content.body)
-        out_opcode = get_opcode(out_msg_cs.preload_uint(32))
+        out_opcode = _out_msg_opcode(candidate)
         if out_opcode == TicTonMessage.Tock.OPCODE:
-            txs, _ = await client.get_transaction_by_message(GetTransactionByMessageRequest(direction="in", msg_hash=candidate.hash))
-            assert len(txs) == 1
-            tock_tx = txs[0]
-            assert tock_tx.in_msg.message_content is not None
-            tock_cs = CellSlice(tock_tx.in_msg.message_content.body)
+            tock_cs = await _load_out_msg_body(client, candidate, confirm_delivery)
+            if tock_cs is _NOT_DELIVERED:
+                return _NOT_DELIVERED
+            if tock_cs is None:
+                continue
             tock_msg = TicTonMessage.Tock.parse(tock_cs)
             base_asset_price = float(FixedFloat(tick_msg.base_asset_price, skip_scale=True).to_float()) * 1e3
             await on_tick_success(
@@ -102,6 +246,7 @@ async def _handle_tick(
                     tx=tx,
                     watchmaker=tock_msg.watchmaker,  # type: ignore
                     base_asset_price=base_asset_price,
+                    base_asset_price_raw=tick_msg.base_asset_price,
                     new_alarm_id=tock_msg.alarm_index,
                     created_at=tock_msg.created_at,
                 )
@@ -114,6 +259,7 @@ async def handle_chime(
     body: CellSlice,
     tx: Transaction,
     on_wind_success: Callable[[OnWindSuccessParams], None],
+    confirm_delivery: bool = False,
     **kwargs,
 ):
     wind_msg = TicTonMessage.Chime.parse(body)
@@ -121,17 +267,13 @@ async def handle_chime(
     for candidate in tx.out_msgs:
         if candidate.message_content is None:
             continue
-        out_msg_cs = CellSlice(candidate.message_content.body)
-        out_opcode = get_opcode(out_msg_cs.preload_uint(32))
+        out_opcode = _out_msg_opcode(candidate)
         if out_opcode == TicTonMessage.Tock.OPCODE:
-            txs, _ = await client.get_transaction_by_message(GetTransactionByMessageRequest(direction="in", msg_hash=candidate.hash))
-            if len(txs) == 0:
-                return
-            assert len(txs) == 1
-            tock_tx = txs[0]
-            if tock_tx.in_msg.message_content is None:
+            tock_cs = await _load_out_msg_body(client, candidate, confirm_delivery)
+            if tock_cs is _NOT_DELIVERED:
+                return _NOT_DELIVERED
+            if tock_cs is None:
                 continue
-            tock_cs = CellSlice(tock_tx.in_msg.message_content.body)
             tock_msg = TicTonMessage.Tock.parse(tock_cs)
             new_alarm_index = tock_msg.alarm_index
             break
@@ -145,6 +287,7 @@ async def handle_chime(
             timekeeper=tock_msg.watchmaker,  # type: ignore
             alarm_id=wind_msg.alarm_index,
             new_base_asset_price=float(FixedFloat(wind_msg.new_base_asset_price, skip_scale=True).to_float()) * 1e3,
+            new_base_asset_price_raw=wind_msg.new_base_asset_price,
             remain_scale=wind_msg.remain_scale,
             new_alarm_id=new_alarm_index,
             created_at=tock_msg.created_at,
@@ -157,6 +300,7 @@ async def handle_chronoshift(
     body: CellSlice,
     tx: Transaction,
     on_ring_success: Callable[[OnRingSuccessParams], None],
+    confirm_delivery: bool = False,
     **kwargs,
 ):
     chronoshift_msg = TicTonMessage.Chronoshift.parse(body)
@@ -167,15 +311,13 @@ async def handle_chronoshift(
     for candidate in tx.out_msgs:
         if candidate.message_content is None:
             continue
-        out_msg_cs = CellSlice(candidate.message_content.body)
-        out_opcode = get_opcode(out_msg_cs.preload_uint(32))
+        out_opcode = _out_msg_opcode(candidate)
         if out_opcode == TicTonMessage.JettonMintPartial.OPCODE:
-            txs, _ = await client.get_transaction_by_message(GetTransactionByMessageRequest(direction="in", msg_hash=candidate.hash))
-            assert len(txs) == 1
-            jetton_mint_tx = txs[0]
-            if jetton_mint_tx.in_msg.message_content is None:
+            jetton_mint_cs = await _load_out_msg_body(client, candidate, confirm_delivery)
+            if jetton_mint_cs is _NOT_DELIVERED:
+                return _NOT_DELIVERED
+            if not isinstance(jetton_mint_cs, CellSlice):
                 break
-            jetton_mint_cs = CellSlice(jetton_mint_tx.in_msg.message_content.body)
             jetton_mint_msg = TicTonMessage.JettonMintPartial.parse(jetton_mint_cs)
             origin = jetton_mint_msg.origin
             receiver = jetton_mint_msg.receiver
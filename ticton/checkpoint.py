@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+__all__ = ["Checkpoint", "CheckpointStore", "FileCheckpointStore", "SQLiteCheckpointStore"]
+
+
+class Checkpoint(BaseModel):
+    lt: int
+    hash: str
+
+
+class CheckpointStore(ABC):
+    """
+    CheckpointStore records the last fully processed transaction of a subscription, so that a restarted
+    subscriber can resume from where it stopped. Saved checkpoints are kept in memory and written to the
+    underlying storage in batches, either every `flush_every` saves or every `flush_interval` seconds,
+    whichever comes first. Call `flush` explicitly before shutting down to persist the latest checkpoint.
+    """
+
+    def __init__(self, *, flush_every: int = 16, flush_interval: float = 5.0):
+        assert flush_every >= 1, "flush_every must be greater than or equal to 1"
+        assert flush_interval >= 0, "flush_interval must be greater than or equal to 0"
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, Checkpoint] = {}
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    @abstractmethod
+    def _read(self, key: str) -> Optional[Checkpoint]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _write(self, checkpoints: Dict[str, Checkpoint]):
+        raise NotImplementedError
+
+    def load(self, key: str) -> Optional[Checkpoint]:
+        """
+        load returns the latest checkpoint of the given key, including the ones that are not flushed yet
+        """
+        if key in self._pending:
+            return self._pending[key]
+        return self._read(key)
+
+    def save(self, key: str, lt: int, hash: str):
+        """
+        save records the checkpoint of the given key, it will be flushed when the batch is full or the flush interval is reached
+        """
+        self._pending[key] = Checkpoint(lt=lt, hash=hash)
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        flush writes all pending checkpoints to the underlying storage
+        """
+        if self._pending:
+            self._write(self._pending)
+            self._pending = {}
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+
+class FileCheckpointStore(CheckpointStore):
+    """
+    FileCheckpointStore keeps checkpoints in a json file, the file is replaced atomically on every flush.
+    """
+
+    def __init__(self, path: str, *, flush_every: int = 16, flush_interval: float = 5.0):
+        super().__init__(flush_every=flush_every, flush_interval=flush_interval)
+        self.path = path
+
+    def _read_all(self) -> Dict[str, Checkpoint]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        return {key: Checkpoint(**value) for key, value in data.items()}
+
+    def _read(self, key: str) -> Optional[Checkpoint]:
+        return self._read_all().get(key)
+
+    def _write(self, checkpoints: Dict[str, Checkpoint]):
+        data = self._read_all()
+        data.update(checkpoints)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({key: value.model_dump() for key, value in data.items()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """
+    SQLiteCheckpointStore keeps checkpoints in a sqlite database, all pending checkpoints are written in one transaction.
+    """
+
+    def __init__(self, path: str, *, flush_every: int = 16, flush_interval: float = 5.0):
+        super().__init__(flush_every=flush_every, flush_interval=flush_interval)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS checkpoints (key TEXT PRIMARY KEY, lt INTEGER NOT NULL, hash TEXT NOT NULL)")
+        self.conn.commit()
+
+    def _read(self, key: str) -> Optional[Checkpoint]:
+        row = self.conn.execute("SELECT lt, hash FROM checkpoints WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return Checkpoint(lt=row[0], hash=row[1])
+
+    def _write(self, checkpoints: Dict[str, Checkpoint]):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO checkpoints (key, lt, hash) VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE SET lt = excluded.lt, hash = excluded.hash",
+                [(key, value.lt, value.hash) for key, value in checkpoints.items()],
+            )
+
+    def close(self):
+        super().close()
+        self.conn.close()
@@ -1,18 +1,25 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 import time
 import warnings
+from contextlib import asynccontextmanager
 from decimal import Decimal
 from os import getenv
 from typing import (
     Any,
+    AsyncIterator,
+    Awaitable,
     Callable,
     Coroutine,
+    Dict,
     List,
     Literal,
     Optional,
+    Sequence,
+    Set,
     Tuple,
     Type,
     Union,
@@ -31,25 +38,32 @@ from pytoncenter.v3.models import (
     GetMethodParameterInput,
     GetSpecifiedJettonWalletRequest,
     GetTransactionsRequest,
-    GetWalletRequest,
     RunGetMethodRequest,
     SentMessage,
+    Transaction,
 )
 from tonpy import CellSlice
-from tonsdk.boc import Cell, begin_cell
+from tonsdk.boc import begin_cell
 from tonsdk.contract.wallet import Wallets
 from tonsdk.utils import bytes_to_b64str
 
-from .arithmetic import FixedFloat, to_token, token_to_float
+from .arithmetic import FixedFloat, passes_threshold, to_token, token_to_float
 from .callbacks import (
+    CompactTicTonEvent,
     OnRingSuccessParams,
     OnTickSuccessParams,
     OnWindSuccessParams,
+    TicTonEvent,
+    _NOT_DELIVERED,
     handle_chime,
     handle_chronoshift,
     handle_noop,
     handle_notification,
+    to_compact,
 )
+from .cache import ChainCache
+from .checkpoint import CheckpointStore
+from .coalesce import CoalescingToncenter
 from .decoder import (
     AlarmAddressDecoder,
     AlarmMetadata,
@@ -59,9 +73,28 @@ from .decoder import (
     OracleMetadata,
     OracleMetadataDecoder,
 )
-from .parser import TicTonMessage
-
-__all__ = ["TicTonAsyncClient"]
+from .dispatcher import CallbackDispatcher
+from .failover import FailoverToncenter
+from .graph import ActionGraph
+from .parser import TicTonMessage, peek_opcode
+from .polling import AdaptivePolling
+from .resolver import AlarmAddressResolver, JettonWalletResolver
+from .scheduler import Priority, RpcScheduler, rpc_priority
+from .store import EventStore
+from .wallet import Order, PoolWallet, WalletPool, create_transfer_message
+
+__all__ = ["BatchItemResult", "TicTonAsyncClient"]
+
+_TICK_GAS_FEE = int(0.13 * 10**9)
+_RING_GAS_FEE = int(0.35 * 10**9)
+_WIND_GAS_FEE = int(0.5 * 10**9)
+
+SUBSCRIBE_HANDLERS = {
+    JettonMessage.TransferNotification.OPCODE: handle_notification,
+    TicTonMessage.Chronoshift.OPCODE: handle_chronoshift,
+    TicTonMessage.Chime.OPCODE: handle_chime,
+}
+SUBSCRIBE_OPCODES = {int(opcode, 16) for opcode in SUBSCRIBE_HANDLERS}
 
 
 class SubscribeParam(BaseModel):
@@ -70,17 +103,36 @@ class SubscribeParam(BaseModel):
         description="The lt to start from, if None, the oldest lt will be used",
     )
     interval: float = Field(default=2.0, description="The interval of the subscription in seconds")
+    last_hash: Optional[str] = Field(
+        default=None,
+        description="The hash of the last seen transaction at start_lt, it will be skipped in the next page",
+    )
     limit: int = Field(default=256, ge=1, le=256, description="The limit of the subscription")
-    offset: int = Field(default=0, ge=0, description="The offset of the subscription")
     account: AddressLike = Field(..., description="The account to subscribe to")
 
 
+class _PageDone(BaseModel):
+    lt: int
+    hash: str
+
+
 class DryRunResult(BaseModel):
     boc: str = Field(..., description="The boc of the message in b64 encoded format")
     desitnation: AddressLike = Field(..., description="The destination address of the message")
     amount: int = Field(..., description="Transfer amount in nanoTON")
 
 
+class BatchItemResult(BaseModel):
+    index: int = Field(..., description="The index of the item in the batch")
+    message: Optional[DryRunResult] = Field(None, description="The internal message of the item, None if it cannot be built")
+    result: Optional[SentMessage] = Field(None, description="The result of the external message that carries the item, None in dry_run mode")
+    error: Optional[str] = Field(None, description="The reason why the item is not sent")
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
 class TicTonAsyncClient:
     def __init__(
         self,
@@ -91,8 +143,12 @@ class TicTonAsyncClient:
         wallet_version: Literal["v2r1", "v2r2", "v3r1", "v3r2", "v4r1", "v4r2", "hv2"] = "v4r2",
         threshold_price: float = 0.7,
         *,
+        cache: Optional[ChainCache] = None,
+        wallet_pool: Optional[WalletPool] = None,
+        coalesce_ttl: Union[float, Dict[str, float]] = 0.0,
         logger: Optional[logging.Logger] = None,
     ) -> None:
+        assert mnemonics is None or wallet_pool is None, "mnemonics and wallet_pool cannot be provided at the same time"
         self.wallet = None
         if mnemonics is not None:
             _, _, _, self.wallet = Wallets.from_mnemonics(mnemonics.split(" "), wallet_version)  # type: ignore
@@ -105,7 +161,33 @@ class TicTonAsyncClient:
         else:
             self.logger = logger
 
+        # every toncenter call is scheduled by priority, and identical concurrent reads of the strategies sharing this
+        # client are sent once, a toncenter client that is already wrapped is used as it is
+        if not isinstance(toncenter, CoalescingToncenter):
+            if not isinstance(toncenter, RpcScheduler):
+                toncenter = RpcScheduler(toncenter, logger=self.logger)  # type: ignore
+            toncenter = CoalescingToncenter(toncenter, ttl=coalesce_ttl, logger=self.logger)  # type: ignore
+        self.scheduler: Optional[RpcScheduler] = toncenter.toncenter if isinstance(toncenter.toncenter, RpcScheduler) else None  # type: ignore
         self.toncenter = toncenter
+        self.cache = cache
+        # toncenter clients of a custom endpoint have no network, their entries are kept apart from mainnet and testnet
+        scope = ChainCache.scope(getattr(toncenter, "_network", None) or "custom", self.oracle.to_string(False))
+        self.alarm_resolver = AlarmAddressResolver(
+            toncenter, self.oracle, self._get_alarm_address_from_oracle, cache=cache, scope=scope, logger=self.logger
+        )
+        self.jetton_wallet_resolver = JettonWalletResolver(
+            toncenter, self._get_jetton_wallet_address_from_master, cache=cache, scope=scope, logger=self.logger
+        )
+
+        # a single wallet is a pool of one, tick, ring and wind always send from the pool
+        if wallet_pool is None and self.wallet is not None:
+            wallet_pool = WalletPool([self.wallet])
+        self.wallet_pool = wallet_pool
+        self.sequencer = None
+        if wallet_pool is not None:
+            wallet_pool.bind(toncenter, logger=self.logger)
+            self.wallet = wallet_pool.wallets[0].wallet
+            self.sequencer = wallet_pool.wallets[0].sequencer
 
         self.threshold_price = threshold_price
         self.metadata = metadata
@@ -122,6 +204,11 @@ class TicTonAsyncClient:
         threshold_price: float = 0.01,
         *,
         testnet: bool = True,
+        cache: Optional[ChainCache] = None,
+        wallet_pool: Optional[WalletPool] = None,
+        coalesce_ttl: Union[float, Dict[str, float]] = 0.0,
+        endpoints: Optional[Sequence[Union[str, Tuple[str, Optional[str]]]]] = None,
+        hedge: bool = False,
         logger: Optional[logging.Logger] = None,
     ) -> TicTonAsyncClient:
         """
@@ -139,9 +226,25 @@ class TicTonAsyncClient:
             The threshold price of the position
         testnet : bool
             Whether to use testnet or mainnet
+        cache : Optional[ChainCache]
+            The persistent cache of the alarm and jetton wallet addresses, with a warm cache only getOracleData is called
+            before the first action
+        wallet_pool : Optional[WalletPool]
+            The wallets to send the actions from, mnemonics and wallet_version are ignored if it is provided
+        coalesce_ttl : Union[float, Dict[str, float]]
+            The seconds a toncenter read is shared after it finishes, either for all methods or by method name, default is 0
+            which only shares identical reads in flight, see CoalescingToncenter
+        endpoints : Optional[Sequence[Union[str, Tuple[str, Optional[str]]]]]
+            The urls of toncenter compatible endpoints, or pairs of url and api key, the calls go to the fastest healthy
+            endpoint and fail over to the others, see FailoverToncenter. An endpoint without an api key uses toncenter_api_key,
+            and the rate of the calls is the qps of the first endpoint
+        hedge : bool
+            Whether a slow idempotent read is sent to a second endpoint as well, only used with endpoints
         """
         assert mnemonics in {"auto", "unset"} or isinstance(mnemonics, str), "mnemonics must be a string or 'auto' or 'unset'"
-        if mnemonics == "auto":
+        if wallet_pool is not None:
+            phrase = None
+        elif mnemonics == "auto":
             phrase = getenv("TICTON_WALLET_MNEMONICS", None)
         elif mnemonics == "unset":
             phrase = None
@@ -154,11 +257,15 @@ class TicTonAsyncClient:
         threshold_price = float(getenv("TICTON_THRESHOLD_PRICE", threshold_price))
         assert oracle_addr_str is not None, "oracle_addr must be provided, you can either pass it as a parameter or set TICTON_ORACLE_ADDRESS environment variable"
 
-        toncenter = get_client(
-            version="v3",
-            network="testnet" if testnet else "mainnet",
-            api_key=toncenter_api_key,
-        )
+        network = "testnet" if testnet else "mainnet"
+        if endpoints:
+            clients = []
+            for endpoint in endpoints:
+                url, api_key = (endpoint, None) if isinstance(endpoint, str) else endpoint
+                clients.append(get_client(version="v3", network=network, api_key=api_key or toncenter_api_key, custom_endpoint=url))
+            toncenter = RpcScheduler(FailoverToncenter(clients, hedge=hedge, logger=logger), logger=logger)  # type: ignore
+        else:
+            toncenter = RpcScheduler(get_client(version="v3", network=network, api_key=toncenter_api_key), logger=logger)
 
         metadata = await cls.get_oracle_metadata(toncenter, oracle_addr_str)
 
@@ -169,6 +276,9 @@ class TicTonAsyncClient:
             oracle_addr=oracle_addr_str,
             wallet_version=wallet_version,
             threshold_price=threshold_price,
+            cache=cache,
+            wallet_pool=wallet_pool,
+            coalesce_ttl=coalesce_ttl,
             logger=logger,
         )
 
@@ -190,7 +300,8 @@ class TicTonAsyncClient:
         """
         assert price > 0, "price must be greater than 0"
         price = float(price)
-        return FixedFloat(price) * 10**self.metadata.quote_asset_decimals / 10**self.metadata.base_asset_decimals
+        # scale before multiplying by the price, so only the last division is rounded
+        return FixedFloat(10**self.metadata.quote_asset_decimals) * price / 10**self.metadata.base_asset_decimals
 
     async def _convert_fixedfloat_to_price(self, price: FixedFloat) -> float:
         """
@@ -249,38 +360,24 @@ class TicTonAsyncClient:
 
         return base_asset_balance, quote_asset_balance
 
-    async def _send(
-        self,
-        to_address: str,
-        amount: int,
-        seqno: int,
-        body: Cell,
-    ):
+    async def _send(self, wallet: PoolWallet, orders: Sequence[Order], valid_until: Optional[int] = None) -> SentMessage:
         """
-        _send will send the given amount of tokens to to_address, if dry_run is set to True, it will
-        call toncenter simulation api, otherwise it will send the transaction to the network directly.
+        _send signs the orders into one external message with the next seqno of the wallet, and sends it to the network.
 
         Parameters
         ----------
-        amount : int
-            The amount of TON to be sent
-        seqno : int
-            The seqno of user's wallet
-        body : Cell
-            The body of the transaction
-        dry_run : bool
-            Whether to call toncenter simulation api or not
+        wallet : PoolWallet
+            The wallet of the pool to send from
+        orders : Sequence[Order]
+            The internal messages to be sent, at most max_messages of the wallet
+        valid_until : Optional[int]
+            The unix time after which the message is rejected, default is 60 seconds from now
         """
         self.assert_wallet_exists()
-        query = self.wallet.create_transfer_message(  # type: ignore
-            to_addr=to_address,
-            amount=amount,
-            seqno=seqno,
-            payload=body,
-        )
-        boc: str = bytes_to_b64str(query["message"].to_boc(False))
-        result = await self.toncenter.send_message(ExternalMessage(boc=boc))
-        return result
+        async with wallet.sequencer.reserve(valid_until) as reservation:  # type: ignore
+            query = create_transfer_message(wallet.wallet, orders, reservation.seqno, reservation.valid_until)
+            boc: str = bytes_to_b64str(query["message"].to_boc(False))
+            return await self.toncenter.send_message(ExternalMessage(boc=boc))
 
     async def _estimate_from_oracle_get_method(
         self,
@@ -306,6 +403,13 @@ class TicTonAsyncClient:
         )
 
     async def get_alarm_address(self, alarm_id: int) -> PyAddress:
+        """
+        get_alarm_address returns the address of the alarm, it is computed locally once the alarm code is known,
+        see AlarmAddressResolver
+        """
+        return await self.alarm_resolver.resolve(alarm_id)
+
+    async def _get_alarm_address_from_oracle(self, alarm_id: int) -> PyAddress:
         result = await self.toncenter.run_get_method(
             RunGetMethodRequest(
                 address=self.oracle.to_string(),
@@ -321,25 +425,51 @@ class TicTonAsyncClient:
         result = await self.toncenter.get_account(GetAccountRequest(address=address))  # type: ignore
         return result.status
 
-    async def _estimate_wind(self, alarm_id: int, buy_num: int, new_price: float):
-        alarm_address = await self.get_alarm_address(alarm_id)
-        alarm_status = await self.get_address_state(alarm_address)
-        assert alarm_status == "active", "alarm is not active"
-
-        alarm_metadata = await self.get_alarm_metadata(alarm_address)
+    async def _estimate_wind(self, alarm_id: int, buy_num: int, new_price: float, graph: Optional[ActionGraph] = None):
+        """
+        _estimate_wind reads the state and the metadata of the alarm concurrently once the alarm address is known, the
+        estimate of the oracle is read as soon as the metadata shows that the price difference passes the threshold price
+        """
+        if graph is None:
+            async with ActionGraph("Estimate wind", self.logger) as graph:
+                return await self._estimate_wind(alarm_id, buy_num, new_price, graph)
 
         new_price_ff = await self._convert_price(new_price)
-        old_price_ff = FixedFloat(alarm_metadata.base_asset_price, skip_scale=True)
-        price_delta = abs(new_price_ff - old_price_ff)
 
-        if price_delta < self.threshold_price:
+        async def _alarm_state() -> str:
+            return await self.get_address_state(await graph.get("alarm_address"))
+
+        async def _alarm_metadata() -> AlarmMetadata:
+            return await self.get_alarm_metadata(await graph.get("alarm_address"))
+
+        def _over_threshold(alarm_metadata: AlarmMetadata) -> bool:
+            return passes_threshold(new_price_ff, FixedFloat(alarm_metadata.base_asset_price, skip_scale=True), self.threshold_price)
+
+        async def _estimate():
+            # the estimate is only read once the price difference is known to pass the threshold
+            if not _over_threshold(await graph.get("alarm_metadata")):
+                return None
+            alarm_address = await graph.get("alarm_address")
+            return await self._estimate_from_oracle_get_method(alarm_address.to_string(), buy_num, int(new_price_ff.raw_value))
+
+        graph.add("alarm_address", lambda: self.get_alarm_address(alarm_id))
+        graph.add("alarm_state", _alarm_state)
+        graph.add("alarm_metadata", _alarm_metadata)
+        graph.add("estimate", _estimate)
+
+        alarm_status = await graph.get("alarm_state")
+        assert alarm_status == "active", "alarm is not active"
+
+        alarm_metadata = await graph.get("alarm_metadata")
+
+        if not _over_threshold(alarm_metadata):
             return None, None, alarm_metadata
 
         (
             can_buy,
             need_base_asset,
             need_quote_asset,
-        ) = await self._estimate_from_oracle_get_method(alarm_address.to_string(), buy_num, int(new_price_ff.raw_value))
+        ) = await graph.get("estimate")
 
         return (
             can_buy,
@@ -353,7 +483,15 @@ class TicTonAsyncClient:
         need_base_asset: Decimal,
         need_quote_asset: Decimal,
     ):
-        base_asset_balance, quote_asset_balance = await self._get_user_balance(wallet_address)
+        self._check_afford(await self._get_user_balance(wallet_address), need_base_asset, need_quote_asset)
+
+    def _check_afford(
+        self,
+        balances: Tuple[Decimal, Decimal],
+        need_base_asset: Decimal,
+        need_quote_asset: Decimal,
+    ):
+        base_asset_balance, quote_asset_balance = balances
         if need_base_asset > base_asset_balance or need_quote_asset > quote_asset_balance:
             raise Exception(
                 f"expected base asset: {need_base_asset / 10 ** self.metadata.base_asset_decimals}, quote asset: {need_quote_asset / 10 ** self.metadata.quote_asset_decimals}, but got base asset: {base_asset_balance/ 10 ** self.metadata.base_asset_decimals}, quote asset: {quote_asset_balance/ 10 ** self.metadata.quote_asset_decimals}"
@@ -369,10 +507,12 @@ class TicTonAsyncClient:
     async def check_alarms(self, alarm_id_list: List[int]):
         self.logger.info("Checking Alarms State")
 
-        address_list = await self.toncenter.multicall([self.get_alarm_address(alarm_id) for alarm_id in alarm_id_list])
+        # a scan must not delay the reads and the messages of tick, ring and wind
+        with rpc_priority(Priority.BULK):
+            address_list = await self.toncenter.multicall([self.get_alarm_address(alarm_id) for alarm_id in alarm_id_list])
 
-        # get alarm state
-        state_list = await self.toncenter.multicall([self.get_address_state(address) for address in address_list])
+            # get alarm state
+            state_list = await self.toncenter.multicall([self.get_address_state(address) for address in address_list])
 
         # update alarm dict
         alarm_dict = {}
@@ -383,21 +523,23 @@ class TicTonAsyncClient:
 
         return alarm_dict
 
-    async def get_jetton_wallet_address(self, owner_address: str, jetton_address: str) -> AddressLike:
+    async def get_jetton_wallet_address(self, owner_address: AddressLike, jetton_address: AddressLike) -> PyAddress:
         """
-        get_jetton_wallet tries to get the jetton wallet info from the oracle contract or toncenter,
-        if calculated is True, it will call getJettonWallets method from oracle contract, otherwise it will call getWallet method from toncenter
+        get_jetton_wallet_address returns the jetton wallet address of the owner, it is computed locally from the wallet code
+        of the jetton master once the code is known, see JettonWalletResolver
         """
+        return await self.jetton_wallet_resolver.resolve(owner_address, jetton_address)
 
+    async def _get_jetton_wallet_address_from_master(self, owner_address: PyAddress, jetton_address: PyAddress) -> PyAddress:
         result = await self.toncenter.run_get_method(
             RunGetMethodRequest(
-                address=jetton_address,
+                address=jetton_address.to_string(),
                 method="get_wallet_address",
-                stack=[{"type": "addr", "value": owner_address}],
+                stack=[{"type": "addr", "value": owner_address.to_string()}],
             )
         )
         decoded = JettonWalletAddressDecoder().decode(result)
-        return decoded.wallet_address
+        return PyAddress(decoded.wallet_address)
 
     async def _action_check(self, dry_run: bool, wallet_addr_override: Optional[AddressLike] = None):
         if self.wallet is None and dry_run == False:
@@ -407,6 +549,217 @@ class TicTonAsyncClient:
             dry_run == True and wallet_addr_override is not None and isinstance(wallet_addr_override, (str, PyAddress))
         ), "wallet_addr_override must be provided in dry_run mode"
 
+    def _dry_run_address(self, wallet_addr_override: Optional[AddressLike]) -> PyAddress:
+        my_wallet_address = PyAddress(self.wallet.address.to_string() if self.wallet is not None else wallet_addr_override)  # type: ignore
+        assert my_wallet_address is not None, "wallet address is not found"
+        return my_wallet_address
+
+    def _wallet_lookup(self, graph: ActionGraph, kind: Literal["balance", "jetton_wallet", "seqno"], wallet_address: PyAddress, wallet: Optional[PoolWallet] = None) -> str:
+        """
+        _wallet_lookup adds a lookup of the wallet to the graph unless it is added already, and returns the name of its node
+        """
+        name = f"{kind}:{wallet_address.to_string()}"
+        if graph.has(name):
+            return name
+        if kind == "balance":
+            graph.add(name, lambda: self._get_user_balance(wallet_address))
+        elif kind == "jetton_wallet":
+            graph.add(name, lambda: self.get_jetton_wallet_address(wallet_address, self.metadata.quote_asset_address))
+        else:
+            assert wallet is not None and wallet.sequencer is not None, "seqno is only looked up for the wallets of the pool"
+            graph.add(name, wallet.sequencer.prepare)
+        return name
+
+    def _add_wallet_lookups(
+        self,
+        graph: ActionGraph,
+        dry_run: bool,
+        wallet_addr_override: Optional[AddressLike],
+        *,
+        balance: bool,
+        jetton_wallet: bool,
+    ):
+        """
+        _add_wallet_lookups adds the lookups of the wallets that the action will most likely be sent from to the graph, they
+        depend neither on each other nor on the action: the balances, the jetton wallet of the quote asset and the seqno of
+        the wallet. The balances of every wallet of the pool are looked up since WalletPool.acquire checks them all, the
+        jetton wallet and the seqno only of the least loaded one, another wallet is looked up when the action goes to it.
+        """
+        if dry_run:
+            candidates = [(self._dry_run_address(wallet_addr_override), None)]
+        else:
+            candidates = [(wallet.address, wallet) for wallet in self.wallet_pool.ranked()]  # type: ignore
+        if balance:
+            for wallet_address, _ in candidates:
+                self._wallet_lookup(graph, "balance", wallet_address)
+        wallet_address, wallet = candidates[0]
+        if jetton_wallet:
+            self._wallet_lookup(graph, "jetton_wallet", wallet_address)
+        if wallet is not None:
+            self._wallet_lookup(graph, "seqno", wallet_address, wallet)
+
+    @asynccontextmanager
+    async def _use_wallet(
+        self,
+        dry_run: bool,
+        wallet_addr_override: Optional[AddressLike],
+        need_base_asset: Optional[Decimal] = None,
+        need_quote_asset: Optional[Decimal] = None,
+        graph: Optional[ActionGraph] = None,
+    ) -> AsyncIterator[Tuple[PyAddress, Optional[PoolWallet]]]:
+        """
+        _use_wallet picks the wallet of an action and checks that it can afford the assets if they are given. In dry_run mode
+        it is the wallet of the client or wallet_addr_override, otherwise it is the least loaded wallet of the pool that can
+        afford the action, see WalletPool.acquire. The balances are read through the graph, so each one is read once.
+        """
+
+        async def _afford(wallet_address: PyAddress, need_base_asset: Decimal, need_quote_asset: Decimal):
+            if graph is None:
+                return await self._must_afford(wallet_address, need_base_asset, need_quote_asset)
+            self._check_afford(await graph.get(self._wallet_lookup(graph, "balance", wallet_address)), need_base_asset, need_quote_asset)
+
+        if dry_run:
+            my_wallet_address = self._dry_run_address(wallet_addr_override)
+            if need_base_asset is not None:
+                await _afford(my_wallet_address, need_base_asset, need_quote_asset)  # type: ignore
+            yield my_wallet_address, None
+            return
+
+        async with self.wallet_pool.acquire(  # type: ignore
+            need_base_asset or Decimal(0),
+            need_quote_asset or Decimal(0),
+            (lambda wallet, need_base_asset, need_quote_asset: _afford(wallet.address, need_base_asset, need_quote_asset)) if need_base_asset is not None else None,
+        ) as wallet:
+            yield wallet.address, wallet
+
+    async def _act(
+        self,
+        graph: ActionGraph,
+        dry_run: bool,
+        wallet_addr_override: Optional[AddressLike],
+        build_order: Callable[[PyAddress], Awaitable[Order]],
+        valid_until: Optional[int],
+        need_base_asset: Optional[Decimal] = None,
+        need_quote_asset: Optional[Decimal] = None,
+    ) -> Union[SentMessage, DryRunResult]:
+        """
+        _act is the last node of an action graph, it routes the action to a wallet that can afford it, builds the order for
+        the wallet and sends it, or returns the order in dry_run mode
+        """
+        async with self._use_wallet(dry_run, wallet_addr_override, need_base_asset, need_quote_asset, graph) as (my_wallet_address, wallet):
+            order = await build_order(my_wallet_address)
+            if wallet is None:
+                return self._dry_run_result(order)
+            await graph.get(self._wallet_lookup(graph, "seqno", my_wallet_address, wallet))
+            return await self._send(wallet, [order], valid_until)
+
+    def _dry_run_result(self, order: Order) -> DryRunResult:
+        destination, amount, body = order
+        return DryRunResult(boc=bytes_to_b64str(body.to_boc(False)), desitnation=destination, amount=amount)
+
+    async def _tick_amounts(self, price: float, extra_ton: float) -> Tuple[int, float, int]:
+        """
+        _tick_amounts returns the base asset price, the quote asset transferred and the forward ton amount of a tick
+        """
+        base_asset_price = await self._convert_price(price)
+        quote_asset_transfered = FixedFloat(to_token(price, self.metadata.quote_asset_decimals))
+        forward_ton_amount = quote_asset_transfered / base_asset_price + to_token(extra_ton, self.metadata.base_asset_decimals)
+        return int(base_asset_price.raw_value), quote_asset_transfered.to_float(), int(round(forward_ton_amount.to_float(), 0))
+
+    def _prepare_tick(
+        self,
+        jetton_wallet_address: PyAddress,
+        wallet_address: PyAddress,
+        timeout: int,
+        base_asset_price: int,
+        quote_asset_transfered: float,
+        forward_ton_amount: int,
+    ) -> Order:
+        """
+        _prepare_tick builds the jetton transfer of a tick
+        """
+        expire_at = int(time.time()) + timeout
+        forward_info = begin_cell().store_uint(0, 8).store_uint(expire_at, 256).store_uint(base_asset_price, 256).end_cell()
+
+        # jetton transfer
+        body = (
+            begin_cell()
+            .store_uint(0xF8A7EA5, 32)
+            .store_uint(0, 64)
+            .store_coins(quote_asset_transfered)
+            .store_address(self.oracle)
+            .store_address(wallet_address)
+            .store_bit(False)
+            .store_coins(forward_ton_amount)
+            .store_ref(forward_info)
+            .end_cell()
+        )
+        return jetton_wallet_address, forward_ton_amount + _TICK_GAS_FEE, body
+
+    async def _prepare_ring(self, alarm_id: int) -> Order:
+        """
+        _prepare_ring builds the ring message of an active alarm
+        """
+        alarm_address = await self.get_alarm_address(alarm_id)
+        alarm_state = await self.get_address_state(alarm_address)
+        assert alarm_state == "active", "Ring: alarm is not exist"
+        body = begin_cell().store_uint(0xC3510A29, 32).store_uint(1, 257).store_uint(alarm_id, 257).end_cell()  # query_id cannot be 0
+        return self.oracle, _RING_GAS_FEE, body
+
+    async def _wind_need(
+        self,
+        alarm_id: int,
+        buy_num: int,
+        new_price: float,
+        skip_estimate: bool,
+        need_base_asset: Optional[Decimal],
+        need_quote_asset: Optional[Decimal],
+        graph: Optional[ActionGraph] = None,
+    ) -> Tuple[Decimal, Decimal]:
+        """
+        _wind_need returns the base asset and quote asset needed by a wind, estimated by the oracle unless skip_estimate is set
+        """
+        if skip_estimate:
+            assert need_base_asset is not None, "need_base_asset must be provided"
+            assert need_quote_asset is not None, "need_quote_asset must be provided"
+            return need_base_asset, need_quote_asset
+        can_buy, need_asset_tup, _ = await self._estimate_wind(alarm_id, buy_num, new_price, graph)
+        assert can_buy, "Buy num is too large"
+        assert need_asset_tup is not None, "The price difference is smaller than threshold price"
+        return need_asset_tup
+
+    async def _prepare_wind(
+        self,
+        jetton_wallet_address: PyAddress,
+        wallet_address: PyAddress,
+        alarm_id: int,
+        buy_num: int,
+        new_price: float,
+        need_base_asset: Decimal,
+        need_quote_asset: Decimal,
+    ) -> Order:
+        """
+        _prepare_wind builds the jetton transfer of a wind
+        """
+        new_price_ff = await self._convert_price(new_price)
+        forward_ton_amount = int(need_base_asset) + _WIND_GAS_FEE
+
+        forward_info = begin_cell().store_uint(1, 8).store_uint(alarm_id, 256).store_uint(buy_num, 32).store_uint(int(new_price_ff.raw_value), 256).end_cell()
+
+        body = (
+            begin_cell()
+            .store_uint(0xF8A7EA5, 32)
+            .store_uint(0, 64)
+            .store_coins(int(need_quote_asset))
+            .store_address(self.oracle)
+            .store_address(wallet_address)
+            .store_bit(False)
+            .store_coins(forward_ton_amount)
+            .store_ref(forward_info)
+            .end_cell()
+        )
+        return jetton_wallet_address, forward_ton_amount + _WIND_GAS_FEE, body
+
     @overload
     async def tick(
         self,
@@ -416,6 +769,7 @@ class TicTonAsyncClient:
         timeout: int = 1000,
         extra_ton: float = 0.1,
         wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
         **kwargs,
     ) -> SentMessage:
         """
@@ -431,6 +785,7 @@ class TicTonAsyncClient:
         timeout: int = 1000,
         extra_ton: float = 0.1,
         wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
         **kwargs,
     ) -> DryRunResult:
         """
@@ -445,6 +800,7 @@ class TicTonAsyncClient:
         timeout: int = 1000,
         extra_ton: float = 0.1,
         wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
         **kwargs,
     ):
         """
@@ -464,6 +820,8 @@ class TicTonAsyncClient:
         wallet_addr_override : Optional[str]
             it is useful when mnemonics is not provided, you can override the wallet address with this parameter
             only works when dry_run is set to True
+        valid_until : Optional[int]
+            The unix time after which the message is rejected, default is 60 seconds from now
 
         Examples
         --------
@@ -477,68 +835,33 @@ class TicTonAsyncClient:
         assert price > 0, "price must be greater than 0"
         await self._action_check(dry_run, wallet_addr_override)
 
-        expire_at = int(time.time()) + timeout
         price = round(price, self.metadata.quote_asset_decimals)
-        base_asset_price = await self._convert_price(price)
-        quote_asset_transfered = FixedFloat(to_token(price, self.metadata.quote_asset_decimals))
-        forward_ton_amount = quote_asset_transfered / base_asset_price + to_token(extra_ton, self.metadata.base_asset_decimals)
-        base_asset_price = int(base_asset_price.raw_value)
-        quote_asset_transfered = quote_asset_transfered.to_float()
-        forward_ton_amount = int(round(forward_ton_amount.to_float(), 0))
-        gas_fee = int(0.13 * 10**9)
-
-        forward_info = begin_cell().store_uint(0, 8).store_uint(expire_at, 256).store_uint(base_asset_price, 256).end_cell()
-
-        my_wallet_address = PyAddress(self.wallet.address.to_string() if self.wallet is not None else wallet_addr_override)  # type: ignore
-        assert my_wallet_address is not None, "wallet address is not found"
-        await self._must_afford(my_wallet_address, Decimal(forward_ton_amount + gas_fee), Decimal(quote_asset_transfered))  # type: ignore
-
-        # jetton transfer
-        body = (
-            begin_cell()
-            .store_uint(0xF8A7EA5, 32)
-            .store_uint(0, 64)
-            .store_coins(quote_asset_transfered)
-            .store_address(self.oracle)
-            .store_address(my_wallet_address)
-            .store_bit(False)
-            .store_coins(forward_ton_amount)
-            .store_ref(forward_info)
-            .end_cell()
-        )
-
-        jetton_wallet = await self.toncenter.get_jetton_wallets(
-            GetSpecifiedJettonWalletRequest(
-                owner_address=my_wallet_address,  # type: ignore
-                jetton_address=self.metadata.quote_asset_address,
+        base_asset_price, quote_asset_transfered, forward_ton_amount = await self._tick_amounts(price, extra_ton)
+        need_base_asset = forward_ton_amount + _TICK_GAS_FEE
+
+        async def _order(wallet_address: PyAddress) -> Order:
+            jetton_wallet_address = await graph.get(self._wallet_lookup(graph, "jetton_wallet", wallet_address))
+            return self._prepare_tick(jetton_wallet_address, wallet_address, timeout, base_asset_price, quote_asset_transfered, forward_ton_amount)
+
+        # the balances, the jetton wallet and the seqno are looked up concurrently, then the tick is sent
+        async with ActionGraph("Tick", self.logger) as graph:
+            self._add_wallet_lookups(graph, dry_run, wallet_addr_override, balance=True, jetton_wallet=True)
+            graph.add(
+                "send",
+                lambda: self._act(graph, dry_run, wallet_addr_override, _order, valid_until, Decimal(need_base_asset), Decimal(quote_asset_transfered)),
             )
-        )
-
-        wallet_info = await self.toncenter.get_wallet(GetWalletRequest(address=my_wallet_address))  # type: ignore
-
-        assert jetton_wallet is not None, f"jetton wallet does not found, you may need to get some token to initialize the jetton wallet"
-        assert wallet_info.seqno is not None, "seqno is not found"
-
+            result = await graph.get("send")
+        self.logger.debug(graph.report("send"))
         if dry_run:
-            return DryRunResult(
-                boc=bytes_to_b64str(body.to_boc(False)),
-                desitnation=jetton_wallet.address,
-                amount=forward_ton_amount + gas_fee,
-            )
-
-        result = await self._send(
-            to_address=jetton_wallet.address.to_string(),  # type: ignore
-            amount=forward_ton_amount + gas_fee,
-            seqno=wallet_info.seqno,
-            body=body,
-        )
+            return result
 
         args = [
             price,
-            token_to_float(forward_ton_amount + gas_fee, self.metadata.base_asset_decimals),
+            token_to_float(need_base_asset, self.metadata.base_asset_decimals),
             token_to_float(quote_asset_transfered, self.metadata.quote_asset_decimals),
+            graph.latency("send"),
         ]
-        log_info = ("Tick message successfully sent, tick price: {}, spend base asset: {}, spend quote asset: {}").format(*args)
+        log_info = ("Tick message successfully sent, tick price: {}, spend base asset: {}, spend quote asset: {}, latency: {:.3f}s").format(*args)
         self.logger.info(log_info)
 
         return result
@@ -550,6 +873,7 @@ class TicTonAsyncClient:
         dry_run: Literal[False] = False,
         *,
         wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
         **kwargs,
     ) -> SentMessage:
         """
@@ -563,6 +887,7 @@ class TicTonAsyncClient:
         dry_run: Literal[True] = True,
         *,
         wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
         **kwargs,
     ) -> DryRunResult:
         """
@@ -575,6 +900,7 @@ class TicTonAsyncClient:
         dry_run: bool = False,
         *,
         wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
         **kwargs,
     ):
         """
@@ -589,6 +915,8 @@ class TicTonAsyncClient:
         wallet_addr_override : Optional[str]
             it is useful when mnemonics is not provided, you can override the wallet address with this parameter
             only works when dry_run is set to True
+        valid_until : Optional[int]
+            The unix time after which the message is rejected, default is 60 seconds from now
 
         Examples
         --------
@@ -596,31 +924,22 @@ class TicTonAsyncClient:
         >>> await client.ring(123)
         """
         await self._action_check(dry_run, wallet_addr_override)
-        my_wallet_address = PyAddress(self.wallet.address.to_string() if self.wallet is not None else wallet_addr_override)  # type: ignore
 
-        alarm_address = await self.get_alarm_address(alarm_id)
-        alarm_state = await self.get_address_state(alarm_address)
-        assert alarm_state == "active", "Ring: alarm is not exist"
-        wallet = await self.toncenter.get_wallet(GetWalletRequest(address=my_wallet_address))  # type: ignore
-        assert wallet.seqno is not None, "Ring: seqno is not found in wallet info"
-        gas_fee = int(0.35 * 10**9)
-        body = begin_cell().store_uint(0xC3510A29, 32).store_uint(1, 257).store_uint(alarm_id, 257).end_cell()  # query_id cannot be 0
+        async def _order(_: PyAddress) -> Order:
+            return await graph.get("order")
 
+        # the alarm and the seqno are looked up concurrently, then the ring is sent
+        async with ActionGraph("Ring", self.logger) as graph:
+            graph.add("order", lambda: self._prepare_ring(alarm_id))
+            self._add_wallet_lookups(graph, dry_run, wallet_addr_override, balance=False, jetton_wallet=False)
+            graph.add("send", lambda: self._act(graph, dry_run, wallet_addr_override, _order, valid_until))
+            result = await graph.get("send")
+        self.logger.debug(graph.report("send"))
         if dry_run:
-            return DryRunResult(
-                boc=bytes_to_b64str(body.to_boc(False)),
-                desitnation=self.oracle,  # type: ignore
-                amount=gas_fee,
-            )
-        result = await self._send(
-            to_address=self.oracle.to_string(),
-            amount=gas_fee,
-            seqno=wallet.seqno,
-            body=body,
-        )
+            return result
 
-        args = [alarm_id]
-        log_info = "Ring message successfully sent, alarm id: {}".format(*args)
+        args = [alarm_id, graph.latency("send")]
+        log_info = "Ring message successfully sent, alarm id: {}, latency: {:.3f}s".format(*args)
         self.logger.info(log_info)
 
         return result
@@ -637,6 +956,7 @@ class TicTonAsyncClient:
         dry_run: Literal[False] = False,
         *,
         wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
         **kwargs,
     ) -> SentMessage:
         """
@@ -655,6 +975,7 @@ class TicTonAsyncClient:
         dry_run: Literal[True] = True,
         *,
         wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
         **kwargs,
     ) -> DryRunResult:
         """
@@ -672,6 +993,7 @@ class TicTonAsyncClient:
         dry_run: bool = False,
         *,
         wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
         **kwargs,
     ):
         """
@@ -687,6 +1009,8 @@ class TicTonAsyncClient:
             The new price of the position quoteAsset/baseAsset
         dry_run : bool
             Whether to call toncenter simulation api or not
+        valid_until : Optional[int]
+            The unix time after which the message is rejected, default is 60 seconds from now
 
         Examples
         --------
@@ -701,93 +1025,254 @@ class TicTonAsyncClient:
         assert isinstance(buy_num, int), "buy_num must be an int"
         assert buy_num > 0, "buy_num must be greater than 0"
 
-        my_wallet_address = PyAddress(self.wallet.address.to_string() if self.wallet is not None else wallet_addr_override)  # type: ignore
+        async def _order(wallet_address: PyAddress) -> Order:
+            need_base_asset, need_quote_asset = await graph.get("need")
+            jetton_wallet_address = await graph.get(self._wallet_lookup(graph, "jetton_wallet", wallet_address))
+            return await self._prepare_wind(jetton_wallet_address, wallet_address, alarm_id, buy_num, new_price, need_base_asset, need_quote_asset)
+
+        async def _send() -> Union[SentMessage, DryRunResult]:
+            need_base_asset, need_quote_asset = await graph.get("need")
+            return await self._act(graph, dry_run, wallet_addr_override, _order, valid_until, Decimal(need_base_asset + _WIND_GAS_FEE), need_quote_asset)
+
+        # the estimate of the alarm and the balances, the jetton wallet and the seqno are looked up concurrently, then the wind is sent
+        async with ActionGraph("Wind", self.logger) as graph:
+            self._add_wallet_lookups(graph, dry_run, wallet_addr_override, balance=True, jetton_wallet=True)
+            graph.add("need", lambda: self._wind_need(alarm_id, buy_num, new_price, skip_estimate, need_base_asset, need_quote_asset, graph))  # type: ignore
+            graph.add("send", _send)
+            result = await graph.get("send")
+            spent_base_asset, spent_quote_asset = await graph.get("need")
+        self.logger.debug(graph.report("send"))
+        if dry_run:
+            return result
 
-        new_price_ff = await self._convert_price(new_price)
+        args = [
+            alarm_id,
+            buy_num,
+            new_price,
+            token_to_float(spent_base_asset, self.metadata.base_asset_decimals),
+            token_to_float(spent_quote_asset, self.metadata.quote_asset_decimals),
+            graph.latency("send"),
+        ]
+        log_info = ("Wind message successfully sent, alarm id: {}, buy num: {}, wind price: {}, spend base asset: {}, spend quote asset: {}, latency: {:.3f}s").format(*args)
+        self.logger.info(log_info)
 
-        if skip_estimate:
-            assert need_base_asset is not None, "need_base_asset must be provided"
-            assert need_quote_asset is not None, "need_quote_asset must be provided"
-        else:
-            can_buy, need_asset_tup, _ = await self._estimate_wind(alarm_id, buy_num, new_price)
-            assert can_buy, "Buy num is too large"
-            assert need_asset_tup is not None, "The price difference is smaller than threshold price"
+        return result
 
-            need_base_asset, need_quote_asset = need_asset_tup
+    async def _send_batch(
+        self,
+        prepared: Sequence[Union[Tuple[Order, Decimal, Decimal], BaseException]],
+        wallet_address: PyAddress,
+        wallet: Optional[PoolWallet],
+        valid_until: Optional[int],
+        check_balance: bool = True,
+    ) -> List[BatchItemResult]:
+        """
+        _send_batch checks the balance once for all prepared items, the items are accepted in order until the balance runs out,
+        then the accepted orders are packed into as few external messages as the wallet allows and sent in order.
 
-        gas_fee = int(0.5 * 10**9)
-        forward_ton_amount = int(need_base_asset) + gas_fee
+        Parameters
+        ----------
+        prepared : Sequence[Union[Tuple[Order, Decimal, Decimal], BaseException]]
+            The order, the base asset and the quote asset needed by each item, or the error raised while preparing it
+        wallet_address : PyAddress
+            The address of the wallet the orders are prepared for
+        wallet : Optional[PoolWallet]
+            The wallet of the pool to send from, None in dry_run mode
+        """
+        results = [BatchItemResult(index=i) for i in range(len(prepared))]
+        accepted: List[Tuple[int, Order]] = []
+        base_asset_left = quote_asset_left = Decimal(0)
+        if check_balance and any(not isinstance(item, BaseException) for item in prepared):
+            base_asset_left, quote_asset_left = await self._get_user_balance(wallet_address)
+        for i, item in enumerate(prepared):
+            if isinstance(item, BaseException):
+                results[i].error = str(item) or type(item).__name__
+                continue
+            order, need_base_asset, need_quote_asset = item
+            results[i].message = self._dry_run_result(order)
+            if check_balance:
+                if need_base_asset > base_asset_left or need_quote_asset > quote_asset_left:
+                    results[i].error = "insufficient balance"
+                    continue
+                base_asset_left -= need_base_asset
+                quote_asset_left -= need_quote_asset
+            accepted.append((i, order))
+
+        if wallet is None or len(accepted) == 0:
+            return results
+
+        limit = wallet.max_messages
+        # a later message can only be accepted after the earlier ones, so the chunks are sent in order
+        for start in range(0, len(accepted), limit):
+            chunk = accepted[start : start + limit]
+            try:
+                result = await self._send(wallet, [order for _, order in chunk], valid_until)
+            except Exception as e:
+                for i, _ in chunk:
+                    results[i].error = str(e) or type(e).__name__
+                continue
+            for i, _ in chunk:
+                results[i].result = result
+        sent = sum(1 for result in results if result.result is not None)
+        self.logger.info(f"Batch successfully sent {sent} of {len(results)} messages in {(len(accepted) + limit - 1) // limit} external messages")
+        return results
+
+    async def tick_many(
+        self,
+        prices: Sequence[float],
+        dry_run: bool = False,
+        *,
+        timeout: int = 1000,
+        extra_ton: float = 0.1,
+        wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
+    ) -> List[BatchItemResult]:
+        """
+        tick_many opens a position for each price, the ticks are sent in as few external messages as the wallet allows,
+        which is 4 messages for v2, v3 and v4 wallets and 254 messages for highload wallets.
 
-        await self._must_afford(my_wallet_address, Decimal(need_base_asset + gas_fee), need_quote_asset)  # type: ignore
+        Parameters
+        ----------
+        prices : Sequence[float]
+            The prices of the positions quoteAsset/baseAsset
+        timeout : int
+            The timeout of the positions in seconds
+        extra_ton : float
+            The extra ton to be sent to the oracle with each tick
+        dry_run : bool
+            Whether to send the messages or only build them
+        wallet_addr_override : Optional[str]
+            it is useful when mnemonics is not provided, you can override the wallet address with this parameter
+            only works when dry_run is set to True
+        valid_until : Optional[int]
+            The unix time after which the messages are rejected, default is 60 seconds from now
 
-        forward_info = begin_cell().store_uint(1, 8).store_uint(alarm_id, 256).store_uint(buy_num, 32).store_uint(int(new_price_ff.raw_value), 256).end_cell()
+        Examples
+        --------
+        >>> results = await client.tick_many([2.5, 2.6, 2.7])
+        >>> [result.ok for result in results]
+        """
+        assert extra_ton >= 0.1, "extra_ton must be greater than or equal to 0.1"
+        await self._action_check(dry_run, wallet_addr_override)
 
-        body = (
-            begin_cell()
-            .store_uint(0xF8A7EA5, 32)
-            .store_uint(0, 64)
-            .store_coins(int(need_quote_asset))
-            .store_address(self.oracle)
-            .store_address(my_wallet_address)
-            .store_bit(False)
-            .store_coins(forward_ton_amount)
-            .store_ref(forward_info)
-            .end_cell()
-        )
+        async with self._use_wallet(dry_run, wallet_addr_override) as (my_wallet_address, wallet):
 
-        jetton_wallet = await self.toncenter.get_jetton_wallets(
-            GetSpecifiedJettonWalletRequest(
-                owner_address=my_wallet_address,  # type: ignore
-                jetton_address=self.metadata.quote_asset_address,
-            )
-        )
+            async def _prepare(price: float) -> Tuple[Order, Decimal, Decimal]:
+                assert price > 0, "price must be greater than 0"
+                base_asset_price, quote_asset_transfered, forward_ton_amount = await self._tick_amounts(round(price, self.metadata.quote_asset_decimals), extra_ton)
+                jetton_wallet_address = await self.get_jetton_wallet_address(my_wallet_address, self.metadata.quote_asset_address)
+                order = self._prepare_tick(jetton_wallet_address, my_wallet_address, timeout, base_asset_price, quote_asset_transfered, forward_ton_amount)
+                return order, Decimal(order[1]), Decimal(quote_asset_transfered)
 
-        assert jetton_wallet is not None, "jetton wallet does not found"
+            prepared = await asyncio.gather(*[_prepare(price) for price in prices], return_exceptions=True)
+            return await self._send_batch(prepared, my_wallet_address, wallet, valid_until)
 
-        if dry_run:
-            return DryRunResult(
-                boc=bytes_to_b64str(body.to_boc(False)),
-                desitnation=jetton_wallet.address,
-                amount=forward_ton_amount + gas_fee,
-            )
+    async def ring_many(
+        self,
+        alarm_ids: Sequence[int],
+        dry_run: bool = False,
+        *,
+        wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
+    ) -> List[BatchItemResult]:
+        """
+        ring_many closes the positions with the given alarm ids, the rings are sent in as few external messages as the
+        wallet allows, alarms that are not active are reported in the results and skipped.
+
+        Parameters
+        ----------
+        alarm_ids : Sequence[int]
+            The alarm ids of the positions to be closed
+        dry_run : bool
+            Whether to send the messages or only build them
+        wallet_addr_override : Optional[str]
+            it is useful when mnemonics is not provided, you can override the wallet address with this parameter
+            only works when dry_run is set to True
+        valid_until : Optional[int]
+            The unix time after which the messages are rejected, default is 60 seconds from now
 
-        wallet_info = await self.toncenter.get_wallet(GetWalletRequest(address=my_wallet_address))  # type: ignore
-        assert wallet_info.seqno is not None, "seqno is not found in wallet info"
+        Examples
+        --------
+        >>> results = await client.ring_many(expired_alarm_ids)
+        """
+        await self._action_check(dry_run, wallet_addr_override)
 
-        result = await self._send(
-            to_address=jetton_wallet.address.to_string(),  # type: ignore
-            amount=forward_ton_amount + gas_fee,
-            seqno=wallet_info.seqno,
-            body=body,
-        )
+        async def _prepare(alarm_id: int) -> Tuple[Order, Decimal, Decimal]:
+            return await self._prepare_ring(alarm_id), Decimal(0), Decimal(0)
 
-        args = [
-            alarm_id,
-            buy_num,
-            new_price,
-            token_to_float(need_base_asset, self.metadata.base_asset_decimals),
-            token_to_float(need_quote_asset, self.metadata.quote_asset_decimals),
-        ]
-        log_info = ("Wind message successfully sent, alarm id: {}, buy num: {}, wind price: {}, spend base asset: {}, spend quote asset: {}").format(*args)
-        self.logger.info(log_info)
+        prepared = await asyncio.gather(*[_prepare(alarm_id) for alarm_id in alarm_ids], return_exceptions=True)
+        async with self._use_wallet(dry_run, wallet_addr_override) as (my_wallet_address, wallet):
+            return await self._send_batch(prepared, my_wallet_address, wallet, valid_until, check_balance=False)
 
-        return result
+    async def wind_many(
+        self,
+        winds: Sequence[Tuple[int, int, float]],
+        dry_run: bool = False,
+        *,
+        wallet_addr_override: Optional[AddressLike] = None,
+        valid_until: Optional[int] = None,
+    ) -> List[BatchItemResult]:
+        """
+        wind_many arbitrages the positions, each wind is estimated by the oracle and the winds are sent in as few external
+        messages as the wallet allows.
+
+        Parameters
+        ----------
+        winds : Sequence[Tuple[int, int, float]]
+            The (alarm_id, buy_num, new_price) of each wind
+        dry_run : bool
+            Whether to send the messages or only build them
+        wallet_addr_override : Optional[str]
+            it is useful when mnemonics is not provided, you can override the wallet address with this parameter
+            only works when dry_run is set to True
+        valid_until : Optional[int]
+            The unix time after which the messages are rejected, default is 60 seconds from now
+
+        Examples
+        --------
+        >>> results = await client.wind_many([(123, 1, 5.0), (124, 2, 5.0)])
+        """
+        await self._action_check(dry_run, wallet_addr_override)
+
+        async with self._use_wallet(dry_run, wallet_addr_override) as (my_wallet_address, wallet):
+
+            async def _prepare(alarm_id: int, buy_num: int, new_price: float) -> Tuple[Order, Decimal, Decimal]:
+                assert new_price > 0, "new_price must be greater than 0"
+                assert isinstance(buy_num, int), "buy_num must be an int"
+                assert buy_num > 0, "buy_num must be greater than 0"
+                need_base_asset, need_quote_asset = await self._wind_need(alarm_id, buy_num, new_price, False, None, None)
+                jetton_wallet_address = await self.get_jetton_wallet_address(my_wallet_address, self.metadata.quote_asset_address)
+                order = await self._prepare_wind(jetton_wallet_address, my_wallet_address, alarm_id, buy_num, new_price, need_base_asset, need_quote_asset)
+                return order, Decimal(need_base_asset + _WIND_GAS_FEE), Decimal(need_quote_asset)
+
+            prepared = await asyncio.gather(*[_prepare(*wind) for wind in winds], return_exceptions=True)
+            return await self._send_batch(prepared, my_wallet_address, wallet, valid_until)
 
     async def _validate_subscribe_param(
         self,
-        start_lt: Union[int, Literal["latest", "oldest"]],
+        start_lt: Union[int, Literal["latest", "oldest", "checkpoint"]],
         interval: Union[int, float],
         limit: int,
+        checkpoint: Optional[CheckpointStore] = None,
     ) -> SubscribeParam:
         # Check start_lt
         assert isinstance(start_lt, int) or start_lt in [
             "latest",
             "oldest",
-        ], "start_lt must be an int or 'latest' or 'oldest'"
+            "checkpoint",
+        ], "start_lt must be an int or 'latest' or 'oldest' or 'checkpoint'"
+        assert start_lt != "checkpoint" or checkpoint is not None, "checkpoint must be provided when start_lt is 'checkpoint'"
         # Default option is "oldest"
         begin_lt = None
+        last_hash = None
         if isinstance(start_lt, int):
             begin_lt = start_lt
+        if start_lt == "checkpoint":
+            # Resume after the last fully processed transaction, fallback to "oldest" if there is no checkpoint yet
+            saved = checkpoint.load(self.oracle.to_string())  # type: ignore
+            if saved is not None:
+                begin_lt = saved.lt
+                last_hash = saved.hash
         if start_lt == "latest":
             latest_txs, _ = await self.toncenter.get_transactions(
                 GetTransactionsRequest(
@@ -799,21 +1284,81 @@ class TicTonAsyncClient:
             begin_lt = latest_txs[0].lt if len(latest_txs) == 1 else None
         return SubscribeParam(
             start_lt=begin_lt,
+            last_hash=last_hash,
             interval=interval,
             limit=limit,
-            offset=0,
             account=self.oracle.to_string(),
         )
 
+    async def _fetch_next_page(
+        self,
+        params: SubscribeParam,
+        *,
+        limit: Optional[int] = None,
+        pages: int = 1,
+        end_lt: Optional[int] = None,
+    ) -> List[Transaction]:
+        """
+        _fetch_next_page fetches the transactions after the cursor (start_lt, last_hash) of params in ascending order,
+        and moves the cursor to the last transaction of the page. Every page is a range query starting from the cursor,
+        so the cost of a poll does not grow with the number of transactions that have been seen. start_lt is inclusive
+        until a transaction at it has been seen, i.e. last_hash is set.
+
+        Parameters
+        ----------
+        limit : Optional[int]
+            The page size, default is params.limit
+        pages : int
+            The number of consecutive pages after the cursor to fetch concurrently, default is 1
+        end_lt : Optional[int]
+            The lt to stop at (inclusive), default is None which means no upper bound
+        """
+        limit = limit or params.limit
+        # the lt of an account is unique, so the page starts right after the transaction at the cursor, which would
+        # otherwise take a slot of every page and stall a page of one transaction
+        start_lt = params.start_lt + 1 if params.start_lt is not None and params.last_hash is not None else params.start_lt
+        reqs = [
+            GetTransactionsRequest(
+                account=self.oracle.to_string(True),
+                start_lt=start_lt,
+                end_lt=end_lt,
+                limit=limit,
+                offset=i * limit,
+                sort="asc",
+            )
+            for i in range(pages)
+        ]
+        if pages == 1:
+            txs, _ = await self.toncenter.get_transactions(reqs[0])
+        else:
+            results = await self.toncenter.multicall([self.toncenter.get_transactions(req) for req in reqs])
+            txs = []
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+                txs.extend(result[0])
+                if len(result[0]) < limit:
+                    break
+        if len(txs) > 0:
+            params.start_lt = txs[-1].lt
+            params.last_hash = txs[-1].hash
+        return txs
+
     async def subscribe(
         self,
         on_tick_success: Callable[[OnTickSuccessParams], Coroutine[Any, Any, None]] = handle_noop,
         on_wind_success: Callable[[OnWindSuccessParams], Coroutine[Any, Any, None]] = handle_noop,
         on_ring_success: Callable[[OnRingSuccessParams], Coroutine[Any, Any, None]] = handle_noop,
-        start_lt: Union[int, Literal["latest", "oldest"]] = "oldest",
+        start_lt: Union[int, Literal["latest", "oldest", "checkpoint"]] = "oldest",
         interval: Union[int, float] = 2.0,
         *,
         limit: int = 128,
+        confirm_delivery: bool = False,
+        checkpoint: Optional[CheckpointStore] = None,
+        dispatcher: Optional[CallbackDispatcher] = None,
+        polling: Optional[AdaptivePolling] = None,
+        store: Optional[EventStore] = None,
+        payload: Literal["full", "compact"] = "full",
     ):
         """
         subscribe will subscribe to the oracle's notifications and chimes, and call the corresponding callback functions when a notification or chime is received.
@@ -829,61 +1374,316 @@ class TicTonAsyncClient:
         on_ring_success : Callable[[OnRingSuccessParams], Coroutine[Any, Any, None]]
             The callback function to be called when a chime is received
 
-        start_lt : Optional[int]
-            The lt to start from, if None, the oldest lt will be used
+        start_lt : Union[int, Literal["latest", "oldest", "checkpoint"]]
+            The lt to start from, default is "oldest". If "checkpoint", the subscription resumes after the last transaction
+            recorded in checkpoint, or from the oldest lt if there is no checkpoint yet.
 
         interval : float
             The interval of the subscription in seconds, default is 2.0. If the runtime of the callback function is longer than the interval, the next subscription will run immediately after the callback function is finished.
 
         limit : int
             The limit of the subscription, default is 128. The maximum value is 128.
+
+        confirm_delivery : bool
+            Whether to look up the destination transaction of Tock and JettonMint messages to confirm they are delivered, default is False.
+            If False, the messages are decoded from the oracle's out messages directly, so a page of transactions costs only one request.
+
+        checkpoint : Optional[CheckpointStore]
+            The store to record the last fully processed transaction after each page. Callbacks are delivered at least once,
+            a page that is interrupted before it is fully processed will be delivered again after restart. The checkpoint
+            is never saved past a transaction whose callback raised, or whose out message is not delivered yet when
+            confirm_delivery is True, so it and the transactions after it are delivered again after restart.
+
+        dispatcher : Optional[CallbackDispatcher]
+            If provided, the callbacks run on the dispatcher's workers instead of inline. Callbacks of different alarms run
+            concurrently, callbacks of the same alarm run in order. When checkpoint is provided, the checkpoint of a page
+            is saved after all of its callbacks have finished, up to the first transaction whose callback raised.
+
+        polling : Optional[AdaptivePolling]
+            If provided, the page size and the sleep time adapt to the lag behind the chain, see AdaptivePolling.
+            Otherwise, the subscription polls every interval seconds with the given limit.
+
+        store : Optional[EventStore]
+            If provided, the events of each page are written to the store in one transaction before the checkpoint is saved.
+
+        payload : Literal["full", "compact"]
+            If "compact", the callbacks receive CompactTickEvent, CompactWindEvent and CompactRingEvent which keep only the lt, hash
+            and utime of the transaction instead of the full Transaction, default is "full".
+        """
+        params = await self._validate_subscribe_param(start_lt, interval, limit, checkpoint)
+        checkpoint_key = self.oracle.to_string()
+        assert payload in ["full", "compact"], "payload must be 'full' or 'compact'"
+        if payload == "compact":
+            on_tick_success = self._compact(on_tick_success) if on_tick_success is not handle_noop else on_tick_success
+            on_wind_success = self._compact(on_wind_success) if on_wind_success is not handle_noop else on_wind_success
+            on_ring_success = self._compact(on_ring_success) if on_ring_success is not handle_noop else on_ring_success
+        # the transactions whose callback raised or whose event is not delivered yet, the checkpoint is never saved past them
+        failed_txs: Set[Tuple[int, str]] = set()
+        on_tick_success = self._track_failures(failed_txs, on_tick_success) if on_tick_success is not handle_noop else on_tick_success
+        on_wind_success = self._track_failures(failed_txs, on_wind_success) if on_wind_success is not handle_noop else on_wind_success
+        on_ring_success = self._track_failures(failed_txs, on_ring_success) if on_ring_success is not handle_noop else on_ring_success
+        held = False
+        if dispatcher is not None:
+            on_tick_success = dispatcher.wrap(on_tick_success) if on_tick_success is not handle_noop else on_tick_success
+            on_wind_success = dispatcher.wrap(on_wind_success) if on_wind_success is not handle_noop else on_wind_success
+            on_ring_success = dispatcher.wrap(on_ring_success) if on_ring_success is not handle_noop else on_ring_success
+        page_events: List[TicTonEvent] = []
+        if store is not None:
+            on_tick_success = self._collect_into(page_events, on_tick_success)
+            on_wind_success = self._collect_into(page_events, on_wind_success)
+            on_ring_success = self._collect_into(page_events, on_ring_success)
+
+        try:
+            while True:
+                start_utime = time.monotonic()
+                page_limit, pages = self._next_poll(params, polling)
+                txs = await self._fetch_next_page(params, limit=page_limit, pages=pages)
+
+                for tx in txs:
+                    try:
+                        result = await self._handle_transaction(
+                            tx,
+                            on_tick_success=on_tick_success,
+                            on_wind_success=on_wind_success,
+                            on_ring_success=on_ring_success,
+                            confirm_delivery=confirm_delivery,
+                        )
+                        if result is _NOT_DELIVERED:
+                            failed_txs.add((tx.lt, tx.hash))
+                            self.logger.debug(f"Out message of transaction {tx.hash} is not delivered yet")
+                    except Exception as e:
+                        if (tx.lt, tx.hash) in failed_txs:
+                            self.logger.warning(f"Callback of transaction {tx.hash} failed: {e}")
+                        else:
+                            self.logger.debug(f"Handle transaction {tx.hash} failed: {e}")
+
+                if store is not None and len(page_events) > 0:
+                    store.write(page_events)
+                    page_events.clear()
+
+                if checkpoint is not None and len(txs) > 0 and not held:
+                    if dispatcher is not None:
+                        await dispatcher.join()
+                    # every callback of the page has finished, the checkpoint stops before the first one that failed
+                    last_acked = None
+                    for tx in txs:
+                        if (tx.lt, tx.hash) in failed_txs:
+                            held = True
+                            self.logger.warning(f"Checkpoint is held before transaction {tx.hash} which is not processed, it is delivered again after restart")
+                            break
+                        last_acked = tx
+                    if last_acked is not None:
+                        checkpoint.save(checkpoint_key, last_acked.lt, last_acked.hash)
+
+                end_utime = time.monotonic()
+                runtime = end_utime - start_utime
+                sleep_time = max(self._poll_interval(params, polling, txs, page_limit * pages) - runtime, 0)
+                self.logger.debug(f"Sleeping for {sleep_time} seconds")
+                await asyncio.sleep(sleep_time)
+        finally:
+            if checkpoint is not None:
+                checkpoint.flush()
+
+    async def events(
+        self,
+        start_lt: Union[int, Literal["latest", "oldest", "checkpoint"]] = "oldest",
+        interval: Union[int, float] = 2.0,
+        *,
+        limit: int = 128,
+        maxsize: int = 1024,
+        confirm_delivery: bool = False,
+        checkpoint: Optional[CheckpointStore] = None,
+        polling: Optional[AdaptivePolling] = None,
+        payload: Literal["full", "compact"] = "full",
+    ) -> AsyncIterator[Union[TicTonEvent, CompactTicTonEvent]]:
         """
-        params = await self._validate_subscribe_param(start_lt, interval, limit)
+        events yields the oracle's tick, wind and ring events as OnTickSuccessParams, OnWindSuccessParams and OnRingSuccessParams.
+        A producer task fetches and decodes the pages in the background and puts the events into a bounded queue,
+        so the next page is fetched while the current one is consumed. When the queue is full, the producer waits
+        until the consumer catches up.
 
-        callbacks = {
-            JettonMessage.TransferNotification.OPCODE: handle_notification,
-            TicTonMessage.Chronoshift.OPCODE: handle_chronoshift,
-            TicTonMessage.Chime.OPCODE: handle_chime,
-        }
+        Parameters
+        ----------
+        start_lt : Union[int, Literal["latest", "oldest", "checkpoint"]]
+            The lt to start from, see subscribe
 
-        while True:
-            start_utime = time.monotonic()
-            txs, _ = await self.toncenter.get_transactions(
-                GetTransactionsRequest(
-                    account=self.oracle.to_string(True),
-                    start_lt=params.start_lt,
-                    limit=params.limit,
-                    offset=params.offset,
-                    sort="asc",
-                )
-            )
+        interval : float
+            The interval of polling in seconds when there is no new transaction, default is 2.0
 
-            params.offset += len(txs)
-
-            for tx in txs:
-                try:
-                    msg = tx.in_msg
-                    if msg.message_content is None:
-                        continue
-                    cs = CellSlice(msg.message_content.body)
-                    opcode = get_opcode(cs.preload_uint(32))
-                    if opcode == "0x00000000":  # Comment Message
-                        continue
-
-                    handle_func = callbacks.get(opcode, handle_noop)
-                    await handle_func(
-                        client=self.toncenter,
-                        body=cs,
-                        tx=tx,
-                        on_tick_success=on_tick_success,
-                        on_wind_success=on_wind_success,
-                        on_ring_success=on_ring_success,
-                    )
-                except:
-                    pass
-
-            end_utime = time.monotonic()
-            runtime = end_utime - start_utime
-            sleep_time = max(params.interval - runtime, 0)
-            self.logger.debug(f"Sleeping for {sleep_time} seconds")
-            await asyncio.sleep(sleep_time)
+        limit : int
+            The page size of polling, default is 128
+
+        maxsize : int
+            The maximum number of events buffered in the queue, default is 1024
+
+        confirm_delivery : bool
+            See subscribe
+
+        checkpoint : Optional[CheckpointStore]
+            The store to record the last transaction of a page once all of its events have been consumed, it is never
+            saved past a transaction whose out message is not delivered yet when confirm_delivery is True
+
+        polling : Optional[AdaptivePolling]
+            See subscribe
+
+        payload : Literal["full", "compact"]
+            See subscribe, compact events take much less memory in the queue
+
+        Examples
+        --------
+        >>> client = await TicTonAsyncClient.init(...)
+        >>> async for event in client.events(start_lt="latest"):
+        ...     print(event)
+        """
+        assert maxsize >= 1, "maxsize must be greater than or equal to 1"
+        assert payload in ["full", "compact"], "payload must be 'full' or 'compact'"
+        params = await self._validate_subscribe_param(start_lt, interval, limit, checkpoint)
+        checkpoint_key = self.oracle.to_string()
+        queue: asyncio.Queue[Union[TicTonEvent, CompactTicTonEvent, _PageDone, Exception]] = asyncio.Queue(maxsize)
+        on_event = self._compact(queue.put) if payload == "compact" else queue.put
+
+        async def _produce():
+            held = False
+            try:
+                while True:
+                    start_utime = time.monotonic()
+                    page_limit, pages = self._next_poll(params, polling)
+                    txs = await self._fetch_next_page(params, limit=page_limit, pages=pages)
+                    last_acked = None
+                    for tx in txs:
+                        try:
+                            result = await self._handle_transaction(
+                                tx,
+                                on_tick_success=on_event,
+                                on_wind_success=on_event,
+                                on_ring_success=on_event,
+                                confirm_delivery=confirm_delivery,
+                            )
+                            if result is _NOT_DELIVERED and not held:
+                                held = True
+                                self.logger.warning(f"Checkpoint is held before transaction {tx.hash} which is not delivered yet, it is delivered again after restart")
+                        except Exception as e:
+                            self.logger.debug(f"Handle transaction {tx.hash} failed: {e}")
+                        if not held:
+                            last_acked = tx
+                    if last_acked is not None:
+                        await queue.put(_PageDone(lt=last_acked.lt, hash=last_acked.hash))
+                    await asyncio.sleep(max(self._poll_interval(params, polling, txs, page_limit * pages) - (time.monotonic() - start_utime), 0))
+            except Exception as e:
+                await queue.put(e)
+
+        producer = asyncio.create_task(_produce())
+        try:
+            while True:
+                item = await queue.get()
+                if isinstance(item, _PageDone):
+                    # all events of the page have been consumed
+                    if checkpoint is not None:
+                        checkpoint.save(checkpoint_key, item.lt, item.hash)
+                    continue
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            producer.cancel()
+            if checkpoint is not None:
+                checkpoint.flush()
+
+    def _compact(self, callback: Callable[[Any], Coroutine[Any, Any, None]]) -> Callable[[Any], Coroutine[Any, Any, None]]:
+        """
+        _compact returns a callback that converts the event into its compact form before calling the given callback
+        """
+
+        async def _call(event: TicTonEvent):
+            await callback(to_compact(event))
+
+        return _call
+
+    def _track_failures(
+        self,
+        failed_txs: Set[Tuple[int, str]],
+        callback: Callable[[Any], Coroutine[Any, Any, None]],
+    ) -> Callable[[Any], Coroutine[Any, Any, None]]:
+        """
+        _track_failures returns a callback that records the transaction of the event if the given callback raises, the
+        exception is raised again
+        """
+
+        @functools.wraps(callback)
+        async def _track(event: TicTonEvent):
+            try:
+                await callback(event)
+            except Exception:
+                failed_txs.add((event.tx.lt, event.tx.hash))
+                raise
+
+        return _track
+
+    def _collect_into(
+        self,
+        events: List[TicTonEvent],
+        callback: Callable[[Any], Coroutine[Any, Any, None]],
+    ) -> Callable[[Any], Coroutine[Any, Any, None]]:
+        """
+        _collect_into returns a callback that appends the event to events before calling the given callback
+        """
+
+        async def _collect(event: TicTonEvent):
+            events.append(event)
+            await callback(event)
+
+        return _collect
+
+    def _next_poll(self, params: SubscribeParam, polling: Optional[AdaptivePolling]) -> Tuple[int, int]:
+        """
+        _next_poll returns the page size and the number of pages of the next poll
+        """
+        if polling is None:
+            return params.limit, 1
+        return polling.limit(params.limit), polling.pages
+
+    def _poll_interval(self, params: SubscribeParam, polling: Optional[AdaptivePolling], txs: List[Transaction], requested: int) -> float:
+        """
+        _poll_interval returns the interval between the start of the last poll and the next poll
+        """
+        if polling is None:
+            return params.interval
+        interval = polling.update(txs, requested)
+        self.logger.debug(f"Polling mode: {polling.mode}, lag: {polling.lag} seconds")
+        return interval
+
+    async def _handle_transaction(
+        self,
+        tx: Transaction,
+        *,
+        on_tick_success: Callable[[OnTickSuccessParams], Coroutine[Any, Any, None]],
+        on_wind_success: Callable[[OnWindSuccessParams], Coroutine[Any, Any, None]],
+        on_ring_success: Callable[[OnRingSuccessParams], Coroutine[Any, Any, None]],
+        confirm_delivery: bool = False,
+    ):
+        """
+        _handle_transaction decodes the in message of the oracle's transaction and calls the corresponding callback,
+        it returns _NOT_DELIVERED if confirm_delivery is True and the out message of the event is not delivered yet
+        """
+        msg = tx.in_msg
+        if msg.message_content is None:
+            return
+        # skip the messages that no handler cares about before building the CellSlice
+        peeked = peek_opcode(msg.message_content.body)
+        if peeked is not None and peeked not in SUBSCRIBE_OPCODES:
+            return
+        cs = CellSlice(msg.message_content.body)
+        opcode = get_opcode(cs.preload_uint(32))
+        if opcode == "0x00000000":  # Comment Message
+            return
+
+        handle_func = SUBSCRIBE_HANDLERS.get(opcode, handle_noop)
+        return await handle_func(
+            client=self.toncenter,
+            body=cs,
+            tx=tx,
+            on_tick_success=on_tick_success,
+            on_wind_success=on_wind_success,
+            on_ring_success=on_ring_success,
+            confirm_delivery=confirm_delivery,
+        )
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, FrozenSet, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field
+from pytoncenter import AsyncTonCenterClientV3
+
+from .scheduler import Priority, _lane
+
+__all__ = ["CoalescingMetrics", "CoalescingToncenter"]
+
+# requests with side effects are never shared
+WRITE_METHODS: FrozenSet[str] = frozenset({"send_message"})
+# the seqno must be read from the wallet when a wallet sequencer resyncs, so it is shared but never cached
+UNCACHED_METHODS: FrozenSet[str] = frozenset({"get_wallet"})
+
+
+def _request_key(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return (type(value).__name__, value.model_dump_json(exclude_none=True))
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True, default=str)
+
+
+class CoalescingMetrics(BaseModel):
+    requests: int = Field(..., description="The number of reads sent to toncenter")
+    coalesced: int = Field(..., description="The number of reads that shared a read in flight")
+    cache_hits: int = Field(..., description="The number of reads answered by the ttl cache")
+    in_flight: int = Field(..., description="The number of reads in flight")
+
+
+class CoalescingToncenter:
+    """
+    CoalescingToncenter wraps a toncenter client so that identical reads which are issued concurrently share one request,
+    e.g. strategies that read getAlarmMetadata of the same alarm or the balance of the same wallet at the same moment.
+    Reads are identical if the method and the arguments are equal, every caller gets the same result object, or the
+    same exception, so the results must not be modified. A read only joins a read in flight of its own rpc_priority lane
+    or a more urgent one, so a read of the SEND lane never waits behind a BULK read that is queued in the RpcScheduler.
+
+    A result can be kept for ttl seconds after the read finishes, which also shares reads that are issued shortly after
+    each other. The state on chain is mutable, keep the ttl shorter than the staleness the caller can tolerate, the seqno
+    read by get_wallet is never kept. send_message is never shared, other attributes are passed through.
+
+    Examples
+    --------
+    >>> toncenter = CoalescingToncenter(get_client(version="v3", network="mainnet"), ttl={"run_get_method": 0.5})
+    >>> client = TicTonAsyncClient(metadata, toncenter, oracle_addr)
+    >>> toncenter.metrics
+    """
+
+    def __init__(
+        self,
+        toncenter: AsyncTonCenterClientV3,
+        *,
+        ttl: Union[float, Dict[str, float]] = 0.0,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        toncenter : AsyncTonCenterClientV3
+            The toncenter client to send the reads
+        ttl : Union[float, Dict[str, float]]
+            The seconds a result is kept after the read finishes, either for all methods or by method name,
+            default is 0 which only shares the reads in flight
+        """
+        assert all(seconds >= 0 for seconds in (ttl.values() if isinstance(ttl, dict) else [ttl])), "ttl must be greater than or equal to 0"
+        self.toncenter = toncenter
+        self.ttl = ttl
+        self.logger = logger or logging.getLogger(__name__)
+        self._in_flight: Dict[Tuple, Dict[Priority, asyncio.Task]] = {}
+        self._results: Dict[Tuple, Tuple[float, Any]] = {}
+        self._requests = 0
+        self._coalesced = 0
+        self._cache_hits = 0
+
+    def _ttl(self, method: str) -> float:
+        if method in UNCACHED_METHODS:
+            return 0.0
+        if isinstance(self.ttl, dict):
+            return self.ttl.get(method, 0.0)
+        return self.ttl
+
+    @property
+    def metrics(self) -> CoalescingMetrics:
+        return CoalescingMetrics(
+            requests=self._requests,
+            coalesced=self._coalesced,
+            cache_hits=self._cache_hits,
+            in_flight=sum(len(tasks) for tasks in self._in_flight.values()),
+        )
+
+    def invalidate(self):
+        """
+        invalidate drops the kept results, the reads in flight are still shared
+        """
+        self._results.clear()
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        key = (method, tuple(_request_key(arg) for arg in args), tuple(sorted((name, _request_key(arg)) for name, arg in kwargs.items())))
+        now = time.monotonic()
+        cached = self._results.get(key)
+        if cached is not None:
+            if cached[0] > now:
+                self._cache_hits += 1
+                return cached[1]
+            del self._results[key]
+
+        lane = _lane(method)
+        tasks = self._in_flight.setdefault(key, {})
+        # the read of a less urgent lane may still be queued behind other reads, it is not joined
+        task = next((tasks[priority] for priority in sorted(tasks) if priority <= lane), None)
+        if task is not None:
+            self._coalesced += 1
+        else:
+            self._requests += 1
+            task = asyncio.create_task(getattr(self.toncenter, method)(*args, **kwargs))
+            tasks[lane] = task
+            task.add_done_callback(lambda task: self._done(key, lane, method, task))
+        # a cancelled caller must not cancel the read of the others
+        return await asyncio.shield(task)
+
+    def _done(self, key: Tuple, lane: Priority, method: str, task: asyncio.Task):
+        tasks = self._in_flight.get(key, {})
+        tasks.pop(lane, None)
+        if len(tasks) == 0:
+            self._in_flight.pop(key, None)
+        # the exception is retrieved even if every caller was cancelled
+        failed = task.cancelled() or task.exception() is not None
+        ttl = self._ttl(method)
+        if ttl > 0 and not failed:
+            self._results[key] = (time.monotonic() + ttl, task.result())
+            # expired results are dropped once the cache has grown, so keys that are never read again do not pile up
+            if len(self._results) > 4096:
+                now = time.monotonic()
+                self._results = {key: result for key, result in self._results.items() if result[0] > now}
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.toncenter, name)
+        if name.startswith("_") or name in WRITE_METHODS or name == "multicall" or not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def _coalesced(*args, **kwargs):
+            return await self._call(name, *args, **kwargs)
+
+        return _coalesced
@@ -42,6 +42,10 @@ class JettonWalletAddress(BaseModel):
     wallet_address: AddressLike
 
 
+class JettonWalletCode(BaseModel):
+    jetton_wallet_code: str
+
+
 class OracleMetadataDecoder(BaseDecoder):
     decoder = Decoder(
         Types.Address("base_asset_address"),
@@ -145,3 +149,24 @@ class JettonWalletAddressDecoder(BaseDecoder):
     def decode(self, data: GetMethodResultType) -> JettonWalletAddress:
         result = self.decoder.decode(data)
         return JettonWalletAddress(**result)
+
+
+class JettonWalletCodeDecoder(BaseDecoder):
+    decoder = Decoder(
+        Types.Number("total_supply"),
+        Types.Bool("mintable"),
+        Types.Cell("admin_address"),
+        Types.Cell("jetton_content"),
+        Types.Cell("jetton_wallet_code"),
+    )
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(JettonWalletCodeDecoder, cls).__new__(cls)
+        return cls._instance
+
+    def decode(self, data: GetMethodResultType) -> JettonWalletCode:
+        result = self.decoder.decode(data)
+        return JettonWalletCode(jetton_wallet_code=result["jetton_wallet_code"].to_boc())
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Coroutine, List, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field
+
+from .callbacks import CompactTicTonEvent, CompactTickEvent, OnTickSuccessParams, TicTonEvent
+
+__all__ = ["CallbackDispatcher", "DispatcherMetrics", "event_alarm_id"]
+
+
+def event_alarm_id(event: Union[TicTonEvent, CompactTicTonEvent]) -> int:
+    """
+    event_alarm_id returns the alarm that the event belongs to. A tick belongs to the alarm it creates,
+    a wind or a ring belongs to the alarm it operates on.
+    """
+    if isinstance(event, (OnTickSuccessParams, CompactTickEvent)):
+        return event.new_alarm_id
+    return event.alarm_id
+
+
+class DispatcherMetrics(BaseModel):
+    queue_depth: int = Field(..., description="The number of events waiting to be handled")
+    in_flight: int = Field(..., description="The number of callbacks that are running")
+    processed: int = Field(..., description="The number of callbacks that have finished")
+    failed: int = Field(..., description="The number of callbacks that have raised an exception")
+    avg_latency: float = Field(..., description="The average runtime of callbacks in seconds")
+    max_latency: float = Field(..., description="The maximum runtime of callbacks in seconds")
+
+
+class CallbackDispatcher:
+    """
+    CallbackDispatcher runs the subscribe callbacks on a pool of workers. Events are routed to a worker by
+    their alarm id, so callbacks of different alarms run concurrently while callbacks of the same alarm
+    run strictly in the order they are received.
+    """
+
+    def __init__(
+        self,
+        workers: int = 8,
+        *,
+        maxsize: int = 1024,
+        logger: Optional[logging.Logger] = None,
+    ):
+        assert workers >= 1, "workers must be greater than or equal to 1"
+        assert maxsize >= 1, "maxsize must be greater than or equal to 1"
+        self.workers = workers
+        self.maxsize = maxsize
+        self.logger = logger or logging.getLogger(__name__)
+        self._queues: List[asyncio.Queue[Tuple[Callable[[Any], Coroutine[Any, Any, None]], TicTonEvent]]] = []
+        self._tasks: List[asyncio.Task] = []
+        self._in_flight = 0
+        self._processed = 0
+        self._failed = 0
+        self._total_latency = 0.0
+        self._max_latency = 0.0
+
+    def _start(self):
+        # queues must be created inside the running event loop
+        self._queues = [asyncio.Queue(self.maxsize) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._work(queue)) for queue in self._queues]
+
+    async def _work(self, queue: asyncio.Queue):
+        while True:
+            callback, event = await queue.get()
+            self._in_flight += 1
+            start = time.monotonic()
+            try:
+                await callback(event)
+            except Exception as e:
+                self._failed += 1
+                self.logger.warning(f"Callback {getattr(callback, '__name__', callback)} failed on alarm {event_alarm_id(event)}: {e}")
+            finally:
+                latency = time.monotonic() - start
+                self._in_flight -= 1
+                self._processed += 1
+                self._total_latency += latency
+                self._max_latency = max(self._max_latency, latency)
+                queue.task_done()
+
+    async def submit(self, callback: Callable[[Any], Coroutine[Any, Any, None]], event: TicTonEvent):
+        """
+        submit queues the callback with the event, it waits if the worker of the alarm is full
+        """
+        if not self._tasks:
+            self._start()
+        queue = self._queues[event_alarm_id(event) % self.workers]
+        await queue.put((callback, event))
+
+    def wrap(self, callback: Callable[[Any], Coroutine[Any, Any, None]]) -> Callable[[Any], Coroutine[Any, Any, None]]:
+        """
+        wrap returns a callback that submits the event to the dispatcher instead of running it inline
+        """
+
+        async def _submit(event: TicTonEvent):
+            await self.submit(callback, event)
+
+        return _submit
+
+    async def join(self):
+        """
+        join waits until all submitted callbacks have finished
+        """
+        for queue in self._queues:
+            await queue.join()
+
+    async def close(self):
+        """
+        close waits for the submitted callbacks and stops the workers
+        """
+        await self.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queues = []
+
+    @property
+    def metrics(self) -> DispatcherMetrics:
+        return DispatcherMetrics(
+            queue_depth=sum(queue.qsize() for queue in self._queues),
+            in_flight=self._in_flight,
+            processed=self._processed,
+            failed=self._failed,
+            avg_latency=self._total_latency / self._processed if self._processed else 0.0,
+            max_latency=self._max_latency,
+        )
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from pytoncenter.address import Address
+
+from .callbacks import (
+    CompactEvent,
+    CompactRingEvent,
+    CompactTicTonEvent,
+    CompactTickEvent,
+    CompactWindEvent,
+    OnRingSuccessParams,
+    OnTickSuccessParams,
+    OnWindSuccessParams,
+    TicTonEvent,
+)
+from .decoder import AlarmMetadata
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+    pq = None
+
+__all__ = ["ParquetExporter", "events_to_record_batch", "alarms_to_record_batch", "uint256_from_bytes"]
+
+PRICE_FACTOR = 2**64
+# the raw uint256 values are stored as 32 big-endian bytes, which hold every uint256 and sort in numeric order
+UINT256_BYTES = 32
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required to export events, install it with `pip install ticton[arrow]`")
+
+
+def _uint256_type():
+    return pa.binary(UINT256_BYTES)
+
+
+def _event_schema():
+    return pa.schema(
+        [
+            ("lt", pa.int64()),
+            ("hash", pa.string()),
+            ("utime", pa.int64()),
+            ("kind", pa.string()),
+            ("alarm_id", pa.int64()),
+            ("new_alarm_id", pa.int64()),
+            ("address", pa.string()),
+            ("created_at", pa.int64()),
+            ("price", pa.float64()),
+            ("price_raw", _uint256_type()),
+            ("price_fixed", pa.float64()),
+            ("remain_scale", pa.int64()),
+            ("origin", pa.string()),
+            ("receiver", pa.string()),
+            ("reward", pa.float64()),
+        ]
+    )
+
+
+def _alarm_schema():
+    return pa.schema(
+        [
+            ("snapshot_at", pa.int64()),
+            ("alarm_index", pa.int64()),
+            ("watchmaker_address", pa.string()),
+            ("base_asset_scale", pa.int64()),
+            ("quote_asset_scale", pa.int64()),
+            ("remain_scale", pa.int64()),
+            ("base_asset_price_raw", _uint256_type()),
+            ("base_asset_price", pa.float64()),
+            ("base_asset_amount", _uint256_type()),
+            ("quote_asset_amount", _uint256_type()),
+            ("created_at", pa.int64()),
+        ]
+    )
+
+
+def _address(address: Any) -> Optional[str]:
+    if address is None:
+        return None
+    return Address(address).to_string(False)
+
+
+def _raw(value: Optional[int], name: str) -> Optional[bytes]:
+    if value is None:
+        return None
+    if not 0 <= value < 1 << UINT256_BYTES * 8:
+        raise ValueError(f"{name} {value} is not a uint256")
+    return value.to_bytes(UINT256_BYTES, "big")
+
+
+def uint256_from_bytes(value: Optional[bytes]) -> Optional[int]:
+    """
+    uint256_from_bytes converts a raw column value, e.g. price_raw, back into the integer
+    """
+    return None if value is None else int.from_bytes(value, "big")
+
+
+def _fixed(value: Optional[int]) -> Optional[float]:
+    return None if value is None else value / PRICE_FACTOR
+
+
+def _event_row(event: Union[TicTonEvent, CompactTicTonEvent]) -> Dict[str, Any]:
+    if isinstance(event, CompactEvent):
+        row: Dict[str, Any] = {"lt": event.lt, "hash": event.hash, "utime": event.utime, "created_at": event.created_at}
+    else:
+        row = {"lt": event.tx.lt, "hash": event.tx.hash, "utime": event.tx.now, "created_at": event.created_at}
+    if isinstance(event, (OnTickSuccessParams, CompactTickEvent)):
+        row.update(
+            kind="tick",
+            alarm_id=event.new_alarm_id,
+            new_alarm_id=event.new_alarm_id,
+            address=_address(event.watchmaker),
+            price=event.base_asset_price,
+            price_raw=_raw(event.base_asset_price_raw, "price_raw"),
+            price_fixed=_fixed(event.base_asset_price_raw),
+        )
+    elif isinstance(event, (OnWindSuccessParams, CompactWindEvent)):
+        row.update(
+            kind="wind",
+            alarm_id=event.alarm_id,
+            new_alarm_id=event.new_alarm_id,
+            address=_address(event.timekeeper),
+            price=event.new_base_asset_price,
+            price_raw=_raw(event.new_base_asset_price_raw, "price_raw"),
+            price_fixed=_fixed(event.new_base_asset_price_raw),
+            remain_scale=event.remain_scale,
+        )
+    elif isinstance(event, (OnRingSuccessParams, CompactRingEvent)):
+        row.update(
+            kind="ring",
+            alarm_id=event.alarm_id,
+            address=_address(event.origin),
+            origin=_address(event.origin),
+            receiver=_address(event.receiver),
+            reward=event.reward,
+        )
+    return row
+
+
+def _alarm_row(alarm: AlarmMetadata, snapshot_at: int) -> Dict[str, Any]:
+    return {
+        "snapshot_at": snapshot_at,
+        "alarm_index": alarm.alarm_index,
+        "watchmaker_address": _address(alarm.watchmaker_address),
+        "base_asset_scale": alarm.base_asset_scale,
+        "quote_asset_scale": alarm.quote_asset_scale,
+        "remain_scale": alarm.remain_scale,
+        "base_asset_price_raw": _raw(alarm.base_asset_price, "base_asset_price_raw"),
+        "base_asset_price": alarm.base_asset_price / PRICE_FACTOR,
+        "base_asset_amount": _raw(alarm.base_asset_amount, "base_asset_amount"),
+        "quote_asset_amount": _raw(alarm.quote_asset_amount, "quote_asset_amount"),
+        "created_at": alarm.created_at,
+    }
+
+
+def _to_batch(rows: List[Dict[str, Any]], schema) -> "pa.RecordBatch":
+    columns = [pa.array([row.get(field.name) for row in rows], type=field.type) for field in schema]
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def events_to_record_batch(events: Iterable[Union[TicTonEvent, CompactTicTonEvent]]) -> "pa.RecordBatch":
+    """
+    events_to_record_batch converts the events into one arrow record batch, the raw 2^64 fixed point prices are kept
+    in price_raw as 32 big-endian bytes, see uint256_from_bytes, and converted into float in price_fixed
+    """
+    _require_pyarrow()
+    return _to_batch([_event_row(event) for event in events], _event_schema())
+
+
+def alarms_to_record_batch(alarms: Iterable[AlarmMetadata], snapshot_at: Optional[int] = None) -> "pa.RecordBatch":
+    """
+    alarms_to_record_batch converts the alarm metadata snapshots into one arrow record batch
+    """
+    _require_pyarrow()
+    snapshot_at = int(time.time()) if snapshot_at is None else snapshot_at
+    return _to_batch([_alarm_row(alarm, snapshot_at) for alarm in alarms], _alarm_schema())
+
+
+class ParquetExporter:
+    """
+    ParquetExporter writes events and alarm snapshots to parquet files partitioned by date, e.g.
+    `{root}/events/date=2024-03-01/part-0.parquet`. Rows are buffered until batch_size is reached and then
+    appended to the open file of their partition as one row group, so the memory usage is bounded by batch_size.
+    The input is expected in lt order, the file of a partition is closed once a later partition is written, and a
+    late row of a closed partition goes to a new part file.
+
+    Examples
+    --------
+    >>> with ParquetExporter("history") as exporter:
+    ...     async for event in Backfill(client).crawl():
+    ...         exporter.write_events([event])
+    """
+
+    def __init__(self, root: str, *, batch_size: int = 65536):
+        _require_pyarrow()
+        assert batch_size >= 1, "batch_size must be greater than or equal to 1"
+        self.root = root
+        self.batch_size = batch_size
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {"events": [], "alarms": []}
+        self._schemas = {"events": _event_schema(), "alarms": _alarm_schema()}
+        self._writers: Dict[Tuple[str, str], "pq.ParquetWriter"] = {}
+
+    def write_events(self, events: Iterable[Union[TicTonEvent, CompactTicTonEvent]]):
+        self._append("events", (_event_row(event) for event in events))
+
+    def write_alarms(self, alarms: Iterable[AlarmMetadata], snapshot_at: Optional[int] = None):
+        snapshot_at = int(time.time()) if snapshot_at is None else snapshot_at
+        self._append("alarms", (_alarm_row(alarm, snapshot_at) for alarm in alarms))
+
+    def _append(self, table: str, rows: Iterable[Dict[str, Any]]):
+        buffer = self._buffers[table]
+        # convert every row first, so a row that fails leaves nothing of the call in the buffer
+        for row in list(rows):
+            buffer.append(row)
+            if len(buffer) >= self.batch_size:
+                self._flush_table(table)
+
+    def _partition(self, table: str, row: Dict[str, Any]) -> str:
+        timestamp = row["created_at"] if table == "events" else row["snapshot_at"]
+        return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d")
+
+    def _flush_table(self, table: str):
+        buffer = self._buffers[table]
+        if not buffer:
+            return
+        partitions: Dict[str, List[Dict[str, Any]]] = {}
+        for row in buffer:
+            partitions.setdefault(self._partition(table, row), []).append(row)
+        for date, rows in partitions.items():
+            writer = self._writers.get((table, date))
+            if writer is None:
+                directory = os.path.join(self.root, table, f"date={date}")
+                os.makedirs(directory, exist_ok=True)
+                writer = pq.ParquetWriter(os.path.join(directory, f"part-{len(os.listdir(directory))}.parquet"), self._schemas[table])
+                self._writers[(table, date)] = writer
+            writer.write_batch(_to_batch(rows, self._schemas[table]))
+        buffer.clear()
+        # the stream has moved past the earlier partitions, their files are finished
+        latest = max(partitions)
+        for key in [key for key in self._writers if key[0] == table and key[1] < latest]:
+            self._writers.pop(key).close()
+
+    def flush(self):
+        for table in self._buffers:
+            self._flush_table(table)
+
+    def close(self):
+        self.flush()
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    def __enter__(self) -> ParquetExporter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Collection, Deque, List, Optional, Sequence, Set, Union
+
+import aiohttp
+from pydantic import BaseModel, Field
+from pytoncenter import AsyncTonCenterClientV3
+
+__all__ = ["EndpointStats", "FailoverToncenter", "HEDGED_METHODS"]
+
+# reads that return the same result from any endpoint, they can be sent to a second endpoint while the first is pending
+HEDGED_METHODS = frozenset({"run_get_method", "get_transactions", "get_account", "get_wallet", "get_jetton_wallets"})
+
+
+def _is_endpoint_failure(e: BaseException) -> bool:
+    """
+    _is_endpoint_failure tells whether another endpoint may succeed where this one failed, a 429 is left to RpcScheduler
+    and a rejected request would be rejected by every endpoint
+    """
+    if isinstance(e, (aiohttp.ClientError, asyncio.TimeoutError, OSError)):
+        return True
+    code = getattr(e, "code", None)
+    return isinstance(code, int) and code >= 500
+
+
+class EndpointStats(BaseModel):
+    url: str = Field(..., description="The base url of the endpoint")
+    healthy: bool = Field(..., description="Whether the endpoint is routed to, an unhealthy endpoint is only used when no healthy one is left")
+    ewma_latency: Optional[float] = Field(..., description="The exponentially weighted moving average of the latency in seconds")
+    p95_latency: Optional[float] = Field(..., description="The 95th percentile of the recent latencies in seconds")
+    requests: int = Field(..., description="The number of calls sent to the endpoint")
+    failures: int = Field(..., description="The number of calls that failed on the endpoint")
+
+
+class _Endpoint:
+    __slots__ = ("client", "url", "ewma", "samples", "requests", "failures", "consecutive_failures", "down_until")
+
+    def __init__(self, client: AsyncTonCenterClientV3, window: int):
+        self.client = client
+        self.url: str = getattr(client, "base_url", repr(client))
+        self.ewma: Optional[float] = None
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.down_until = 0.0
+
+    def p95(self) -> Optional[float]:
+        if len(self.samples) == 0:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(math.ceil(len(ordered) * 0.95), len(ordered)) - 1]
+
+
+class FailoverToncenter:
+    """
+    FailoverToncenter spreads the calls of a client over several toncenter compatible endpoints. The latency of each
+    endpoint is tracked as an exponentially weighted moving average, and every call goes to the fastest healthy one.
+    A call that fails with a network error, a timeout or a 5xx is sent to the next endpoint, and an endpoint that fails
+    max_failures times in a row is not routed to for cooldown seconds.
+
+    With hedging, an idempotent read that is still pending after the 95th percentile latency of its endpoint is sent to
+    a second endpoint as well, the first result is used and the other read is cancelled. Only a few percent of the reads
+    are sent twice, and a slow response of one endpoint no longer sets the latency of the read.
+
+    Other attributes, e.g. the network and the qps limiter, are the ones of the first endpoint.
+
+    Examples
+    --------
+    >>> toncenter = FailoverToncenter(
+    ...     [get_client(version="v3", network="mainnet", api_key=key), get_client(version="v3", network="mainnet", custom_endpoint=url)],
+    ...     hedge=True,
+    ... )
+    >>> client = TicTonAsyncClient(metadata, toncenter, oracle_addr)
+    >>> toncenter.stats
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[AsyncTonCenterClientV3],
+        *,
+        hedge: Union[bool, Collection[str]] = False,
+        hedge_delay: float = 1.0,
+        min_samples: int = 20,
+        window: int = 200,
+        alpha: float = 0.2,
+        timeout: Optional[float] = 10.0,
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        endpoints : Sequence[AsyncTonCenterClientV3]
+            The toncenter clients of the endpoints, in the order they are tried before their latency is known
+        hedge : Union[bool, Collection[str]]
+            Whether to hedge the reads of HEDGED_METHODS, or the names of the methods to hedge, default is False
+        hedge_delay : float
+            The seconds before a read is hedged while its endpoint has fewer than min_samples latencies
+        min_samples : int
+            The number of latencies of an endpoint before its 95th percentile is used as the hedge delay
+        window : int
+            The number of recent latencies the 95th percentile is taken over
+        alpha : float
+            The weight of the latest latency in the moving average
+        timeout : Optional[float]
+            The seconds an endpoint has to answer a call before the next endpoint is tried, None to wait forever
+        max_failures : int
+            The number of failures in a row after which an endpoint is not routed to
+        cooldown : float
+            The seconds an endpoint is not routed to after max_failures failures in a row
+        """
+        assert len(endpoints) > 0, "endpoints must not be empty"
+        assert hedge_delay > 0, "hedge_delay must be greater than 0"
+        assert min_samples >= 1, "min_samples must be greater than or equal to 1"
+        assert window >= min_samples, "window must be greater than or equal to min_samples"
+        assert 0 < alpha <= 1, "alpha must be greater than 0 and less than or equal to 1"
+        assert timeout is None or timeout > 0, "timeout must be greater than 0"
+        assert max_failures >= 1, "max_failures must be greater than or equal to 1"
+        self.endpoints = [_Endpoint(endpoint, window) for endpoint in endpoints]
+        if hedge is True:
+            self.hedge_methods = HEDGED_METHODS
+        elif hedge is False:
+            self.hedge_methods = frozenset()
+        else:
+            self.hedge_methods = frozenset(hedge)
+        self.hedge_delay = hedge_delay
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.timeout = timeout
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.logger = logger or logging.getLogger(__name__)
+        self.hedged = 0
+
+    @property
+    def stats(self) -> List[EndpointStats]:
+        now = time.monotonic()
+        return [
+            EndpointStats(
+                url=endpoint.url,
+                healthy=endpoint.down_until <= now,
+                ewma_latency=endpoint.ewma,
+                p95_latency=endpoint.p95(),
+                requests=endpoint.requests,
+                failures=endpoint.failures,
+            )
+            for endpoint in self.endpoints
+        ]
+
+    def _ranked(self) -> List[_Endpoint]:
+        now = time.monotonic()
+        # endpoints without a latency are tried first, so every endpoint gets measured
+        healthy = sorted((endpoint for endpoint in self.endpoints if endpoint.down_until <= now), key=lambda endpoint: endpoint.ewma or 0.0)
+        down = sorted((endpoint for endpoint in self.endpoints if endpoint.down_until > now), key=lambda endpoint: endpoint.down_until)
+        return healthy + down
+
+    def _observe(self, endpoint: _Endpoint, latency: float):
+        endpoint.ewma = latency if endpoint.ewma is None else self.alpha * latency + (1 - self.alpha) * endpoint.ewma
+        endpoint.samples.append(latency)
+
+    def _hedge_delay(self, endpoint: _Endpoint) -> float:
+        if len(endpoint.samples) < self.min_samples:
+            return self.hedge_delay
+        return endpoint.p95()  # type: ignore
+
+    async def _attempt(self, endpoint: _Endpoint, method: str, args, kwargs) -> Any:
+        endpoint.requests += 1
+        start = time.monotonic()
+        try:
+            call = getattr(endpoint.client, method)(*args, **kwargs)
+            result = await (asyncio.wait_for(call, self.timeout) if self.timeout is not None else call)
+        except asyncio.CancelledError:
+            # the read lost a hedge, the endpoint was at least this slow
+            self._observe(endpoint, time.monotonic() - start)
+            raise
+        except Exception as e:
+            if _is_endpoint_failure(e):
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                self._observe(endpoint, time.monotonic() - start)
+                if endpoint.consecutive_failures >= self.max_failures and endpoint.down_until <= time.monotonic():
+                    endpoint.down_until = time.monotonic() + self.cooldown
+                    self.logger.warning(f"Endpoint {endpoint.url} failed {endpoint.consecutive_failures} times in a row, it is skipped for {self.cooldown} seconds")
+            raise
+        endpoint.consecutive_failures = 0
+        endpoint.down_until = 0.0
+        self._observe(endpoint, time.monotonic() - start)
+        return result
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        candidates = iter(self._ranked())
+        hedge = method in self.hedge_methods and len(self.endpoints) > 1
+        pending: Set[asyncio.Task] = set()
+        error: Optional[BaseException] = None
+
+        def _launch() -> Optional[_Endpoint]:
+            endpoint = next(candidates, None)
+            if endpoint is not None:
+                pending.add(asyncio.create_task(self._attempt(endpoint, method, args, kwargs)))
+            return endpoint
+
+        primary = _launch()
+        try:
+            while pending:
+                delay = self._hedge_delay(primary) if hedge else None  # type: ignore
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if len(done) == 0:
+                    # the read is hedged once, a failure after that still moves on to the next endpoint
+                    hedge = False
+                    if _launch() is not None:
+                        self.hedged += 1
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    e = task.exception()
+                    if e is None:
+                        return task.result()
+                    if not _is_endpoint_failure(e):
+                        raise e
+                    error = e
+                if len(pending) == 0 and _launch() is not None:
+                    self.logger.debug(f"Toncenter call {method} failed, retrying on the next endpoint: {error}")
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.endpoints[0].client, name)
+        if name.startswith("_") or name == "multicall" or not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def _routed(*args, **kwargs):
+            return await self._call(name, *args, **kwargs)
+
+        return _routed
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+__all__ = ["ActionGraph"]
+
+# the node that is running in the current task, get records the nodes it waits for as its dependencies
+_current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("_current_node", default=None)
+
+
+class ActionGraph:
+    """
+    ActionGraph runs the lookups of an action as a dependency graph. A node starts as soon as it is added and waits
+    for the nodes it reads with get, so the lookups that do not depend on each other run concurrently and every
+    lookup runs once. The end of every node is recorded, the critical path of a node is the chain of nodes it
+    waited for, which is what the latency of the action is bound to.
+
+    Nodes that are still running when the block exits are left running, e.g. the lookups of a wallet that was not
+    chosen warm the caches for the next action.
+
+    Examples
+    --------
+    >>> async with ActionGraph("Tick") as graph:
+    ...     graph.add("balance", lambda: get_balance(address))
+    ...     graph.add("jetton_wallet", lambda: get_jetton_wallet_address(address))
+    ...     graph.add("send", lambda: send(graph))  # awaits graph.get("balance") and graph.get("jetton_wallet")
+    ...     result = await graph.get("send")
+    >>> graph.critical_path("send")
+    [('balance', 0.21), ('send', 0.18)]
+    """
+
+    def __init__(self, name: str, logger: Optional[logging.Logger] = None):
+        self.name = name
+        self.logger = logger or logging.getLogger(__name__)
+        self._start = time.monotonic()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._ends: Dict[str, float] = {}
+        self._deps: Dict[str, List[str]] = {}
+
+    def has(self, name: str) -> bool:
+        return name in self._tasks
+
+    def add(self, name: str, func: Callable[[], Awaitable[Any]]):
+        """
+        add starts the node, func reads the nodes it depends on with get
+        """
+        assert name not in self._tasks, f"node {name} is already added"
+        self._deps[name] = []
+        self._tasks[name] = asyncio.create_task(self._run(name, func))
+
+    async def _run(self, name: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        _current_node.set(name)
+        try:
+            return await func()
+        finally:
+            self._ends[name] = time.monotonic() - self._start
+
+    async def get(self, name: str) -> Any:
+        """
+        get waits for the result of the node, and raises its exception if it failed
+        """
+        node = _current_node.get()
+        if node is not None and node in self._deps and name not in self._deps[node]:
+            self._deps[node].append(name)
+        # a cancelled reader must not cancel the node, other nodes may still read it
+        return await asyncio.shield(self._tasks[name])
+
+    def latency(self, name: str) -> float:
+        """
+        latency returns the seconds from the start of the graph to the end of the node
+        """
+        return self._ends[name]
+
+    def critical_path(self, name: str) -> List[Tuple[str, float]]:
+        """
+        critical_path returns the chain of nodes that the node waited for, with the seconds each of them added
+        """
+        path = []
+        node: Optional[str] = name
+        while node is not None:
+            finished = [dep for dep in self._deps[node] if dep in self._ends]
+            before = max(finished, key=lambda dep: self._ends[dep]) if finished else None
+            path.append((node, self._ends[node] - (self._ends[before] if before is not None else 0.0)))
+            node = before
+        return path[::-1]
+
+    def report(self, name: str) -> str:
+        """
+        report formats the critical path of the node
+        """
+        path = " -> ".join(f"{node} {seconds:.3f}s" for node, seconds in self.critical_path(name))
+        return f"{self.name} critical path {self.latency(name):.3f}s: {path}"
+
+    def _retrieve(self, name: str, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.debug(f"{self.name} node {name} failed after the action: {task.exception()}")
+
+    async def __aenter__(self) -> ActionGraph:
+        return self
+
+    async def __aexit__(self, *exc):
+        for name, task in self._tasks.items():
+            if task.done():
+                # the exception of a node that was never read must be retrieved
+                self._retrieve(name, task)
+            else:
+                task.add_done_callback(lambda task, name=name: self._retrieve(name, task))
@@ -1,12 +1,61 @@
+import binascii
+from typing import Optional
+
 from pytoncenter.extension.message import BaseMessage
 from pytoncenter.address import Address
-from pytoncenter.utils import get_opcode
-from tonpy import CellSlice
+
+from .schema import compile_message
+
+BOC_MAGIC = b"\xb5\xee\x9c\x72"
+
+
+def peek_opcode(boc: str) -> Optional[int]:
+    """
+    peek_opcode reads the first 32 bits of the root cell from the base64 encoded BOC without building a CellSlice.
+    It returns None if the root cell has less than 32 bits of data, or the BOC is not in the common layout
+    (root cell stored first, no stored hashes), in that case the caller should parse the BOC with CellSlice.
+    """
+    try:
+        # the header and the beginning of the root cell are usually within the first 48 bytes
+        data = binascii.a2b_base64(boc[:64])
+    except binascii.Error:
+        return None
+    if len(data) < 6 or data[:4] != BOC_MAGIC:
+        return None
+    flags = data[4]
+    size = flags & 0x07
+    off_bytes = data[5]
+    # cells:size roots:size absent:size tot_cells_size:off_bytes root_list:(roots * size)
+    pos = 6 + size * 4 + off_bytes
+    if len(data) < pos:
+        return None
+    if size == 1:
+        cells, roots, root = data[6], data[7], data[pos - 1]
+    else:
+        cells = int.from_bytes(data[6 : 6 + size], "big")
+        roots = int.from_bytes(data[6 + size : 6 + size * 2], "big")
+        root = int.from_bytes(data[pos - size : pos], "big")
+    if roots < 1 or root != 0:
+        return None
+    pos += (roots - 1) * size
+    if flags & 0x80:  # has index
+        pos += cells * off_bytes
+    if len(data) < pos + 6 and len(boc) > 64:
+        data = binascii.a2b_base64(boc)
+    if len(data) < pos + 6:
+        return None
+    d1, d2 = data[pos], data[pos + 1]
+    if d1 & 0x10 or d2 < 8:  # stored hashes or less than 4 full data bytes
+        return None
+    return int.from_bytes(data[pos + 2 : pos + 6], "big")
 
 
 class TicTonMessage:
+    @compile_message
     class Tick(BaseMessage["Tick"]):
         OPCODE = "0x00000000"
+        SCHEMA = "tick#00 expireAt:uint256 baseAssetPrice:uint256"
+        __slots__ = ("expire_at", "base_asset_price")
 
         def __init__(
             self,
@@ -16,26 +65,11 @@ class TicTonMessage:
             self.expire_at = expire_at
             self.base_asset_price = base_asset_price
 
-        @classmethod
-        def _preparse(cls, cs: CellSlice) -> CellSlice:
-            opcode = get_opcode(cs.load_uint(8))
-            assert opcode == cls.OPCODE, f"opcode {opcode} is not {cls.OPCODE}"
-            return cs
-
-        @classmethod
-        def _parse(cls, body: CellSlice):
-            """
-            tick#e4366caf expireAt:uint256 baseAssetPrice:uint256 = Tick
-            """
-            expire_at = body.load_uint(256)
-            base_asset_price = body.load_uint(256)
-            return cls(
-                expire_at=expire_at,
-                base_asset_price=base_asset_price,
-            )
-
+    @compile_message
     class Tock(BaseMessage["Tock"]):
         OPCODE = "0x09c0fafb"
+        SCHEMA = "tock#09c0fafb alarmIndex:uint256 scale:uint32 createdAt:int257 watchmaker:address ^[ baseAssetPrice:int257 ]"
+        __slots__ = ("alarm_index", "scale", "created_at", "watchmaker", "base_asset_price")
 
         def __init__(
             self,
@@ -51,27 +85,11 @@ class TicTonMessage:
             self.watchmaker = watchmaker
             self.base_asset_price = base_asset_price
 
-        @classmethod
-        def _parse(cls, body: CellSlice):
-            """
-            tock#09c0fafb alarmIndex:uint256 scale:uint32 createdAt:int257 watchmaker:address baseAssetPrice:int257
-            """
-            alarm_index = body.load_uint(256)
-            scale = body.load_uint(32)
-            created_at = body.load_int(257)
-            watchmaker = Address(body.load_address())
-            body = body.load_ref(as_cs=True)
-            base_asset_price = body.load_int(257)
-            return cls(
-                alarm_index=alarm_index,
-                scale=scale,
-                created_at=created_at,
-                watchmaker=watchmaker,
-                base_asset_price=base_asset_price,
-            )
-
+    @compile_message
     class Ring(BaseMessage["Ring"]):
         OPCODE = "0xc3510a29"
+        SCHEMA = "ring#c3510a29 queryID:int257 alarmIndex:int257"
+        __slots__ = ("query_id", "alarm_index")
 
         def __init__(
             self,
@@ -81,20 +99,25 @@ class TicTonMessage:
             self.query_id = query_id
             self.alarm_index = alarm_index
 
-        @classmethod
-        def _parse(cls, body: CellSlice):
-            """
-            ring#c3510a29 queryID:int257 alarmIndex:int257
-            """
-            query_id = body.load_int(257)
-            alarm_index = body.load_int(257)
-            return cls(
-                query_id=query_id,
-                alarm_index=alarm_index,
-            )
-
+    @compile_message
     class Chime(BaseMessage["Chime"]):
         OPCODE = "0x08eb5cd4"
+        SCHEMA = (
+            "chime#08eb5cd4 alarmIndex:int257 timeKeeper:address newBaseAssetPrice:uint256 "
+            "^[ newScale:int257 refundQuoteAssetAmount:int257 baseAssetPrice:uint256 "
+            "^[ createdAt:int257 remainScale:int257 preserveBaseAssetAmount:int257 ] ]"
+        )
+        __slots__ = (
+            "alarm_index",
+            "time_keeper",
+            "new_base_asset_price",
+            "new_scale",
+            "refund_quote_asset_amount",
+            "base_asset_price",
+            "created_at",
+            "remain_scale",
+            "preserve_base_asset_amount",
+        )
 
         def __init__(
             self,
@@ -118,36 +141,27 @@ class TicTonMessage:
             self.remain_scale = remain_scale
             self.preserve_base_asset_amount = preserve_base_asset_amount
 
-        @classmethod
-        def _parse(cls, body: CellSlice):
-            """
-            chime#08eb5cd4 alarmIndex:int257 timeKeeper:address newBaseAssetPrice:uint256 newScale:int257 refundQuoteAssetAmount:int257 baseAssetPrice:uint256 createdAt:int257 remainScale:int257 preserveBaseAssetAmount:int257
-            """
-            alarm_index = body.load_int(257)
-            time_keeper = Address(body.load_address())
-            new_base_asset_price = body.load_uint(256)
-            body = body.load_ref(as_cs=True)
-            new_scale = body.load_int(257)
-            refund_quote_asset_amount = body.load_int(257)
-            base_asset_price = body.load_uint(256)
-            body = body.load_ref(as_cs=True)
-            created_at = body.load_int(257)
-            remain_scale = body.load_int(257)
-            preserve_base_asset_amount = body.load_int(257)
-            return cls(
-                alarm_index=alarm_index,
-                time_keeper=time_keeper,
-                new_base_asset_price=new_base_asset_price,
-                new_scale=new_scale,
-                refund_quote_asset_amount=refund_quote_asset_amount,
-                base_asset_price=base_asset_price,
-                created_at=created_at,
-                remain_scale=remain_scale,
-                preserve_base_asset_amount=preserve_base_asset_amount,
-            )
-
+    @compile_message
     class Chronoshift(BaseMessage["Chronoshift"]):
         OPCODE = "0x54451598"
+        SCHEMA = (
+            "chronoshift#54451598 queryID:int257 alarmIndex:int257 createdAt:int257 "
+            "^[ watchmaker:address baseAssetPrice:uint256 remainScale:int257 "
+            "^[ remainBaseAssetScale:int257 remainQuoteAssetScale:int257 extraBaseAssetAmount:int257 "
+            "^[ extraQuoteAssetAmount:int257 ] ] ]"
+        )
+        __slots__ = (
+            "query_id",
+            "alarm_index",
+            "created_at",
+            "watchmaker",
+            "base_asset_price",
+            "remain_scale",
+            "remain_base_asset_scale",
+            "remain_quote_asset_scale",
+            "extra_base_asset_amount",
+            "extra_quote_asset_amount",
+        )
 
         def __init__(
             self,
@@ -173,39 +187,17 @@ class TicTonMessage:
             self.extra_base_asset_amount = extra_base_asset_amount
             self.extra_quote_asset_amount = extra_quote_asset_amount
 
-        @classmethod
-        def _parse(cls, body: CellSlice):
-            """
-            chronoshift#54451598 queryID:int257 alarmIndex:int257 createdAt:int257 watchmaker:address baseAssetPrice:uint256 remainScale:int257 remainBaseAssetScale:int257 remainQuoteAssetScale:int257 extraBaseAssetAmount:int257 extraQuoteAssetAmount:int257
-            """
-            query_id = body.load_int(257)
-            alarm_index = body.load_int(257)
-            created_at = body.load_int(257)
-            body = body.load_ref(as_cs=True)
-            watchmaker = Address(body.load_address())
-            base_asset_price = body.load_uint(256)
-            remain_scale = body.load_int(257)
-            body = body.load_ref(as_cs=True)
-            remain_base_asset_scale = body.load_int(257)
-            remain_quote_asset_scale = body.load_int(257)
-            extra_base_asset_amount = body.load_int(257)
-            body = body.load_ref(as_cs=True)
-            extra_quote_asset_amount = body.load_int(257)
-            return cls(
-                query_id=query_id,
-                alarm_index=alarm_index,
-                created_at=created_at,
-                watchmaker=watchmaker,
-                base_asset_price=base_asset_price,
-                remain_scale=remain_scale,
-                remain_base_asset_scale=remain_base_asset_scale,
-                remain_quote_asset_scale=remain_quote_asset_scale,
-                extra_base_asset_amount=extra_base_asset_amount,
-                extra_quote_asset_amount=extra_quote_asset_amount,
-            )
-
+    @compile_message
     class JettonMintPartial(BaseMessage["JettonMintPartial"]):
+        """
+        jetton_mint#89b71d09 origin:address receiver:address amount:int257 custom_payload:Maybe ^cell forward_ton_amount:coins forward_payload:remainder<slice>
+
+        Only the leading fields are decoded, to_cell builds a body with the leading fields only.
+        """
+
         OPCODE = "0x89b71d09"
+        SCHEMA = "jetton_mint#89b71d09 origin:address receiver:address amount:int257"
+        __slots__ = ("origin", "receiver", "amount")
 
         def __init__(
             self,
@@ -216,17 +208,3 @@ class TicTonMessage:
             self.origin = origin
             self.receiver = receiver
             self.amount = amount
-
-        @classmethod
-        def _parse(cls, body: CellSlice):
-            """
-            jetton_mint#89b71d09 origin:address receiver:address amount:int257 custom_payload:Maybe ^cell forward_ton_amount:coins forward_payload:remainder<slice>
-            """
-            origin = Address(body.load_address())
-            receiver = Address(body.load_address())
-            amount = body.load_int(257)
-            return cls(
-                origin=origin,
-                receiver=receiver,
-                amount=amount,
-            )
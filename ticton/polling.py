@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import time
+from typing import List, Literal
+
+from pytoncenter.v3.models import Transaction
+
+__all__ = ["AdaptivePolling"]
+
+MAX_PAGE_SIZE = 256
+
+
+class AdaptivePolling:
+    """
+    AdaptivePolling decides the page size, the number of prefetched pages and the sleep time of the next poll
+    from the lag between now and the last processed transaction.
+
+    - catchup: the lag is larger than catchup_lag or the last poll returned full pages, poll back-to-back with the
+      maximum page size and prefetch catchup_pages pages concurrently
+    - tail: caught up with the chain, poll every interval seconds
+    - idle: the last poll returned nothing, back off exponentially up to max_interval seconds
+    """
+
+    def __init__(
+        self,
+        interval: float = 2.0,
+        *,
+        max_interval: float = 30.0,
+        backoff: float = 2.0,
+        catchup_lag: float = 60.0,
+        catchup_pages: int = 4,
+    ):
+        assert interval >= 0, "interval must be greater than or equal to 0"
+        assert max_interval >= interval, "max_interval must be greater than or equal to interval"
+        assert backoff >= 1, "backoff must be greater than or equal to 1"
+        assert catchup_pages >= 1, "catchup_pages must be greater than or equal to 1"
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.catchup_lag = catchup_lag
+        self.catchup_pages = catchup_pages
+        self.mode: Literal["catchup", "tail", "idle"] = "catchup"
+        self.lag: float = 0.0
+        self._idle_sleep = interval
+
+    @property
+    def pages(self) -> int:
+        return self.catchup_pages if self.mode == "catchup" else 1
+
+    def limit(self, default: int) -> int:
+        """
+        limit returns the page size of the next poll, default is used when it is not catching up
+        """
+        return MAX_PAGE_SIZE if self.mode == "catchup" else default
+
+    def update(self, txs: List[Transaction], requested: int) -> float:
+        """
+        update moves to the next mode with the transactions returned by the last poll and returns the time to sleep
+        before the next poll
+
+        Parameters
+        ----------
+        txs : List[Transaction]
+            The new transactions of the last poll in ascending order
+        requested : int
+            The number of transactions requested by the last poll
+        """
+        if len(txs) == 0:
+            self.mode = "idle"
+            sleep_time = self._idle_sleep
+            self._idle_sleep = min(self._idle_sleep * self.backoff, self.max_interval)
+            return sleep_time
+
+        self._idle_sleep = self.interval
+        self.lag = max(time.time() - txs[-1].now, 0.0)
+        if self.lag > self.catchup_lag or len(txs) >= requested:
+            self.mode = "catchup"
+            return 0.0
+        self.mode = "tail"
+        return self.interval
@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from pytoncenter import AsyncTonCenterClientV3
+from pytoncenter.address import Address
+from pytoncenter.v3.models import AddressLike, GetAccountRequest, RunGetMethodRequest
+from tonpy import CellBuilder, CellSlice, VmDict
+from tonsdk.boc import Cell
+
+from .cache import ChainCache
+from .decoder import JettonWalletCodeDecoder
+
+__all__ = ["AlarmAddressResolver", "JettonWalletResolver", "state_init_address"]
+
+CellRef = Tuple[int, bytes]
+"""
+CellRef is the (depth, representation hash) of a cell, which is all a parent cell needs to compute its own hash
+"""
+
+# split_depth:(Maybe) special:(Maybe) code:(Maybe ^Cell) data:(Maybe ^Cell) library:(HashmapE) = 0b00110
+_STATE_INIT_BITS = 0b00110
+_STATE_INIT_BIT_LEN = 5
+_ADDR_STD_TAG = 0b100
+
+
+def _cell_ref(cell: Cell) -> CellRef:
+    return cell.get_max_depth(), cell.bytes_hash()
+
+
+def _tonsdk_cell(boc: str) -> Cell:
+    return Cell.one_from_boc(base64.b64decode(boc))
+
+
+def _cell_hash(bits: int, bit_len: int, refs: Sequence[CellRef]) -> CellRef:
+    """
+    _cell_hash computes the (depth, representation hash) of an ordinary cell from its data bits and refs
+    without building the cell
+    """
+    full_bytes, rest = divmod(bit_len, 8)
+    if rest:
+        # augment the data with the completion tag and pad it to full bytes
+        bits = (bits << 1 | 1) << (7 - rest)
+    data = bits.to_bytes(full_bytes + (1 if rest else 0), "big")
+    descriptors = bytes((len(refs), full_bytes * 2 + (1 if rest else 0)))
+    depths = b"".join(depth.to_bytes(2, "big") for depth, _ in refs)
+    hashes = b"".join(hash_ for _, hash_ in refs)
+    depth = 1 + max(depth for depth, _ in refs) if refs else 0
+    return depth, hashlib.sha256(descriptors + data + depths + hashes).digest()
+
+
+def _dump_ref(ref: CellRef) -> List:
+    return [ref[0], ref[1].hex()]
+
+
+def _load_ref(value: List) -> CellRef:
+    return value[0], bytes.fromhex(value[1])
+
+
+def _address_bits(address: Address) -> int:
+    return _ADDR_STD_TAG << 264 | (address.workchain & 0xFF) << 256 | int.from_bytes(address.hash_part, "big")
+
+
+def state_init_address(workchain: int, code: CellRef, data: CellRef) -> Address:
+    """
+    state_init_address computes the address of the contract deployed with the StateInit of the code and data
+    """
+    _, hash_ = _cell_hash(_STATE_INIT_BITS, _STATE_INIT_BIT_LEN, [code, data])
+    return Address(f"{workchain}:{hash_.hex()}")
+
+
+class _AlarmLayout:
+    """
+    _AlarmLayout is the init data of the alarm contract compiled by Tact:
+
+        sys:^Cell initialized:Bool=0 args:(oracle:address index:int257 | index:int257 oracle:address)
+    """
+
+    __slots__ = ("workchain", "code", "sys", "oracle_first", "_data_base", "_index_shift", "_data_prefix", "_data_suffix", "_state_init_prefix")
+
+    DATA_BIT_LEN = 1 + 267 + 257
+    DATA_BYTES = (DATA_BIT_LEN + 7) // 8
+
+    def __init__(self, workchain: int, code: CellRef, sys: CellRef, oracle: Address, oracle_first: bool):
+        self.workchain = workchain
+        self.code = code
+        self.sys = sys
+        self.oracle_first = oracle_first
+        oracle_bits = _address_bits(oracle)
+        # the data cell and the StateInit cell only differ in the index, everything else is computed once
+        full_bytes, rest = divmod(self.DATA_BIT_LEN, 8)
+        padding = 8 - rest
+        self._data_base = (oracle_bits << 257 if oracle_first else oracle_bits) << padding | 1 << (padding - 1)
+        self._index_shift = padding if oracle_first else 267 + padding
+        self._data_prefix = bytes((1, full_bytes * 2 + 1))
+        self._data_suffix = sys[0].to_bytes(2, "big") + sys[1]
+        data_depth = sys[0] + 1
+        self._state_init_prefix = bytes((2, 1, _STATE_INIT_BITS << 3 | 0b100)) + code[0].to_bytes(2, "big") + data_depth.to_bytes(2, "big") + code[1]
+
+    def address(self, alarm_id: int) -> Address:
+        data = self._data_base | (alarm_id & ((1 << 257) - 1)) << self._index_shift
+        data_hash = hashlib.sha256(self._data_prefix + data.to_bytes(self.DATA_BYTES, "big") + self._data_suffix).digest()
+        return Address(f"{self.workchain}:{hashlib.sha256(self._state_init_prefix + data_hash).hexdigest()}")
+
+
+def _alarm_layouts(oracle: Address, oracle_data: str) -> List[_AlarmLayout]:
+    """
+    _alarm_layouts lists the candidate layouts of the alarm init data from the oracle data. A Tact contract stores the
+    codes of the contracts it deploys in the dict of its sys cell, the sys cell of a child contains only its own code.
+    """
+    cs = CellSlice(oracle_data)
+    sys_cs = cs.load_ref(as_cs=True)
+    if not sys_cs.load_bool():
+        return []
+    codes = VmDict(16, cell_root=sys_cs.load_ref())
+    layouts = []
+    for key, value in codes:
+        code = value.load_ref()
+        child_codes = VmDict(16)
+        child_codes.set_ref(key, code)
+        sys = CellBuilder().store_bool(True).store_ref(child_codes.get_cell()).end_cell()
+        code_ref = _cell_ref(_tonsdk_cell(code.to_boc()))
+        sys_ref = _cell_ref(_tonsdk_cell(sys.to_boc()))
+        for oracle_first in (True, False):
+            layouts.append(_AlarmLayout(oracle.workchain, code_ref, sys_ref, oracle, oracle_first))
+    return layouts
+
+
+class AlarmAddressResolver:
+    """
+    AlarmAddressResolver computes alarm addresses locally from the StateInit of the alarm contract instead of calling
+    the getAlarmAddress get-method of the oracle for every alarm.
+
+    The alarm code is read from the oracle data once. The first address is resolved with the get-method as well
+    and the layout that reproduces it is used from then on. If no layout matches, e.g. the oracle has been upgraded
+    to a different layout, every address is resolved with the get-method, and the results are cached.
+    With a ChainCache, the matched layout and the fallback addresses are persisted, so a restarted resolver
+    does not call the get-method or read the oracle data again.
+    """
+
+    def __init__(
+        self,
+        toncenter: AsyncTonCenterClientV3,
+        oracle: Address,
+        get_method: Callable[[int], Awaitable[Address]],
+        *,
+        cache: Optional[ChainCache] = None,
+        scope: str = "",
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        toncenter : AsyncTonCenterClientV3
+            The toncenter client to read the oracle data
+        oracle : Address
+            The oracle address
+        get_method : Callable[[int], Awaitable[Address]]
+            The getAlarmAddress get-method of the oracle, used to verify the layout and as the fallback
+        cache : Optional[ChainCache]
+            The persistent cache of the layout and the fallback addresses
+        scope : str
+            The scope of the entries in the cache, see ChainCache.scope
+        """
+        self.toncenter = toncenter
+        self.oracle = oracle
+        self.get_method = get_method
+        self.chain_cache = cache
+        self.scope = scope
+        self.logger = logger or logging.getLogger(__name__)
+        self._layout: Optional[_AlarmLayout] = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+        self._cache: Dict[int, Address] = {}
+
+    @property
+    def is_local(self) -> bool:
+        """
+        is_local is True if addresses are computed locally
+        """
+        return self._layout is not None
+
+    async def _fetch(self, alarm_id: int) -> Address:
+        address = self._cache.get(alarm_id)
+        if address is not None:
+            return address
+        cached = self.chain_cache.get(self.scope, f"alarm:{alarm_id}") if self.chain_cache is not None else None
+        if cached is not None:
+            address = Address(cached)
+        else:
+            address = await self.get_method(alarm_id)
+            if self.chain_cache is not None:
+                self.chain_cache.set(self.scope, f"alarm:{alarm_id}", address.to_string(False))
+        self._cache[alarm_id] = address
+        return address
+
+    async def _load(self, alarm_id: int):
+        async with self._lock:
+            if self._loaded:
+                return
+            cached = self.chain_cache.get(self.scope, "alarm_layout") if self.chain_cache is not None else None
+            if cached is not None:
+                self._layout = _AlarmLayout(self.oracle.workchain, _load_ref(cached["code"]), _load_ref(cached["sys"]), self.oracle, cached["oracle_first"])
+                self._loaded = True
+                return
+            expected = await self._fetch(alarm_id)
+            try:
+                account = await self.toncenter.get_account(GetAccountRequest(address=self.oracle.to_string()))  # type: ignore
+                layouts = _alarm_layouts(self.oracle, account.data) if account.data else []
+            except Exception as e:
+                self.logger.warning(f"Failed to read the alarm code from the oracle: {e}")
+                layouts = []
+            for layout in layouts:
+                if layout.address(alarm_id) == expected:
+                    self._layout = layout
+                    if self.chain_cache is not None:
+                        self.chain_cache.set(
+                            self.scope, "alarm_layout", {"code": _dump_ref(layout.code), "sys": _dump_ref(layout.sys), "oracle_first": layout.oracle_first}
+                        )
+                    break
+            else:
+                self.logger.warning("Alarm addresses cannot be computed locally, fall back to the getAlarmAddress get-method")
+            self._loaded = True
+
+    async def resolve(self, alarm_id: int) -> Address:
+        """
+        resolve returns the address of the alarm
+        """
+        if not self._loaded:
+            await self._load(alarm_id)
+        if self._layout is not None:
+            return self._layout.address(alarm_id)
+        return await self._fetch(alarm_id)
+
+    async def resolve_many(self, alarm_ids: Sequence[int]) -> List[Address]:
+        """
+        resolve_many returns the addresses of the alarms, the get-method is called concurrently in the fallback mode
+        """
+        if len(alarm_ids) == 0:
+            return []
+        if not self._loaded:
+            await self._load(alarm_ids[0])
+        if self._layout is not None:
+            return [self._layout.address(alarm_id) for alarm_id in alarm_ids]
+        return list(await asyncio.gather(*[self.resolve(alarm_id) for alarm_id in alarm_ids]))
+
+
+class _JettonWalletLayout:
+    """
+    _JettonWalletLayout is the init data of a jetton wallet, either the reference implementation
+
+        balance:Coins=0 owner:MsgAddress master:MsgAddress wallet_code:^Cell
+
+    or the wallet with a status field used by stablecoins
+
+        status:uint4=0 balance:Coins=0 owner:MsgAddress master:MsgAddress
+
+    The wallets are deployed in the workchain of the wallet that the get-method of the master returned.
+    """
+
+    __slots__ = ("workchain", "code", "master_bits", "with_status")
+
+    def __init__(self, workchain: int, code: CellRef, master: Address, with_status: bool):
+        self.workchain = workchain
+        self.code = code
+        self.master_bits = _address_bits(master)
+        self.with_status = with_status
+
+    def address(self, owner: Address) -> Address:
+        # the zero status and the zero balance (a 4 bit length prefix) are leading zero bits
+        bits = _address_bits(owner) << 267 | self.master_bits
+        if self.with_status:
+            data = _cell_hash(bits, 4 + 4 + 267 + 267, [])
+        else:
+            data = _cell_hash(bits, 4 + 267 + 267, [self.code])
+        return state_init_address(self.workchain, self.code, data)
+
+
+class JettonWalletResolver:
+    """
+    JettonWalletResolver computes jetton wallet addresses locally from the wallet code of the jetton master instead
+    of calling the get_wallet_address get-method or the toncenter index.
+
+    The wallet code is read from get_jetton_data once per master, and the first address of each master is resolved
+    with the get-method as well to pick the layout that reproduces it. Non-standard jettons fall back to the
+    get-method, the results are cached as the wallet address of an owner never changes. With a ChainCache, the
+    matched layouts and the fallback addresses are persisted as well.
+    """
+
+    def __init__(
+        self,
+        toncenter: AsyncTonCenterClientV3,
+        get_method: Callable[[Address, Address], Awaitable[Address]],
+        *,
+        cache: Optional[ChainCache] = None,
+        scope: str = "",
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        toncenter : AsyncTonCenterClientV3
+            The toncenter client to read the wallet code
+        get_method : Callable[[Address, Address], Awaitable[Address]]
+            The get_wallet_address get-method of the master called with (owner, master), used to verify the layout
+            and as the fallback
+        cache : Optional[ChainCache]
+            The persistent cache of the layouts and the fallback addresses
+        scope : str
+            The scope of the entries in the cache, see ChainCache.scope
+        """
+        self.toncenter = toncenter
+        self.get_method = get_method
+        self.chain_cache = cache
+        self.scope = scope
+        self.logger = logger or logging.getLogger(__name__)
+        self._layouts: Dict[str, Optional[_JettonWalletLayout]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._cache: Dict[Tuple[str, str], Address] = {}
+
+    async def _fetch(self, owner: Address, master: Address) -> Address:
+        key = (owner.to_string(False), master.to_string(False))
+        address = self._cache.get(key)
+        if address is not None:
+            return address
+        cached = self.chain_cache.get(self.scope, f"jetton_wallet:{key[1]}:{key[0]}") if self.chain_cache is not None else None
+        if cached is not None:
+            address = Address(cached)
+        else:
+            address = await self.get_method(owner, master)
+            if self.chain_cache is not None:
+                self.chain_cache.set(self.scope, f"jetton_wallet:{key[1]}:{key[0]}", address.to_string(False))
+        self._cache[key] = address
+        return address
+
+    async def _load(self, owner: Address, master: Address):
+        key = master.to_string(False)
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if key in self._layouts:
+                return
+            cached = self.chain_cache.get(self.scope, f"jetton_layout:{key}") if self.chain_cache is not None else None
+            if cached is not None:
+                # the layouts cached before the workchain was stored are all on the basechain
+                self._layouts[key] = _JettonWalletLayout(cached.get("workchain", 0), _load_ref(cached["code"]), master, cached["with_status"])
+                return
+            expected = await self._fetch(owner, master)
+            try:
+                result = await self.toncenter.run_get_method(RunGetMethodRequest(address=master.to_string(), method="get_jetton_data", stack=[]))
+                code = _cell_ref(_tonsdk_cell(JettonWalletCodeDecoder().decode(result).jetton_wallet_code))
+                layouts = [_JettonWalletLayout(expected.workchain, code, master, with_status) for with_status in (False, True)]
+            except Exception as e:
+                self.logger.warning(f"Failed to read the jetton wallet code of {key}: {e}")
+                layouts = []
+            self._layouts[key] = next((layout for layout in layouts if layout.address(owner) == expected), None)
+            layout = self._layouts[key]
+            if layout is None:
+                self.logger.warning(f"Jetton wallet addresses of {key} cannot be computed locally, fall back to the get_wallet_address get-method")
+            elif self.chain_cache is not None:
+                self.chain_cache.set(
+                    self.scope, f"jetton_layout:{key}", {"workchain": layout.workchain, "code": _dump_ref(layout.code), "with_status": layout.with_status}
+                )
+
+    async def resolve(self, owner: AddressLike, master: AddressLike) -> Address:
+        """
+        resolve returns the jetton wallet address of the owner
+        """
+        owner, master = Address(owner), Address(master)
+        key = master.to_string(False)
+        if key not in self._layouts:
+            await self._load(owner, master)
+        layout = self._layouts[key]
+        if layout is None:
+            return await self._fetch(owner, master)
+        return layout.address(owner)
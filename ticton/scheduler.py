@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+from pydantic import BaseModel, Field
+from pytoncenter import AsyncTonCenterClientV3
+
+__all__ = ["Priority", "RpcScheduler", "SchedulerMetrics", "rpc_priority"]
+
+
+class Priority(IntEnum):
+    """
+    Priority is the lane of a toncenter call, a lower value is scheduled first
+    """
+
+    SEND = 0
+    ESTIMATE = 1
+    SUBSCRIBE = 2
+    BULK = 3
+
+
+# the lanes share the rate by weight, so a busy lane never starves the lanes below it completely
+DEFAULT_WEIGHTS: Dict[Priority, int] = {Priority.SEND: 64, Priority.ESTIMATE: 16, Priority.SUBSCRIBE: 4, Priority.BULK: 1}
+
+# the lane of a call that is not issued in an rpc_priority block
+_METHOD_PRIORITY: Dict[str, Priority] = {
+    "send_message": Priority.SEND,
+    "get_transactions": Priority.SUBSCRIBE,
+    "get_transaction_by_message": Priority.SUBSCRIBE,
+    "get_adjacent_transactions": Priority.SUBSCRIBE,
+    "get_messages": Priority.SUBSCRIBE,
+    "get_trace_alternative": Priority.SUBSCRIBE,
+}
+
+_priority: contextvars.ContextVar[Optional[Priority]] = contextvars.ContextVar("_rpc_priority", default=None)
+
+
+def _lane(method: str) -> Priority:
+    """
+    _lane returns the lane of a call of method issued in the current context
+    """
+    priority = _priority.get()
+    if method == "send_message" or priority is None:
+        return _METHOD_PRIORITY.get(method, Priority.ESTIMATE)
+    return priority
+
+
+@contextmanager
+def rpc_priority(priority: Priority) -> Iterator[None]:
+    """
+    rpc_priority schedules the toncenter reads issued in the block, and in the tasks created in it, in the given lane.
+    Sent messages are always scheduled in the SEND lane.
+
+    Examples
+    --------
+    >>> with rpc_priority(Priority.BULK):
+    ...     await client.check_alarms(alarm_ids)
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _is_rate_limited(e: Exception) -> bool:
+    # TonCenterException carries the http status as code, aiohttp errors carry it as status
+    return getattr(e, "code", None) == 429 or getattr(e, "status", None) == 429
+
+
+class SchedulerMetrics(BaseModel):
+    tokens: float = Field(..., description="The number of calls that can be sent without waiting")
+    queue_depth: Dict[str, int] = Field(..., description="The number of calls waiting in each lane")
+    dispatched: Dict[str, int] = Field(..., description="The number of calls sent from each lane")
+    avg_wait: Dict[str, float] = Field(..., description="The average seconds a call waited in each lane")
+    max_wait: Dict[str, float] = Field(..., description="The maximum seconds a call waited in each lane")
+    rate_limited: int = Field(..., description="The number of calls rejected by toncenter with 429")
+
+
+class RpcScheduler:
+    """
+    RpcScheduler wraps a toncenter client and sends every call through one token bucket, so the calls never exceed
+    the quota of the api key and the trading actions are not queued behind background work.
+
+    Each call waits in a lane, SEND for sent messages, ESTIMATE for the reads of tick, ring and wind, SUBSCRIBE for
+    the transactions read by subscribe and events, and BULK for scans such as check_alarms and Backfill. The lanes
+    are served by weighted fair queuing, and the last headroom tokens of the bucket are left to SEND and ESTIMATE,
+    so a burst of background calls does not delay the next action.
+
+    When toncenter answers 429 the bucket is paused with an exponential backoff and the call is retried at the front
+    of its lane, the backoff is reset by the next call that succeeds.
+
+    Examples
+    --------
+    >>> toncenter = RpcScheduler(get_client(version="v3", network="mainnet", api_key=api_key), rate=10)
+    >>> client = TicTonAsyncClient(metadata, toncenter, oracle_addr)
+    >>> toncenter.metrics
+    """
+
+    def __init__(
+        self,
+        toncenter: AsyncTonCenterClientV3,
+        *,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        headroom: int = 1,
+        weights: Optional[Dict[Priority, int]] = None,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        toncenter : AsyncTonCenterClientV3
+            The toncenter client to send the calls
+        rate : Optional[float]
+            The calls per second, default is the qps of the toncenter client, which is 9.5 per api key, or 1 if it is unknown
+        burst : Optional[int]
+            The size of the bucket, default is the rate rounded down
+        headroom : int
+            The tokens that only SEND and ESTIMATE calls can take, at most burst - 1
+        weights : Optional[Dict[Priority, int]]
+            The share of each lane when several lanes are waiting, default is DEFAULT_WEIGHTS
+        max_retries : int
+            The number of times a call rejected with 429 is retried
+        backoff : float
+            The seconds the bucket is paused after the first 429, doubled on each 429 in a row up to max_backoff
+        """
+        if rate is None:
+            limiter = getattr(toncenter, "limiter", None)
+            rate = limiter.max_rate / limiter.time_period if limiter is not None else 1.0
+        assert rate > 0, "rate must be greater than 0"
+        assert burst is None or burst >= 1, "burst must be greater than or equal to 1"
+        assert headroom >= 0, "headroom must be greater than or equal to 0"
+        assert max_retries >= 0, "max_retries must be greater than or equal to 0"
+        assert 0 < backoff <= max_backoff, "backoff must be greater than 0 and less than or equal to max_backoff"
+        self.toncenter = toncenter
+        self.rate = rate
+        self.burst = burst if burst is not None else max(int(rate), 1)
+        self.headroom = min(headroom, self.burst - 1)
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        assert all(weight > 0 for weight in self.weights.values()), "weights must be greater than 0"
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.logger = logger or logging.getLogger(__name__)
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self._lanes: Dict[Priority, Deque[Tuple[asyncio.Future, float]]] = {priority: deque() for priority in Priority}
+        # the virtual time of each lane, the waiting lane with the smallest one is served next
+        self._pass: Dict[Priority, float] = {priority: 0.0 for priority in Priority}
+        self._vtime = 0.0
+        self._dispatched: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self._total_wait: Dict[Priority, float] = {priority: 0.0 for priority in Priority}
+        self._max_wait: Dict[Priority, float] = {priority: 0.0 for priority in Priority}
+        self._rate_limited = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def metrics(self) -> SchedulerMetrics:
+        self._refill(time.monotonic())
+        return SchedulerMetrics(
+            tokens=self._tokens,
+            queue_depth={priority.name.lower(): len(lane) for priority, lane in self._lanes.items()},
+            dispatched={priority.name.lower(): count for priority, count in self._dispatched.items()},
+            avg_wait={priority.name.lower(): self._total_wait[priority] / max(self._dispatched[priority], 1) for priority in Priority},
+            max_wait={priority.name.lower(): self._max_wait[priority] for priority in Priority},
+            rate_limited=self._rate_limited,
+        )
+
+    def _start(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        # the dispatcher belongs to the running event loop, a new loop gets a new one
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    def _refill(self, now: float):
+        self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _need(self, priority: Priority) -> float:
+        return 1 + (self.headroom if priority >= Priority.SUBSCRIBE else 0)
+
+    def _pick(self) -> Optional[Priority]:
+        chosen = None
+        for priority, lane in self._lanes.items():
+            # the callers that were cancelled while waiting
+            while lane and lane[0][0].done():
+                lane.popleft()
+            if lane and self._tokens >= self._need(priority) and (chosen is None or self._pass[priority] < self._pass[chosen]):
+                chosen = priority
+        return chosen
+
+    async def _run(self):
+        assert self._wakeup is not None
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            self._refill(now)
+            priority = self._pick()
+            if priority is not None:
+                future, enqueued_at = self._lanes[priority].popleft()
+                self._tokens -= 1
+                self._vtime = self._pass[priority]
+                self._pass[priority] += 1 / self.weights[priority]
+                wait = now - enqueued_at
+                self._dispatched[priority] += 1
+                self._total_wait[priority] += wait
+                self._max_wait[priority] = max(self._max_wait[priority], wait)
+                future.set_result(None)
+                continue
+            waiting = [priority for priority, lane in self._lanes.items() if lane]
+            if len(waiting) == 0:
+                await self._wakeup.wait()
+                continue
+            # wait for the tokens of the lane that needs the fewest, or for a new call that may need fewer
+            need = min(self._need(priority) for priority in waiting)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), (need - self._tokens) / self.rate)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _acquire(self, priority: Priority, front: bool = False):
+        self._start()
+        assert self._wakeup is not None
+        lane = self._lanes[priority]
+        if not lane:
+            # an idle lane does not save up a share for later
+            self._pass[priority] = max(self._pass[priority], self._vtime)
+        entry = (asyncio.get_running_loop().create_future(), time.monotonic())
+        if front:
+            lane.appendleft(entry)
+        else:
+            lane.append(entry)
+        self._wakeup.set()
+        await entry[0]
+
+    def _throttle(self, method: str):
+        self._rate_limited += 1
+        self._backoff = min(self.max_backoff, self._backoff * 2 if self._backoff > 0 else self.backoff)
+        pause = random.uniform(self._backoff / 2, self._backoff)
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        self._tokens = 0.0
+        self.logger.warning(f"Toncenter rate limit is hit by {method}, pausing all calls for {pause:.2f} seconds")
+
+    async def _call(self, method: str, *args, **kwargs) -> Any:
+        priority = _lane(method)
+        attempt = 0
+        while True:
+            await self._acquire(priority, front=attempt > 0)
+            try:
+                result = await getattr(self.toncenter, method)(*args, **kwargs)
+            except Exception as e:
+                if not _is_rate_limited(e) or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                self._throttle(method)
+                continue
+            self._backoff = 0.0
+            return result
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.toncenter, name)
+        if name.startswith("_") or name == "multicall" or not asyncio.iscoroutinefunction(attr):
+            return attr
+
+        async def _scheduled(*args, **kwargs):
+            return await self._call(name, *args, **kwargs)
+
+        return _scheduled
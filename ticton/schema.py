@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import abc
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+from pytoncenter.address import Address
+from pytoncenter.utils import get_opcode
+from tonpy import Cell, CellBuilder, CellSlice
+
+__all__ = ["MessageSchema", "SchemaCell", "SchemaField", "compile_message"]
+
+ADDRESS_BITS = 267
+_ADDR_STD_TAG = 0b100  # addr_std$10 anycast:(Maybe Anycast) with no anycast
+_MASK256 = (1 << 256) - 1
+# a load_uint call costs about a third of to_bitstring, cells with more reads than this are read as one bitstring
+_MAX_LOADS = 3
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
+def _load_address(value: int) -> Address:
+    """
+    _load_address converts the 267 bits of addr_std into Address
+    """
+    if value >> 264 != _ADDR_STD_TAG:
+        raise ValueError("only addr_std without anycast is supported")
+    workchain = value >> 256 & 0xFF
+    workchain -= workchain >> 7 << 8
+    return Address(f"{workchain}:{value & _MASK256:064x}")
+
+
+def _store_address(address: Any) -> int:
+    """
+    _store_address converts the address into the 267 bits of addr_std
+    """
+    address = address if isinstance(address, Address) else Address(address)
+    return _ADDR_STD_TAG << 264 | (address.workchain & 0xFF) << 256 | int.from_bytes(address.hash_part, "big")
+
+
+def _loads(cell: SchemaCell, opcode_bits: int) -> int:
+    """
+    _loads returns the number of load_uint and load_int calls that read the cell field by field, or a number above
+    _MAX_LOADS if a field is wider than tonpy loads
+    """
+    loads = 1 if opcode_bits else 0
+    for field in cell.fields:
+        if field.kind == "address":
+            loads += 2
+        elif field.bits > (256 if field.kind == "uint" else 257):
+            return _MAX_LOADS + 1
+        else:
+            loads += 1
+    return loads
+
+
+class SchemaField:
+    __slots__ = ("name", "kind", "bits")
+
+    def __init__(self, name: str, kind: str, bits: int):
+        self.name = name
+        self.kind = kind
+        self.bits = bits
+
+    @classmethod
+    def parse(cls, token: str) -> SchemaField:
+        name, _, type_ = token.partition(":")
+        if type_ == "address":
+            return cls(_snake_case(name), "address", ADDRESS_BITS)
+        matched = re.fullmatch(r"(uint|int)(\d+)", type_)
+        assert matched is not None, f"unsupported type {type_} of field {name}"
+        return cls(_snake_case(name), matched.group(1), int(matched.group(2)))
+
+    def __repr__(self) -> str:
+        return f"SchemaField({self.name}:{self.kind}{self.bits})"
+
+
+class SchemaCell:
+    """
+    SchemaCell is the layout of one cell, the fields are stored in the data bits in order and the child cells
+    are stored in the refs in order.
+    """
+
+    __slots__ = ("fields", "refs")
+
+    def __init__(self, fields: List[SchemaField], refs: List[SchemaCell]):
+        assert len(refs) <= 4, "a cell has at most 4 refs"
+        self.fields = fields
+        self.refs = refs
+
+    @property
+    def bits(self) -> int:
+        return sum(field.bits for field in self.fields)
+
+
+class MessageSchema:
+    """
+    MessageSchema is the layout of a message body written in TL-B, e.g.
+
+        tock#09c0fafb alarmIndex:uint256 scale:uint32 createdAt:int257 watchmaker:address ^[ baseAssetPrice:int257 ]
+
+    The opcode width follows the number of hex digits after `#`, `^[ ... ]` is a field group stored in the next ref.
+    The supported types are uintN, intN and address (addr_std), fields after the declared ones are not decoded.
+    """
+
+    __slots__ = ("tlb", "name", "opcode", "opcode_bits", "root")
+
+    def __init__(self, tlb: str):
+        tokens = tlb.replace("^[", " ^[ ").replace("]", " ] ").split()
+        assert len(tokens) > 0 and "#" in tokens[0], f"invalid TL-B {tlb}, the constructor must have an opcode"
+        self.tlb = tlb
+        self.name, _, opcode = tokens[0].partition("#")
+        self.opcode = int(opcode, 16)
+        self.opcode_bits = len(opcode) * 4
+        self.root, rest = self._parse_cell(tokens[1:])
+        assert len(rest) == 0, f"invalid TL-B {tlb}, unmatched ]"
+
+    @classmethod
+    def _parse_cell(cls, tokens: List[str]) -> Tuple[SchemaCell, List[str]]:
+        fields: List[SchemaField] = []
+        refs: List[SchemaCell] = []
+        while tokens and tokens[0] != "]":
+            token, tokens = tokens[0], tokens[1:]
+            if token == "^[":
+                ref, tokens = cls._parse_cell(tokens)
+                assert tokens and tokens[0] == "]", "invalid TL-B, unmatched ^["
+                tokens = tokens[1:]
+                refs.append(ref)
+            else:
+                fields.append(SchemaField.parse(token))
+        return SchemaCell(fields, refs), tokens
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        names: List[str] = []
+
+        def _walk(cell: SchemaCell):
+            names.extend(field.name for field in cell.fields)
+            for ref in cell.refs:
+                _walk(ref)
+
+        _walk(self.root)
+        return tuple(names)
+
+    def decoder_source(self, with_opcode: bool = True) -> str:
+        """
+        decoder_source generates the decoder of the message. A cell with at most _MAX_LOADS reads is read field by
+        field with load_uint and load_int, a wider cell is read with one to_bitstring call and the fields are cut
+        out of the integer with shifts and masks, which is faster once the cell has more fields than that.
+        """
+        lines = ["def decode(cls, cs):"]
+        counter = [0]
+
+        def _emit(cell: SchemaCell, slice_name: str, root: bool):
+            i = counter[0]
+            counter[0] += 1
+            opcode_bits = self.opcode_bits if root and with_opcode else 0
+            if _loads(cell, opcode_bits) <= _MAX_LOADS:
+                _emit_loads(cell, slice_name, opcode_bits)
+            else:
+                _emit_bitstring(cell, slice_name, root, opcode_bits, i)
+            for ref in cell.refs:
+                child = f"cs{counter[0]}"
+                lines.append(f"    {child} = {slice_name}.load_ref(as_cs=True)")
+                _emit(ref, child, False)
+
+        def _emit_opcode(value: str):
+            if value != "opcode":
+                lines.append(f"    opcode = {value}")
+            lines.append(f"    assert opcode == {self.opcode}, f'opcode {{get_opcode(opcode)}} is not {get_opcode(self.opcode)}'")
+
+        def _emit_loads(cell: SchemaCell, slice_name: str, opcode_bits: int):
+            if opcode_bits == 0 and len(cell.fields) == 0:
+                return
+            lines.append("    try:")
+            if opcode_bits:
+                lines.append(f"        opcode = {slice_name}.load_uint({opcode_bits})")
+            for field in cell.fields:
+                if field.kind == "address":
+                    lines.append(f"        {field.name} = {slice_name}.load_uint({ADDRESS_BITS - 256}) << 256")
+                    lines.append(f"        {field.name} = _load_address({field.name} | {slice_name}.load_uint(256))")
+                else:
+                    lines.append(f"        {field.name} = {slice_name}.load_{field.kind}({field.bits})")
+            # tonpy raises RuntimeError when the slice is too short
+            lines.append("    except RuntimeError:")
+            lines.append(f"        raise ValueError('Not enough bits to unpack {self.name}') from None")
+            if opcode_bits:
+                _emit_opcode("opcode")
+
+        def _emit_bitstring(cell: SchemaCell, slice_name: str, root: bool, opcode_bits: int, i: int):
+            need = cell.bits + opcode_bits
+            if need > 0:
+                lines.append(f"    s{i} = {slice_name}.to_bitstring()")
+                lines.append(f"    if len(s{i}) < {need}:")
+                lines.append(f"        raise ValueError('Not enough bits to unpack {self.name}')")
+                lines.append(f"    v{i} = int(s{i}[:{need}], 2)")
+            offset = need
+            if opcode_bits:
+                offset -= opcode_bits
+                _emit_opcode(f"v{i} >> {offset}")
+            for field in cell.fields:
+                offset -= field.bits
+                value = f"v{i} >> {offset} & {(1 << field.bits) - 1}" if offset else f"v{i} & {(1 << field.bits) - 1}"
+                if field.kind == "address":
+                    lines.append(f"    {field.name} = _load_address({value})")
+                else:
+                    lines.append(f"    {field.name} = {value}")
+                if field.kind == "int":
+                    lines.append(f"    {field.name} -= {field.name} >> {field.bits - 1} << {field.bits}")
+            if root and need > 0:
+                lines.append(f"    {slice_name}.skip_bits({need})")
+
+        _emit(self.root, "cs", True)
+        lines.append(f"    return cls({', '.join(f'{name}={name}' for name in self.fields)})")
+        return "\n".join(lines)
+
+    def encoder_source(self) -> str:
+        """
+        encoder_source generates the encoder of the message. The fields of each cell are packed into one integer
+        and stored with one store_bitstring call.
+        """
+        lines = ["def encode(self):"]
+        counter = [0]
+
+        def _emit(cell: SchemaCell, root: bool) -> str:
+            i = counter[0]
+            counter[0] += 1
+            children = [_emit(ref, False) for ref in cell.refs]
+            bits = cell.bits
+            terms = []
+            if root:
+                bits += self.opcode_bits
+                terms.append(str(self.opcode))
+            for field in cell.fields:
+                lines.append(f"    {field.name} = self.{field.name}")
+                if field.kind == "address":
+                    terms.append(f"_store_address({field.name})")
+                    continue
+                low, high = (0, 1 << field.bits) if field.kind == "uint" else (-(1 << field.bits - 1), 1 << field.bits - 1)
+                lines.append(f"    if not {low} <= {field.name} < {high}:")
+                lines.append(f"        raise ValueError('{field.name} is out of range of {field.kind}{field.bits}')")
+                terms.append(field.name if field.kind == "uint" else f"{field.name} & {(1 << field.bits) - 1}")
+            lines.append(f"    b{i} = CellBuilder()")
+            if bits > 0:
+                lines.append(f"    v{i} = 0")
+                shift = bits
+                for term, width in zip(terms, ([self.opcode_bits] if root else []) + [field.bits for field in cell.fields]):
+                    shift -= width
+                    lines.append(f"    v{i} |= ({term}) << {shift}" if shift else f"    v{i} |= {term}")
+                lines.append(f"    b{i}.store_bitstring(format(v{i}, '0{bits}b'))")
+            for child in children:
+                lines.append(f"    b{i}.store_ref({child})")
+            lines.append(f"    c{i} = b{i}.end_cell()")
+            return f"c{i}"
+
+        root = _emit(self.root, True)
+        lines.append(f"    return {root}")
+        return "\n".join(lines)
+
+    def compile(self) -> Tuple[Callable[..., Any], Callable[..., Any], Callable[[Any], Cell]]:
+        """
+        compile returns the decoder with opcode, the decoder without opcode and the encoder
+        """
+        namespace: Dict[str, Any] = {
+            "get_opcode": get_opcode,
+            "CellBuilder": CellBuilder,
+            "_load_address": _load_address,
+            "_store_address": _store_address,
+        }
+        exec(self.decoder_source(True).replace("def decode", "def parse"), namespace)
+        exec(self.decoder_source(False).replace("def decode", "def _parse"), namespace)
+        exec(self.encoder_source().replace("def encode", "def to_cell"), namespace)
+        return namespace["parse"], namespace["_parse"], namespace["to_cell"]
+
+    def __repr__(self) -> str:
+        return f"MessageSchema({self.tlb})"
+
+
+def compile_message(cls):
+    """
+    compile_message is a class decorator that generates parse, _preparse, _parse, to_cell and to_boc of the message
+    from its SCHEMA at import time. The fields of the schema must match the __slots__ of the class.
+    """
+    schema = MessageSchema(cls.SCHEMA)
+    assert get_opcode(schema.opcode) == cls.OPCODE, f"opcode of {cls.__name__} schema does not match {cls.OPCODE}"
+    assert tuple(cls.__slots__) == schema.fields, f"__slots__ of {cls.__name__} does not match the schema fields {schema.fields}"
+    parse, _parse, to_cell = schema.compile()
+    opcode_bits = schema.opcode_bits
+
+    def _preparse(cls, cs: CellSlice) -> CellSlice:
+        opcode = get_opcode(cs.load_uint(opcode_bits))
+        assert opcode == cls.OPCODE, f"opcode {opcode} is not {cls.OPCODE}"
+        return cs
+
+    def to_boc(self) -> str:
+        return self.to_cell().to_boc()
+
+    cls.schema = schema
+    cls.parse = classmethod(parse)
+    cls._preparse = classmethod(_preparse)
+    cls._parse = classmethod(_parse)
+    cls.to_cell = to_cell
+    cls.to_boc = to_boc
+    # _parse is abstract in BaseMessage, it is only implemented here
+    abc.update_abstractmethods(cls)
+    return cls
+
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterable, List, Optional, Set
+
+from pytoncenter.address import Address
+from pytoncenter.v3.models import AddressLike
+
+from .callbacks import OnRingSuccessParams, OnTickSuccessParams, OnWindSuccessParams, TicTonEvent
+
+__all__ = ["EventStore"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    lt INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    alarm_id INTEGER NOT NULL,
+    new_alarm_id INTEGER,
+    address TEXT,
+    created_at INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    PRIMARY KEY (hash, kind)
+);
+CREATE INDEX IF NOT EXISTS idx_events_alarm_id ON events (alarm_id);
+CREATE INDEX IF NOT EXISTS idx_events_new_alarm_id ON events (new_alarm_id);
+CREATE INDEX IF NOT EXISTS idx_events_address ON events (address);
+CREATE INDEX IF NOT EXISTS idx_events_created_at ON events (created_at);
+CREATE INDEX IF NOT EXISTS idx_events_lt ON events (lt);
+"""
+
+_MODELS = {
+    "tick": OnTickSuccessParams,
+    "wind": OnWindSuccessParams,
+    "ring": OnRingSuccessParams,
+}
+
+
+def _normalize(address: Optional[AddressLike]) -> Optional[str]:
+    if address is None:
+        return None
+    return Address(address).to_string(False)
+
+
+class EventStore:
+    """
+    EventStore persists decoded oracle events in a sqlite database, indexed by alarm id, watchmaker or timekeeper,
+    created_at and lt. Every call of `write` is one sqlite transaction, subscribe writes the events of a page at once.
+
+    The alarm of an event is the alarm it operates on: a tick belongs to the alarm it creates, a wind or a ring
+    belongs to the alarm it winds or rings. The address of an event is the watchmaker of a tick, the timekeeper of a
+    wind, or the origin of a ring.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+    def write(self, events: Iterable[TicTonEvent]):
+        """
+        write stores the events in one transaction, events that have been stored are ignored
+        """
+        rows = []
+        for event in events:
+            if isinstance(event, OnTickSuccessParams):
+                rows.append(("tick", event.new_alarm_id, event.new_alarm_id, _normalize(event.watchmaker), event))
+            elif isinstance(event, OnWindSuccessParams):
+                rows.append(("wind", event.alarm_id, event.new_alarm_id, _normalize(event.timekeeper), event))
+            elif isinstance(event, OnRingSuccessParams):
+                rows.append(("ring", event.alarm_id, None, _normalize(event.origin), event))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO events (lt, hash, kind, alarm_id, new_alarm_id, address, created_at, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(e.tx.lt, e.tx.hash, kind, alarm_id, new_alarm_id, address, e.created_at, e.model_dump_json()) for kind, alarm_id, new_alarm_id, address, e in rows],
+            )
+
+    def _query(self, where: str, args: tuple) -> List[TicTonEvent]:
+        rows = self.conn.execute(f"SELECT kind, payload FROM events WHERE {where} ORDER BY lt", args).fetchall()
+        return [_MODELS[kind].model_validate_json(payload) for kind, payload in rows]
+
+    def alarms_by_watchmaker(self, address: AddressLike) -> List[int]:
+        """
+        alarms_by_watchmaker returns the ids of the alarms opened by the address, either by tick or by wind
+        """
+        rows = self.conn.execute(
+            "SELECT new_alarm_id FROM events WHERE address = ? AND kind IN ('tick', 'wind') ORDER BY lt",
+            (_normalize(address),),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def events_by_alarm(self, alarm_id: int) -> List[TicTonEvent]:
+        """
+        events_by_alarm returns the events of the alarm in lt order
+        """
+        return self._query("alarm_id = ?", (alarm_id,))
+
+    def events_between(self, t0: int, t1: int) -> List[TicTonEvent]:
+        """
+        events_between returns the events created between t0 and t1 (inclusive) in lt order
+        """
+        return self._query("created_at BETWEEN ? AND ?", (t0, t1))
+
+    def alarm_lineage(self, alarm_id: int) -> List[TicTonEvent]:
+        """
+        alarm_lineage returns the events of the alarm and all of its ancestors in lt order. An alarm opened by wind
+        is a child of the alarm that has been wound, the lineage starts from the tick of the first ancestor.
+        """
+        lineage: Set[int] = {alarm_id}
+        current = alarm_id
+        while True:
+            row = self.conn.execute("SELECT alarm_id FROM events WHERE kind = 'wind' AND new_alarm_id = ?", (current,)).fetchone()
+            if row is None or row[0] in lineage:
+                break
+            current = row[0]
+            lineage.add(current)
+        placeholders = ", ".join("?" * len(lineage))
+        return self._query(f"alarm_id IN ({placeholders})", tuple(lineage))
+
+    def latest_lt(self) -> Optional[int]:
+        row = self.conn.execute("SELECT MAX(lt) FROM events").fetchone()
+        return row[0]
+
+    def close(self):
+        self.conn.close()
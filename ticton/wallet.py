@@ -0,0 +1,406 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+from pydantic import BaseModel
+from pytoncenter import AsyncTonCenterClientV3
+from pytoncenter.address import Address
+from pytoncenter.v3.models import GetWalletRequest
+from tonsdk.boc import Cell, begin_cell, begin_dict
+from tonsdk.contract import Contract
+from tonsdk.contract.wallet import (
+    HighloadWalletV2Contract,
+    SendModeEnum,
+    WalletContract,
+    WalletV2ContractR1,
+    WalletV2ContractR2,
+    WalletV3ContractR1,
+    WalletV3ContractR2,
+    WalletV4ContractR1,
+    WalletV4ContractR2,
+    Wallets,
+)
+from tonsdk.utils import Address as TonSdkAddress
+
+__all__ = ["Order", "PoolWallet", "SeqnoReservation", "WalletPool", "WalletSequencer", "create_transfer_message", "max_messages"]
+
+Order = Tuple[Address, int, Cell]
+"""
+Order is an internal message sent by the wallet, (destination, amount in nanoTON, body)
+"""
+
+_NO_EXPIRY = 0xFFFFFFFF
+_DEFAULT_SEND_MODE = SendModeEnum.ignore_errors | SendModeEnum.pay_gas_separately
+# a v2, v3 or v4 wallet stores the messages in the refs of the signing message, a highload wallet in a dict
+_MAX_MESSAGES = 4
+_MAX_HIGHLOAD_MESSAGES = 254
+
+
+def max_messages(wallet: WalletContract) -> int:
+    """
+    max_messages is the number of internal messages the wallet can send in one external message
+    """
+    return _MAX_HIGHLOAD_MESSAGES if isinstance(wallet, HighloadWalletV2Contract) else _MAX_MESSAGES
+
+
+def _signing_message(wallet: WalletContract, seqno: int, valid_until: int) -> Cell:
+    """
+    _signing_message is the signing message of v2, v3 and v4 wallets with the given valid_until, the wallets of
+    tonsdk always expire 60 seconds after the message is created
+    """
+    # the deploy message (seqno 0) never expires, same as tonsdk
+    valid_until = _NO_EXPIRY if seqno == 0 else valid_until
+    message = Cell()
+    if isinstance(wallet, (WalletV2ContractR1, WalletV2ContractR2)):
+        message.bits.write_uint(seqno, 32)
+        message.bits.write_uint(valid_until, 32)
+        return message
+    assert isinstance(wallet, (WalletV3ContractR1, WalletV3ContractR2, WalletV4ContractR1, WalletV4ContractR2)), f"{type(wallet).__name__} is not supported"
+    message.bits.write_uint(wallet.options["wallet_id"], 32)
+    message.bits.write_uint(valid_until, 32)
+    message.bits.write_uint(seqno, 32)
+    if isinstance(wallet, (WalletV4ContractR1, WalletV4ContractR2)):
+        message.bits.write_uint(0, 8)  # simple send
+    return message
+
+
+def _internal_message(order: Order) -> Cell:
+    to_addr, amount, payload = order
+    header = Contract.create_internal_message_header(TonSdkAddress(to_addr.to_string()), Decimal(amount))
+    return Contract.create_common_msg_info(header, None, payload)
+
+
+def create_transfer_message(
+    wallet: WalletContract,
+    orders: Sequence[Order],
+    seqno: int,
+    valid_until: int,
+    send_mode: int = _DEFAULT_SEND_MODE,
+) -> dict:
+    """
+    create_transfer_message is WalletContract.create_transfer_message with an explicit valid_until and several
+    internal messages, the result has the same keys as the one of tonsdk
+
+    Parameters
+    ----------
+    wallet : WalletContract
+        The wallet signing the message
+    orders : Sequence[Order]
+        The internal messages, at most max_messages(wallet)
+    seqno : int
+        The seqno of the wallet, or the lower 32 bits of the query id of a highload wallet
+    valid_until : int
+        The unix time after which the message is rejected
+    """
+    assert 0 < len(orders) <= max_messages(wallet), f"the number of messages must be between 1 and {max_messages(wallet)}"
+    if isinstance(wallet, HighloadWalletV2Contract):
+        messages = begin_dict(16)
+        for i, order in enumerate(orders):
+            messages.store_cell(i, begin_cell().store_uint8(send_mode).store_ref(_internal_message(order)).end_cell())
+        query_id = valid_until << 32 | seqno & 0xFFFFFFFF
+        signing_message = begin_cell().store_uint(wallet.options["wallet_id"], 32).store_uint(query_id, 64).store_maybe_ref(messages.end_cell()).end_cell()
+        return wallet.create_external_message(signing_message)
+    signing_message = _signing_message(wallet, seqno, valid_until)
+    for order in orders:
+        signing_message.bits.write_uint8(send_mode)
+        signing_message.refs.append(_internal_message(order))
+    return wallet.create_external_message(signing_message, seqno)
+
+
+class SeqnoReservation(BaseModel):
+    seqno: int
+    valid_until: int
+
+
+class WalletSequencer:
+    """
+    WalletSequencer hands out the seqno of a wallet locally, so an action does not read the seqno before every send
+    and concurrent actions never sign two messages with the same seqno.
+
+    The seqno is read from the wallet once, then every reservation takes the next one. When a send fails its seqno
+    is handed out again, before the later ones, since the messages after it cannot be accepted until it is filled.
+    The seqno is read again after a failed send, which may still have reached the wallet, or when a message that may
+    still be pending has expired. The messages in flight keep their seqnos across a read, only the seqnos that cannot
+    be accepted anymore are handed out again.
+
+    A highload wallet has no seqno, a reservation takes the next query number instead, which only has to be unique
+    among the messages with the same valid_until, so it is never read from the wallet.
+
+    Examples
+    --------
+    >>> async with sequencer.reserve() as reservation:
+    ...     await send(seqno=reservation.seqno, valid_until=reservation.valid_until)
+    """
+
+    def __init__(
+        self,
+        toncenter: AsyncTonCenterClientV3,
+        address: Address,
+        *,
+        timeout: int = 60,
+        highload: bool = False,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Parameters
+        ----------
+        toncenter : AsyncTonCenterClientV3
+            The toncenter client to read the seqno
+        address : Address
+            The wallet address
+        timeout : int
+            The default lifetime of a message in seconds, valid_until is the time of the reservation plus timeout
+        highload : bool
+            Whether the wallet is a highload wallet
+        """
+        assert timeout > 0, "timeout must be greater than 0"
+        self.toncenter = toncenter
+        self.address = address
+        self.timeout = timeout
+        self.highload = highload
+        self.logger = logger or logging.getLogger(__name__)
+        self._lock = asyncio.Lock()
+        # a random start avoids reusing the query numbers of a previous run within the same valid_until
+        self._next: Optional[int] = random.getrandbits(32) if highload else None
+        # seqno -> valid_until of the messages that may not be on chain yet
+        self._pending: Dict[int, int] = {}
+        # the seqnos below _next whose message failed or expired, they are handed out before _next
+        self._free: Set[int] = set()
+        # a send failed, the seqno is read before the next reservation
+        self._resync = False
+
+    @property
+    def next_seqno(self) -> Optional[int]:
+        """
+        next_seqno is the seqno of the next reservation, None if it has to be read from the wallet
+        """
+        if self._free:
+            return min(self._free)
+        return self._next
+
+    async def _sync(self):
+        self._resync = False
+        if self.highload:
+            self._next = random.getrandbits(32)
+            return
+        wallet = await self.toncenter.get_wallet(GetWalletRequest(address=self.address.to_string()))  # type: ignore
+        assert wallet.seqno is not None, "seqno is not found in wallet info"
+        if self._next is None or wallet.seqno >= self._next:
+            # nothing was handed out, or every message is on chain
+            self._reset(wallet.seqno)
+            return
+        now = time.time()
+        self._pending = {seqno: valid_until for seqno, valid_until in self._pending.items() if seqno >= wallet.seqno}
+        # a message that expired can never be accepted, its seqno is handed out again
+        self._free = {seqno for seqno in self._free if seqno >= wallet.seqno} | {seqno for seqno, valid_until in self._pending.items() if valid_until < now}
+        self._pending = {seqno: valid_until for seqno, valid_until in self._pending.items() if seqno not in self._free}
+        if wallet.seqno not in self._pending and wallet.seqno not in self._free:
+            # the wallet waits for a seqno that was not handed out by this sequencer
+            self._reset(wallet.seqno)
+
+    def _reset(self, seqno: int):
+        if self._next is not None and self._next != seqno:
+            self.logger.warning(f"Local seqno {self._next} is reset to the wallet seqno {seqno}")
+        self._next = seqno
+        self._pending = {}
+        self._free = set()
+
+    async def sync(self):
+        """
+        sync reads the seqno of the wallet
+        """
+        async with self._lock:
+            self._next = None
+            await self._sync()
+
+    def invalidate(self):
+        """
+        invalidate drops the local seqno, the next reservation reads it from the wallet
+        """
+        self._next = None
+        self._pending = {}
+        self._free = set()
+
+    def _release(self, seqno: int):
+        # the seqnos of the other messages in flight are kept, only the failed one is handed out again
+        self._resync = True
+        if self.highload:
+            return
+        self._pending.pop(seqno, None)
+        if self._next is not None and seqno == self._next - 1:
+            self._next = seqno
+        elif self._next is not None and seqno < self._next:
+            self._free.add(seqno)
+
+    def _stale(self) -> bool:
+        return self._next is None or self._resync or any(valid_until < time.time() for valid_until in self._pending.values())
+
+    async def prepare(self):
+        """
+        prepare reads the seqno of the wallet if the next reservation has to read it, so the read can run concurrently
+        with the other lookups of an action
+        """
+        if not self._stale():
+            return
+        async with self._lock:
+            if self._stale():
+                await self._sync()
+
+    @asynccontextmanager
+    async def reserve(self, valid_until: Optional[int] = None) -> AsyncIterator[SeqnoReservation]:
+        """
+        reserve takes the next seqno, the seqno is handed out again if the block raises
+
+        Parameters
+        ----------
+        valid_until : Optional[int]
+            The unix time after which the message is rejected, default is now plus timeout
+        """
+        async with self._lock:
+            if self._stale():
+                await self._sync()
+            assert self._next is not None
+            if self._free:
+                seqno = min(self._free)
+                self._free.discard(seqno)
+            else:
+                seqno = self._next
+                self._next = (self._next + 1) & 0xFFFFFFFF if self.highload else self._next + 1
+            reservation = SeqnoReservation(seqno=seqno, valid_until=valid_until or int(time.time()) + self.timeout)
+            if not self.highload:
+                self._pending[reservation.seqno] = reservation.valid_until
+        try:
+            yield reservation
+        except BaseException:
+            self._release(reservation.seqno)
+            raise
+
+
+class PoolWallet:
+    """
+    PoolWallet is a wallet of a WalletPool with its own seqno and the assets reserved by its actions in flight
+    """
+
+    __slots__ = ("wallet", "address", "sequencer", "in_flight", "sent", "reserved_base_asset", "reserved_quote_asset")
+
+    def __init__(self, wallet: WalletContract):
+        self.wallet = wallet
+        self.address = Address(wallet.address.to_string())
+        self.sequencer: Optional[WalletSequencer] = None
+        self.in_flight = 0
+        self.sent = 0
+        self.reserved_base_asset = Decimal(0)
+        self.reserved_quote_asset = Decimal(0)
+
+    @property
+    def max_messages(self) -> int:
+        return max_messages(self.wallet)
+
+    def __repr__(self) -> str:
+        return f"PoolWallet({self.address.to_string()}, in_flight={self.in_flight}, sent={self.sent})"
+
+
+class WalletPool:
+    """
+    WalletPool sends the actions of a client from several wallets, so the throughput is not bound to the seqno of
+    one wallet. Each action is routed to the least loaded wallet that can afford it, and the assets of an action are
+    reserved on its wallet until it is sent.
+
+    Examples
+    --------
+    >>> pool = WalletPool([("word1 ... word24", "v4r2"), ("word1 ... word24", "hv2")])
+    >>> client = await TicTonAsyncClient.init(wallet_pool=pool)
+    """
+
+    def __init__(self, wallets: Sequence[Union[WalletContract, Tuple[str, str]]], *, timeout: int = 60):
+        """
+        Parameters
+        ----------
+        wallets : Sequence[Union[WalletContract, Tuple[str, str]]]
+            The wallets, either a tonsdk wallet or the (mnemonics, wallet version) of a wallet
+        timeout : int
+            The default lifetime of a message in seconds, see WalletSequencer
+        """
+        assert len(wallets) > 0, "wallets must not be empty"
+        contracts = []
+        for wallet in wallets:
+            if not isinstance(wallet, WalletContract):
+                mnemonics, version = wallet
+                _, _, _, wallet = Wallets.from_mnemonics(mnemonics.split(" "), version)  # type: ignore
+            contracts.append(wallet)
+        self.wallets = [PoolWallet(wallet) for wallet in contracts]
+        addresses = {wallet.address.to_string(False) for wallet in self.wallets}
+        assert len(addresses) == len(self.wallets), "wallets must not contain the same wallet twice"
+        self.timeout = timeout
+
+    def bind(self, toncenter: AsyncTonCenterClientV3, *, logger: Optional[logging.Logger] = None):
+        """
+        bind creates the seqno sequencer of each wallet with the toncenter client
+        """
+        for wallet in self.wallets:
+            wallet.sequencer = WalletSequencer(
+                toncenter,
+                wallet.address,
+                timeout=self.timeout,
+                highload=isinstance(wallet.wallet, HighloadWalletV2Contract),
+                logger=logger,
+            )
+
+    def __len__(self) -> int:
+        return len(self.wallets)
+
+    def ranked(self) -> List[PoolWallet]:
+        """
+        ranked returns the wallets from the least loaded to the most loaded
+        """
+        return sorted(self.wallets, key=lambda wallet: (wallet.in_flight, wallet.sent))
+
+    @asynccontextmanager
+    async def acquire(
+        self,
+        need_base_asset: Decimal = Decimal(0),
+        need_quote_asset: Decimal = Decimal(0),
+        afford: Optional[Callable[[PoolWallet, Decimal, Decimal], Awaitable[Any]]] = None,
+    ) -> AsyncIterator[PoolWallet]:
+        """
+        acquire routes an action to the least loaded wallet and reserves the assets it needs until the block exits
+
+        Parameters
+        ----------
+        need_base_asset : Decimal
+            The base asset needed by the action
+        need_quote_asset : Decimal
+            The quote asset needed by the action
+        afford : Optional[Callable[[PoolWallet, Decimal, Decimal], Awaitable[Any]]]
+            Raises if the wallet cannot afford the base asset and the quote asset, including the ones reserved by the
+            actions in flight. It is called for every wallet concurrently, the error of the least loaded wallet is raised
+            if no wallet can afford the action.
+        """
+        candidates = self.ranked()
+        if afford is not None:
+            checks = await asyncio.gather(
+                *[afford(wallet, need_base_asset + wallet.reserved_base_asset, need_quote_asset + wallet.reserved_quote_asset) for wallet in candidates],
+                return_exceptions=True,
+            )
+            affordable = [wallet for wallet, check in zip(candidates, checks) if not isinstance(check, BaseException)]
+            if len(affordable) == 0:
+                raise next(check for check in checks if isinstance(check, BaseException))
+            candidates = affordable
+        # the load may have changed while the balances were checked
+        chosen = min(candidates, key=lambda wallet: (wallet.in_flight, wallet.sent))
+        chosen.in_flight += 1
+        chosen.reserved_base_asset += need_base_asset
+        chosen.reserved_quote_asset += need_quote_asset
+        try:
+            yield chosen
+            chosen.sent += 1
+        finally:
+            chosen.in_flight -= 1
+            chosen.reserved_base_asset -= need_base_asset
+            chosen.reserved_quote_asset -= need_quote_asset